@@ -0,0 +1,204 @@
+"""
+本地模拟的TTS与声音复刻接口，用于离线基准测试
+
+模拟 /api/v1/tts、/api/v1/mega_tts/audio/upload 和 /api/v1/mega_tts/status 三个接口，
+可配置延迟分布、音频大小、错误率和限流。
+
+运行:
+    python -m benchmarks.mock_server --port 8080 --latency-ms 80 --error-rate 0.01 --throttle-rps 200
+"""
+
+import argparse
+import asyncio
+import base64
+import dataclasses
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from aiohttp import web
+
+
+@dataclass
+class MockSettings:
+    latency: str = "lognormal"  # 延迟分布：fixed / uniform / lognormal
+    latency_ms: float = 50.0  # 合成接口延迟的中位数（毫秒）
+    latency_sigma: float = 0.5  # lognormal 分布的形状参数
+    status_latency_ms: float = 5.0  # 状态查询接口的固定延迟（毫秒）
+    audio_bytes_per_char: int = 2000  # 每个字符对应的音频字节数
+    min_audio_bytes: int = 4096  # 单次合成返回的最小音频字节数
+    error_rate: float = 0.0  # 随机返回服务端错误的比例
+    throttle_rps: Optional[float] = None  # 每秒请求数上限，超出时返回限流错误
+    max_concurrency: Optional[int] = None  # 并发上限，超出时返回限流错误
+    training_seconds: float = 1.0  # 上传后训练完成所需时间（秒）
+    seed: Optional[int] = None  # 随机数种子
+
+
+class MockAPI:
+    """模拟接口的状态与处理函数"""
+
+    def __init__(self, settings: Optional[MockSettings] = None):
+        self.settings = settings or MockSettings()
+        self.random = random.Random(self.settings.seed)
+        self.counts: Dict[str, int] = {"tts": 0, "upload": 0, "status": 0, "errors": 0, "throttled": 0}
+        self.in_flight = 0
+        self._trained: Dict[str, float] = {}  # speaker_id -> 上传完成时间
+        self._payloads: Dict[int, str] = {}  # 音频字节数 -> base64 编码
+        throttle_rps = self.settings.throttle_rps
+        self._tokens = throttle_rps or 0.0
+        self._updated = time.monotonic()
+
+    def _latency(self) -> float:
+        settings = self.settings
+        median = settings.latency_ms / 1000
+        if settings.latency == "fixed":
+            return median
+        if settings.latency == "uniform":
+            return self.random.uniform(0, 2 * median)
+        if settings.latency == "lognormal":
+            return self.random.lognormvariate(0, settings.latency_sigma) * median
+        raise ValueError(f"不支持的延迟分布: {settings.latency}")
+
+    def _throttled(self) -> bool:
+        settings = self.settings
+        if settings.max_concurrency is not None and self.in_flight >= settings.max_concurrency:
+            return True
+        if settings.throttle_rps is None:
+            return False
+        now = time.monotonic()
+        self._tokens = min(settings.throttle_rps, self._tokens + (now - self._updated) * settings.throttle_rps)
+        self._updated = now
+        if self._tokens < 1:
+            return True
+        self._tokens -= 1
+        return False
+
+    def _payload(self, text: str) -> str:
+        size = max(self.settings.min_audio_bytes, len(text) * self.settings.audio_bytes_per_char)
+        payload = self._payloads.get(size)
+        if payload is None:
+            audio = (bytes(range(256)) * (size // 256 + 1))[:size]
+            payload = self._payloads[size] = base64.b64encode(audio).decode("ascii")
+        return payload
+
+    def _inject_error(self) -> bool:
+        if self.settings.error_rate and self.random.random() < self.settings.error_rate:
+            self.counts["errors"] += 1
+            return True
+        return False
+
+    async def tts(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.counts["tts"] += 1
+        reqid = body["request"]["reqid"]
+        if self._throttled():
+            self.counts["throttled"] += 1
+            return web.json_response({"reqid": reqid, "code": 3003, "message": "并发超限"})
+        self.in_flight += 1
+        try:
+            await asyncio.sleep(self._latency())
+        finally:
+            self.in_flight -= 1
+        if self._inject_error():
+            return web.json_response({"reqid": reqid, "code": 3005, "message": "后端服务忙"})
+        return web.json_response({
+            "reqid": reqid,
+            "code": 3000,
+            "message": "Success",
+            "data": self._payload(body["request"]["text"]),
+        })
+
+    async def upload(self, request: web.Request) -> web.Response:
+        self.counts["upload"] += 1
+        if self._throttled():
+            self.counts["throttled"] += 1
+            return web.Response(status=429, text="too many requests")
+        # 逐块读取并丢弃请求体，只解析开头的 speaker_id
+        head = b""
+        async for chunk in request.content.iter_chunked(64 * 1024):
+            if len(head) < 4096:
+                head += chunk[:4096]
+        await asyncio.sleep(self._latency())
+        if self._inject_error():
+            return web.Response(status=500, text="injected failure")
+        speaker_id = head.split(b'"speaker_id": "', 1)[-1].split(b'"', 1)[0].decode("utf-8", "replace")
+        self._trained[speaker_id] = time.monotonic()
+        return web.json_response({"BaseResp": {"StatusCode": 0}, "speaker_id": speaker_id})
+
+    async def status(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.counts["status"] += 1
+        if self._throttled():
+            self.counts["throttled"] += 1
+            return web.Response(status=429, text="too many requests")
+        await asyncio.sleep(self.settings.status_latency_ms / 1000)
+        speaker_id = body["speaker_id"]
+        uploaded = self._trained.get(speaker_id)
+        if uploaded is None:
+            status = 0
+        elif time.monotonic() - uploaded < self.settings.training_seconds:
+            status = 1
+        else:
+            status = 2
+        return web.json_response({"speaker_id": speaker_id, "status": status})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.counts)
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=1024 ** 3)
+        app.router.add_post("/api/v1/tts", self.tts)
+        app.router.add_post("/api/v1/mega_tts/audio/upload", self.upload)
+        app.router.add_post("/api/v1/mega_tts/status", self.status)
+        app.router.add_get("/_stats", self.stats)
+        return app
+
+
+def add_settings_arguments(parser: argparse.ArgumentParser):
+    """把 MockSettings 的字段加为命令行参数，如 --latency-ms、--error-rate"""
+    for field in dataclasses.fields(MockSettings):
+        default = field.default
+        if field.name == "latency":
+            parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default=default)
+        elif default is None:
+            arg_type = int if field.name in ("max_concurrency", "seed") else float
+            parser.add_argument(f"--{field.name.replace('_', '-')}", type=arg_type, default=None)
+        else:
+            parser.add_argument(f"--{field.name.replace('_', '-')}", type=type(default), default=default)
+
+
+def settings_from_args(args: argparse.Namespace) -> MockSettings:
+    return MockSettings(**{field.name: getattr(args, field.name) for field in dataclasses.fields(MockSettings)})
+
+
+async def serve(settings: MockSettings, host: str, port: int):
+    runner = web.AppRunner(MockAPI(settings).app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    # 基准脚本通过第一行输出获取地址
+    print(f"http://{host}:{port}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟的TTS与声音复刻接口")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="监听端口，0 表示随机")
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    try:
+        asyncio.run(serve(settings_from_args(args), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
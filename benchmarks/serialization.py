@@ -0,0 +1,105 @@
+"""
+合成请求编码与响应解码的CPU时间和峰值内存基准
+
+对比改造前的实现（构造嵌套字典后 json.dumps、json.loads 整个响应再 base64.b64decode）与
+core.codec 的快速路径（预编译请求模板、只解析响应中 data 以外的字段、从原始字节切片解码音频），
+快速路径分别在标准库 json 和 orjson（已安装时）下测量。不经过网络，只统计客户端的序列化开销。
+
+运行:
+    python -m benchmarks.serialization --sizes 16 256 2048 --iterations 200
+"""
+
+import argparse
+import base64
+import json
+import time
+import tracemalloc
+import uuid
+from typing import Callable, List, Tuple
+
+from core import codec
+
+SAMPLE_TEXT = "今天天气很好，我们一起去公园散步吧。"
+
+
+def _response(audio_kb: int) -> bytes:
+    audio = bytes(range(256)) * (audio_kb * 4)
+    return json.dumps({
+        "reqid": str(uuid.uuid4()),
+        "code": 3000,
+        "operation": "query",
+        "message": "Success",
+        "sequence": -1,
+        "data": base64.b64encode(audio).decode("ascii"),
+        "addition": {"duration": "1960"},
+    }).encode("utf-8")
+
+
+def _legacy(body: bytes) -> bytes:
+    """改造前 TTSService 的请求编码和响应解码"""
+    request = {
+        "app": {"appid": "bench", "token": "bench", "cluster": "volcano_icl"},
+        "user": {"uid": str(uuid.uuid4())},
+        "audio": {"voice_type": "S_bench", "encoding": "mp3", "speed_ratio": 1.0},
+        "request": {"reqid": str(uuid.uuid4()), "text": SAMPLE_TEXT, "text_type": "plain", "operation": "query"},
+    }
+    json.dumps(request).encode("utf-8")  # aiohttp 的 json= 参数使用 json.dumps
+    result = json.loads(body)
+    return base64.b64decode(result["data"])
+
+
+def _fast(body: bytes) -> bytes:
+    template = codec.request_template("bench", "bench", "volcano_icl", "S_bench", "mp3", 1.0, "plain", "query")
+    template.render(str(uuid.uuid4()), str(uuid.uuid4()), SAMPLE_TEXT)
+    result, data = codec.parse_response(body)
+    return codec.decode_audio(data)
+
+
+def _measure(func: Callable[[bytes], bytes], body: bytes, iterations: int) -> Tuple[float, int]:
+    """返回 (每次请求的CPU时间微秒, 单次调用中除响应本身外的峰值内存字节数)"""
+    func(body)  # 预热模板缓存
+    start = time.process_time()
+    for _ in range(iterations):
+        func(body)
+    cpu = (time.process_time() - start) / iterations * 1e6
+
+    tracemalloc.start()
+    try:
+        func(body)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return cpu, peak
+
+
+def run(sizes_kb: List[int], iterations: int):
+    variants = [("旧实现", None, _legacy), ("快速路径(json)", False, _fast)]
+    if codec.orjson is not None:
+        variants.append(("快速路径(orjson)", True, _fast))
+
+    print(f"{'音频(KB)':>8} {'实现':<16} {'CPU(微秒/请求)':>14} {'峰值内存(KB)':>14}")
+    backend = codec.orjson
+    try:
+        for size_kb in sizes_kb:
+            body = _response(size_kb)
+            for name, use_orjson, func in variants:
+                if use_orjson is not None:
+                    codec.orjson = backend if use_orjson else None
+                    codec.request_template.cache_clear()
+                cpu, peak = _measure(func, body, iterations)
+                print(f"{size_kb:>8} {name:<16} {cpu:>14.1f} {peak / 1024:>14.1f}")
+    finally:
+        codec.orjson = backend
+        codec.request_template.cache_clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成请求编码与响应解码的基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 256, 2048], help="音频大小（KB）")
+    parser.add_argument("--iterations", type=int, default=200, help="每种实现测量CPU时间的调用次数")
+    args = parser.parse_args()
+    run(args.sizes, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
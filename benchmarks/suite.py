@@ -0,0 +1,311 @@
+"""
+离线基准测试套件
+
+在本地模拟接口（benchmarks.mock_server，默认以子进程启动，避免服务端开销计入客户端）上运行
+单次合成、批量合成、长文本分段合成和训练音频上传四个场景，统计每秒请求数、p50/p95/p99 延迟、
+CPU时间和Python峰值内存，结果保存为JSON，可与之前的结果对比发现性能退化。
+
+运行:
+    python -m benchmarks.suite --latency-ms 50 --error-rate 0.01
+    python -m benchmarks.suite --scenarios batch long_text --compare benchmarks/results/baseline.json
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+
+from core import Config, HttpClient, SynthesisJob, TTSService, VoiceCloningService
+
+from .mock_server import MockSettings, add_settings_arguments, settings_from_args
+
+SCENARIOS = ("single", "batch", "long_text", "upload")
+
+# 对比时数值越大越好的指标，其余越小越好
+HIGHER_IS_BETTER = ("ops_per_s", "req_per_s")
+COMPARED_METRICS = ("ops_per_s", "req_per_s", "p50_ms", "p95_ms", "p99_ms", "cpu_seconds", "peak_memory_mb")
+
+SAMPLE_TEXT = "今天天气很好，我们一起去公园散步吧。"
+
+
+@dataclass
+class SuiteParams:
+    single_calls: int = 50  # 顺序单次合成的次数
+    batch_jobs: int = 500  # 批量合成的任务数
+    batch_concurrency: int = 32  # 批量合成的并发数
+    long_text_runs: int = 5  # 长文本合成的次数
+    long_text_chars: int = 5000  # 长文本的字符数
+    long_text_concurrency: int = 4  # 长文本分段的并发数
+    upload_runs: int = 3  # 训练上传的次数
+    upload_mb: int = 8  # 训练音频的大小（MB）
+    measure_memory: bool = True  # 是否用 tracemalloc 统计峰值内存（会增加CPU时间）
+
+
+def percentile(values: Sequence[float], quantile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+
+def write_wav(path: str, size_mb: int):
+    """生成指定大小的静音WAV文件（16kHz、16位、单声道）"""
+    frames = size_mb * 1024 * 1024 // 2
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        block = b"\x00\x00" * 16000
+        for _ in range(frames // 16000):
+            w.writeframes(block)
+        w.writeframes(b"\x00\x00" * (frames % 16000))
+
+
+async def _server_counts(host: str) -> Dict[str, int]:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{host}/_stats") as response:
+            return await response.json()
+
+
+async def _timed(latencies: List[float], coro) -> bool:
+    start = time.perf_counter()
+    try:
+        await coro
+    except Exception:
+        return False
+    latencies.append(time.perf_counter() - start)
+    return True
+
+
+async def _single(tts: TTSService, params: SuiteParams, latencies: List[float], upload_path: str) -> int:
+    errors = 0
+    for i in range(params.single_calls):
+        errors += not await _timed(latencies, tts.synthesize(f"{SAMPLE_TEXT}{i}", "S_bench"))
+    return errors
+
+
+async def _batch(tts: TTSService, params: SuiteParams, latencies: List[float], upload_path: str) -> int:
+    jobs = (SynthesisJob(text=f"{SAMPLE_TEXT}{i}", speaker_id="S_bench") for i in range(params.batch_jobs))
+    errors = 0
+    async for result in tts.synthesize_many(jobs, concurrency=params.batch_concurrency):
+        if result.ok:
+            latencies.append(result.elapsed)
+        else:
+            errors += 1
+    return errors
+
+
+async def _long_text(tts: TTSService, params: SuiteParams, latencies: List[float], upload_path: str) -> int:
+    text = (SAMPLE_TEXT * (params.long_text_chars // len(SAMPLE_TEXT) + 1))[:params.long_text_chars]
+    errors = 0
+    for _ in range(params.long_text_runs):
+        coro = tts.synthesize_long(text, "S_bench", concurrency=params.long_text_concurrency)
+        errors += not await _timed(latencies, coro)
+    return errors
+
+
+async def _upload(cloning: VoiceCloningService, params: SuiteParams, latencies: List[float], upload_path: str) -> int:
+    errors = 0
+    for i in range(params.upload_runs):
+        errors += not await _timed(latencies, cloning.train(upload_path, f"S_bench_{i}"))
+    return errors
+
+
+async def run_scenario(name: str, host: str, config: Config, params: SuiteParams, upload_path: str) -> Dict:
+    """运行单个场景，每个场景使用新的连接池"""
+    runner = {"single": _single, "batch": _batch, "long_text": _long_text, "upload": _upload}[name]
+    before = await _server_counts(host)
+    latencies: List[float] = []
+    async with HttpClient(config) as client:
+        service = VoiceCloningService(config, client=client) if name == "upload" else TTSService(config, client=client)
+        if params.measure_memory:
+            tracemalloc.start()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        try:
+            errors = await runner(service, params, latencies, upload_path)
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            peak = tracemalloc.get_traced_memory()[1] if params.measure_memory else 0
+        finally:
+            if params.measure_memory:
+                tracemalloc.stop()
+    after = await _server_counts(host)
+
+    requests = sum(after[key] - before[key] for key in ("tts", "upload", "status"))
+    ops = len(latencies) + errors
+    return {
+        "ops": ops,
+        "errors": errors,
+        "requests": requests,
+        "throttled": after["throttled"] - before["throttled"],
+        "injected_errors": after["errors"] - before["errors"],
+        "wall_seconds": round(wall, 4),
+        "ops_per_s": round(ops / wall, 2) if wall else 0.0,
+        "req_per_s": round(requests / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "cpu_seconds": round(cpu, 4),
+        "peak_memory_mb": round(peak / 1024 ** 2, 2) if params.measure_memory else None,
+    }
+
+
+async def run_suite(
+    host: str,
+    params: SuiteParams,
+    scenarios: Sequence[str] = SCENARIOS,
+    config: Optional[Config] = None,
+) -> Dict[str, Dict]:
+    """
+    在已启动的模拟接口上依次运行各场景
+
+    Args:
+        host: 模拟接口地址，如 http://127.0.0.1:8080
+        params: 各场景的规模参数
+        scenarios: 要运行的场景
+        config: 客户端配置，默认放宽客户端限流以测量客户端本身的吞吐
+    """
+    config = config or Config(appid="bench", token="bench", host=host, rate_limit=1e6, max_concurrency=10000)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        upload_path = os.path.join(tmp, "sample.wav")
+        if "upload" in scenarios:
+            write_wav(upload_path, params.upload_mb)
+        for name in scenarios:
+            results[name] = await run_scenario(name, host, config, params, upload_path)
+            logging.getLogger(__name__).info(f"{name}: {results[name]}")
+    return results
+
+
+async def start_mock_server(settings: MockSettings) -> Tuple[asyncio.subprocess.Process, str]:
+    """以子进程启动模拟接口，返回进程和地址"""
+    args = []
+    for field in dataclasses.fields(MockSettings):
+        value = getattr(settings, field.name)
+        if value is not None:
+            args += [f"--{field.name.replace('_', '-')}", str(value)]
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "benchmarks.mock_server", *args, stdout=asyncio.subprocess.PIPE)
+    line = await asyncio.wait_for(process.stdout.readline(), timeout=30)
+    if not line:
+        raise RuntimeError("模拟接口启动失败")
+    return process, line.decode().strip()
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> Tuple[List[str], bool]:
+    """对比两次结果，返回报告行和是否存在超过阈值的退化"""
+    lines = [f"{'场景':<10} {'指标':<16} {'基线':>12} {'本次':>12} {'变化':>9}"]
+    regressed = False
+    for scenario, result in current["results"].items():
+        old = baseline.get("results", {}).get(scenario)
+        if old is None:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = old.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = ""
+            if worse > threshold:
+                flag = "  退化"
+                regressed = True
+            lines.append(f"{scenario:<10} {metric:<16} {before:>12} {after:>12} {change:>+8.1%}{flag}")
+    return lines, regressed
+
+
+def _environment() -> Dict[str, str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": str(os.cpu_count()),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    settings = settings_from_args(args)
+    params = SuiteParams(**{
+        field.name: getattr(args, field.name) for field in dataclasses.fields(SuiteParams)
+        if field.name != "measure_memory"
+    }, measure_memory=not args.no_memory)
+
+    process = None
+    host = args.server
+    if host is None:
+        process, host = await start_mock_server(settings)
+    try:
+        results = await run_suite(host, params, args.scenarios)
+    finally:
+        if process is not None:
+            process.terminate()
+            await process.wait()
+
+    report = {
+        "environment": _environment(),
+        "mock_settings": dataclasses.asdict(settings),
+        "params": dataclasses.asdict(params),
+        "results": results,
+    }
+    output = args.output or os.path.join("benchmarks", "results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"{'场景':<10} {'请求/秒':>10} {'p50(ms)':>10} {'p95(ms)':>10} {'p99(ms)':>10} {'CPU(s)':>8} {'峰值内存(MB)':>12}")
+    for name, result in results.items():
+        print(f"{name:<10} {result['req_per_s']:>10} {result['p50_ms']:>10} {result['p95_ms']:>10} "
+              f"{result['p99_ms']:>10} {result['cpu_seconds']:>8} {str(result['peak_memory_mb']):>12}")
+    print(f"结果已保存到: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        lines, regressed = compare(report, baseline, args.threshold)
+        print("\n".join(lines))
+        if regressed and args.fail_on_regression:
+            return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线基准测试套件")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--server", help="使用已启动的模拟接口地址，不传则自动启动子进程")
+    parser.add_argument("--output", help="结果JSON路径，默认 benchmarks/results/<时间>.json")
+    parser.add_argument("--compare", help="与之前的结果JSON对比")
+    parser.add_argument("--threshold", type=float, default=0.1, help="判定退化的变化比例")
+    parser.add_argument("--fail-on-regression", action="store_true", help="存在退化时返回非零退出码")
+    parser.add_argument("--no-memory", action="store_true", help="不统计峰值内存，CPU时间更准确")
+    for field in dataclasses.fields(SuiteParams):
+        if field.name != "measure_memory":
+            parser.add_argument(f"--{field.name.replace('_', '-')}", type=int, default=field.default)
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+    logging.getLogger("aiohttp.access").setLevel(logging.WARNING)
+    logging.getLogger("core").setLevel(logging.WARNING)
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
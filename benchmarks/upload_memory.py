@@ -0,0 +1,94 @@
+"""
+训练音频上传的峰值内存基准
+
+对比一次性编码上传（encode_audio_file + json）与流式上传（train）在不同文件大小下的
+Python 峰值内存。上传目标为进程内的本地服务，服务端逐块读取并丢弃请求体。
+
+运行:
+    python -m benchmarks.upload_memory --sizes 1 8 32 64
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import tracemalloc
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from core import Config, VoiceCloningService
+
+from .suite import write_wav
+
+
+async def _discard_upload(request: web.Request) -> web.Response:
+    received = 0
+    async for chunk in request.content.iter_chunked(64 * 1024):
+        received += len(chunk)
+    return web.json_response({"speaker_id": "S_bench", "received": received})
+
+
+async def _legacy_train(service: VoiceCloningService, path: str):
+    """改造前的上传方式：整文件读入、编码后由 aiohttp 再序列化一次"""
+    encoded_data, audio_format = await service.encode_audio_file(path)
+    data = {
+        "appid": service.config.appid,
+        "speaker_id": "S_bench",
+        "audios": [{"audio_bytes": encoded_data, "audio_format": audio_format}],
+        "source": 2,
+        "language": 0,
+        "model_type": 1,
+    }
+    url = f"{service.config.host}/api/v1/mega_tts/audio/upload"
+    async with service.client.post(url, json=data, headers=service.config.get_headers(True)) as response:
+        return await response.json()
+
+
+async def _measure(coro_factory) -> int:
+    # 每次测量前后启停跟踪，峰值从零开始统计（tracemalloc.reset_peak 需要 Python 3.9）
+    tracemalloc.start()
+    try:
+        await coro_factory()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+async def run(sizes_mb):
+    app = web.Application(client_max_size=1024 ** 3)
+    app.router.add_post("/api/v1/mega_tts/audio/upload", _discard_upload)
+    server = TestServer(app)
+    await server.start_server()
+    config = Config(appid="bench", token="bench", host=str(server.make_url("")).rstrip("/"))
+
+    print(f"{'文件大小(MB)':>12} {'一次性上传峰值(MB)':>20} {'流式上传峰值(MB)':>18}")
+    try:
+        async with VoiceCloningService(config) as service:
+            for size_mb in sizes_mb:
+                # 上传前会校验音频文件头，需要真实的WAV文件
+                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+                    path = f.name
+                write_wav(path, size_mb)
+                try:
+                    legacy = await _measure(lambda: _legacy_train(service, path))
+                    streamed = await _measure(lambda: service.train(path, "S_bench"))
+                finally:
+                    os.unlink(path)
+                print(f"{size_mb:>12} {legacy / 1024 ** 2:>20.1f} {streamed / 1024 ** 2:>18.1f}")
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="训练音频上传的峰值内存基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 8, 32, 64], help="文件大小（MB）")
+    args = parser.parse_args()
+    logging.getLogger("aiohttp.access").setLevel(logging.WARNING)
+    asyncio.run(run(args.sizes))
+
+
+if __name__ == "__main__":
+    main()
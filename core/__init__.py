@@ -1,7 +1,43 @@
 """Core package for voice cloning functionality."""
 
-from .config import Config
-from .tts import TTSService
-from .voice_cloning import VoiceCloningService
+import importlib
 
-__all__ = ['Config', 'TTSService', 'VoiceCloningService']
+# 公开名称 -> 所在模块。首次访问时才导入对应模块，
+# 只用到守护进程客户端等轻量模块时不会加载 aiohttp，命令行工具启动更快
+_EXPORTS = {
+    'SynthesisJob': 'batch', 'SynthesisResult': 'batch',
+    'DiskCache': 'cache', 'MemoryCache': 'cache', 'SingleFlight': 'cache',
+    'Config': 'config',
+    'Credential': 'credentials', 'CredentialPool': 'credentials',
+    'APIError': 'errors', 'AuthError': 'errors', 'CircuitOpenError': 'errors',
+    'InvalidRequestError': 'errors', 'NetworkError': 'errors', 'RetryableError': 'errors',
+    'ServerError': 'errors', 'SpeakerNotFoundError': 'errors', 'SpeakerNotReadyError': 'errors',
+    'SsmlError': 'errors', 'ThrottledError': 'errors', 'TrainingFailedError': 'errors',
+    'VoiceCloneError': 'errors',
+    'HttpClient': 'http',
+    'LogSink': 'metrics', 'Metrics': 'metrics', 'PrometheusExporter': 'metrics',
+    'AudioPack': 'pack', 'PackSink': 'pack',
+    'StatusPoller': 'poller',
+    'AdaptiveLimiter': 'ratelimit', 'RateLimiterRegistry': 'ratelimit',
+    'CircuitBreaker': 'resilience', 'Resilience': 'resilience', 'RetryPolicy': 'resilience',
+    'ShardedRunner': 'sharding',
+    'CompiledSSML': 'ssml', 'compile_ssml': 'ssml', 'split_ssml': 'ssml',
+    'PromptTemplate': 'template',
+    'TTSService': 'tts',
+    'SpeakerStatusCache': 'voice_cloning', 'VoiceCloningService': 'voice_cloning',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
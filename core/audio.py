@@ -0,0 +1,507 @@
+"""音频格式识别与拼接"""
+
+import os
+from typing import Any, BinaryIO, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+# 识别格式需要读取的文件头长度
+HEADER_BYTES = 64
+
+
+def detect_format(header: bytes) -> Optional[str]:
+    """
+    根据文件头识别音频格式
+
+    Args:
+        header: 文件开头的若干字节（建议不少于 HEADER_BYTES）
+
+    Returns:
+        Optional[str]: wav/mp3/ogg/m4a/aac/flac，无法识别时返回None
+    """
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return "wav"
+    if header[:4] == b"OggS":
+        return "ogg"
+    if header[:4] == b"fLaC":
+        return "flac"
+    if header[4:8] == b"ftyp":
+        return "m4a"
+    if header[:3] == b"ID3":
+        return "mp3"
+    if len(header) >= 2 and header[0] == 0xFF:
+        # ADTS（AAC）的 layer 字段为 00，MPEG 音频帧的 layer 字段非 00
+        if header[1] & 0xF6 == 0xF0:
+            return "aac"
+        if header[1] & 0xE0 == 0xE0 and header[1] & 0x06:
+            return "mp3"
+    return None
+
+
+def detect_file_format(path: str) -> Optional[str]:
+    """读取文件头识别格式，无法识别时退化为文件扩展名"""
+    with open(path, "rb") as f:
+        header = f.read(HEADER_BYTES)
+    return detect_format(header) or os.path.splitext(path)[1][1:].lower() or None
+
+
+# ---------------------------------------------------------------------------
+# 音频拼接
+#
+# 把多次合成得到的音频拼接为一个文件，不解码也不重新编码：解析帧头和容器头，
+# 去掉或重写中间的元数据，音频数据以 memoryview 切片的形式直接写出。
+# ---------------------------------------------------------------------------
+
+Buffers = List[Union[bytes, memoryview]]
+
+# 接口 pcm 编码的默认参数：24kHz、16位、单声道
+PCM_SAMPLE_RATE = 24000
+PCM_SAMPLE_WIDTH = 2
+
+
+# MP3 -----------------------------------------------------------------------
+
+_MP3_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 2.5: (11025, 12000, 8000)}
+_MP3_VERSIONS = {0b00: 2.5, 0b10: 2, 0b11: 1}
+_MP3_LAYERS = {0b01: 3, 0b10: 2, 0b11: 1}
+
+
+class Mp3Frame(NamedTuple):
+    """MPEG音频帧头"""
+    header: bytes  # 4字节帧头
+    version: float  # 1 / 2 / 2.5
+    layer: int
+    bitrate: int  # kbps
+    sample_rate: int
+    mono: bool
+    protected: bool  # 帧头后是否有CRC
+    length: int  # 整帧字节数
+    samples: int  # 每帧采样数
+
+    @property
+    def side_info_offset(self) -> int:
+        """帧头（含CRC）之后 Layer III 边信息的结束位置，Xing/Info 标签从这里开始"""
+        if self.version == 1:
+            side_info = 17 if self.mono else 32
+        else:
+            side_info = 9 if self.mono else 17
+        return 4 + (2 if self.protected else 0) + side_info
+
+
+def parse_mp3_frame(data, pos: int = 0) -> Optional[Mp3Frame]:
+    """解析 pos 处的MPEG音频帧头，不是有效帧头时返回None"""
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    version = _MP3_VERSIONS.get((b1 >> 3) & 0x03)
+    layer = _MP3_LAYERS.get((b1 >> 1) & 0x03)
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version is None or layer is None or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    bitrate = _MP3_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index]
+    sample_rate = _MP3_SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 0x01
+    if layer == 1:
+        length = (12 * bitrate * 1000 // sample_rate + padding) * 4
+        samples = 384
+    elif layer == 2 or version == 1:
+        length = 144 * bitrate * 1000 // sample_rate + padding
+        samples = 1152
+    else:
+        length = 72 * bitrate * 1000 // sample_rate + padding
+        samples = 576
+    return Mp3Frame(
+        header=bytes(data[pos:pos + 4]),
+        version=version,
+        layer=layer,
+        bitrate=bitrate,
+        sample_rate=sample_rate,
+        mono=(b3 >> 6) == 0b11,
+        protected=not (b1 & 0x01),
+        length=length,
+        samples=samples,
+    )
+
+
+def _id3v2_size(data) -> int:
+    """开头 ID3v2 标签的总长度，没有时返回0"""
+    if len(data) < 10 or bytes(data[:3]) != b"ID3":
+        return 0
+    size = 0
+    for b in data[6:10]:
+        size = (size << 7) | (b & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+class _Mp3Part(NamedTuple):
+    audio: memoryview  # 去掉标签和 Xing 帧后的音频帧
+    first: Optional[Mp3Frame]
+    frames: int
+    bitrates: set
+    had_info: bool  # 是否带有 Xing/Info/VBRI 头
+
+
+def _parse_mp3(data) -> _Mp3Part:
+    view = memoryview(data)
+    start = _id3v2_size(view)
+    end = len(view)
+    if end - start >= 128 and bytes(view[end - 128:end - 125]) == b"TAG":
+        end -= 128  # ID3v1 标签
+
+    first = parse_mp3_frame(view, start)
+    had_info = False
+    if first is not None and first.layer == 3:
+        tag_at = first.side_info_offset
+        tag = bytes(view[start + tag_at:start + tag_at + 4])
+        if tag in (b"Xing", b"Info") or bytes(view[start + 36:start + 40]) == b"VBRI":
+            # 第一帧是不含音频的 Xing/Info 头，记录的是单个片段的帧数和时长
+            had_info = True
+            start += first.length
+            first = parse_mp3_frame(view, start)
+
+    frames = 0
+    bitrates = set()
+    pos = start
+    while pos < end:
+        frame = parse_mp3_frame(view, pos)
+        if frame is None or pos + frame.length > end:
+            break
+        frames += 1
+        bitrates.add(frame.bitrate)
+        pos += frame.length
+    return _Mp3Part(view[start:end], first, frames, bitrates, had_info)
+
+
+def _mp3_template(frame: Mp3Frame) -> Tuple[bytes, int]:
+    """以 frame 的参数构造无CRC、无填充的帧头，返回 (帧头, 帧长)"""
+    header = bytes((0xFF, frame.header[1] | 0x01, frame.header[2] & 0xFD, frame.header[3]))
+    return header, parse_mp3_frame(header).length
+
+
+def mp3_silence(frame: Mp3Frame, seconds: float) -> bytes:
+    """
+    生成与 frame 参数相同的静音帧
+
+    帧头之后全为0：边信息中 part2_3_length 为0，解码结果为静音。
+    """
+    header, length = _mp3_template(frame)
+    count = round(seconds * frame.sample_rate / frame.samples)
+    return (header + b"\x00" * (length - 4)) * count
+
+
+def _mp3_info_frame(frame: Mp3Frame, frames: int, total_bytes: int, vbr: bool) -> bytes:
+    """构造记录总帧数和总字节数的 Xing/Info 头帧，使播放器能得到正确的时长"""
+    header, length = _mp3_template(frame)
+    body = bytearray(length)
+    body[:4] = header
+    offset = frame._replace(protected=False).side_info_offset
+    body[offset:offset + 16] = (
+        (b"Xing" if vbr else b"Info")
+        + (0x03).to_bytes(4, "big")  # 标志位：含帧数和字节数
+        + frames.to_bytes(4, "big")
+        + (total_bytes + length).to_bytes(4, "big")
+    )
+    return bytes(body)
+
+
+def _concat_mp3(parts: Sequence[bytes], gap: float) -> Buffers:
+    parsed = [_parse_mp3(part) for part in parts]
+    reference = next((p.first for p in parsed if p.first is not None), None)
+    if reference is None:
+        raise ValueError("没有找到有效的MP3帧")
+    silence = mp3_silence(reference, gap) if gap > 0 else b""
+    silence_frames = len(silence) // _mp3_template(reference)[1] if silence else 0
+
+    buffers: Buffers = []
+    frames = 0
+    bitrates = set()
+    for i, part in enumerate(parsed):
+        if i and silence:
+            buffers.append(silence)
+            frames += silence_frames
+        buffers.append(part.audio)
+        frames += part.frames
+        bitrates |= part.bitrates
+    if any(p.had_info for p in parsed):
+        total = sum(len(b) for b in buffers)
+        buffers.insert(0, _mp3_info_frame(reference, frames, total, vbr=len(bitrates) > 1))
+    return buffers
+
+
+# WAV / PCM -----------------------------------------------------------------
+
+def _parse_wav(data) -> Tuple[bytes, memoryview]:
+    """返回 (fmt 块内容, 音频数据)"""
+    view = memoryview(data)
+    if bytes(view[:4]) != b"RIFF" or bytes(view[8:12]) != b"WAVE":
+        raise ValueError("不是有效的WAV数据")
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(view):
+        chunk_id = bytes(view[pos:pos + 4])
+        size = int.from_bytes(view[pos + 4:pos + 8], "little")
+        body = pos + 8
+        if chunk_id == b"fmt ":
+            fmt = bytes(view[body:body + size])
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV数据缺少fmt块")
+            # 流式生成的WAV长度字段可能是占位值，以实际数据为准
+            return fmt, view[body:min(len(view), body + size)]
+        pos = body + size + (size & 1)
+    raise ValueError("WAV数据缺少data块")
+
+
+def wav_header(fmt: bytes, data_length: int) -> bytes:
+    """构造只含 fmt 和 data 两个块的WAV文件头"""
+    riff_size = 4 + 8 + len(fmt) + 8 + data_length + (data_length & 1)
+    if riff_size > 0xFFFFFFFF:
+        raise ValueError("音频过长，超过WAV格式的4GB上限")
+    return (
+        b"RIFF" + riff_size.to_bytes(4, "little") + b"WAVE"
+        + b"fmt " + len(fmt).to_bytes(4, "little") + fmt
+        + b"data" + data_length.to_bytes(4, "little")
+    )
+
+
+def _pcm_silence(seconds: float, sample_rate: int, block_align: int, bits: int) -> bytes:
+    # 8位PCM是无符号数，静音为0x80
+    return (b"\x80" if bits == 8 else b"\x00") * (round(seconds * sample_rate) * block_align)
+
+
+def _concat_wav(parts: Sequence[bytes], gap: float) -> Buffers:
+    parsed = [_parse_wav(part) for part in parts]
+    fmt = parsed[0][0]
+    for other, _ in parsed[1:]:
+        if other[:16] != fmt[:16]:
+            raise ValueError("WAV片段的采样格式不一致，无法直接拼接")
+    sample_rate = int.from_bytes(fmt[4:8], "little")
+    block_align = int.from_bytes(fmt[12:14], "little")
+    bits = int.from_bytes(fmt[14:16], "little")
+    silence = _pcm_silence(gap, sample_rate, block_align, bits) if gap > 0 else b""
+
+    buffers: Buffers = []
+    for i, (_, data) in enumerate(parsed):
+        if i and silence:
+            buffers.append(silence)
+        buffers.append(data)
+    data_length = sum(len(b) for b in buffers)
+    buffers.insert(0, wav_header(fmt, data_length))
+    if data_length & 1:
+        buffers.append(b"\x00")  # RIFF 块按偶数字节对齐
+    return buffers
+
+
+def _concat_pcm(parts: Sequence[bytes], gap: float, sample_rate: int) -> Buffers:
+    silence = _pcm_silence(gap, sample_rate, PCM_SAMPLE_WIDTH, 8 * PCM_SAMPLE_WIDTH) if gap > 0 else b""
+    buffers: Buffers = []
+    for i, part in enumerate(parts):
+        if i and silence:
+            buffers.append(silence)
+        buffers.append(memoryview(part))
+    return buffers
+
+
+# Ogg Opus ------------------------------------------------------------------
+
+OGG_BOS = 0x02
+OGG_EOS = 0x04
+OPUS_SAMPLE_RATE = 48000  # Opus 的 granule 始终以48kHz计
+OPUS_SILENCE_SAMPLES = 960  # 每个静音包20ms
+
+# 20ms 静音包（CELT 全频带、单帧），按声道数区分 TOC 中的立体声标志
+_OPUS_SILENCE = {1: b"\xf8\xff\xfe", 2: b"\xfc\xff\xfe"}
+
+
+def _crc_table() -> List[int]:
+    table = []
+    for i in range(256):
+        crc = i << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else (crc << 1)
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+_OGG_CRC_TABLE = _crc_table()
+
+
+def ogg_crc(*chunks) -> int:
+    """Ogg 页校验和（多项式 0x04C11DB7，不反转，初值为0）"""
+    crc = 0
+    table = _OGG_CRC_TABLE
+    for chunk in chunks:
+        for b in chunk:
+            crc = ((crc << 8) & 0xFFFFFFFF) ^ table[(crc >> 24) ^ b]
+    return crc
+
+
+class OggPage(NamedTuple):
+    flags: int
+    granule: int
+    serial: int
+    segments: bytes  # 分段表
+    body: memoryview
+
+
+def parse_ogg_pages(data) -> List[OggPage]:
+    """把Ogg数据拆分为页，页内容为原数据的切片"""
+    view = memoryview(data)
+    pages = []
+    pos = 0
+    while pos + 27 <= len(view):
+        if bytes(view[pos:pos + 4]) != b"OggS":
+            raise ValueError(f"Ogg数据在第{pos}字节处缺少页同步标记")
+        count = view[pos + 26]
+        segments = bytes(view[pos + 27:pos + 27 + count])
+        body_start = pos + 27 + count
+        body_end = body_start + sum(segments)
+        if body_end > len(view):
+            raise ValueError("Ogg数据不完整")
+        pages.append(OggPage(
+            flags=view[pos + 5],
+            granule=int.from_bytes(view[pos + 6:pos + 14], "little", signed=True),
+            serial=int.from_bytes(view[pos + 14:pos + 18], "little"),
+            segments=segments,
+            body=view[body_start:body_end],
+        ))
+        pos = body_end
+    return pages
+
+
+def ogg_page(flags: int, granule: int, serial: int, sequence: int, segments: bytes, body) -> bytes:
+    """构造页头（含校验和），页内容由调用方紧随其后写出"""
+    header = bytearray(
+        b"OggS\x00" + bytes((flags,)) + granule.to_bytes(8, "little", signed=True)
+        + serial.to_bytes(4, "little") + sequence.to_bytes(4, "little") + b"\x00\x00\x00\x00"
+        + bytes((len(segments),)) + segments
+    )
+    header[22:26] = ogg_crc(header, body).to_bytes(4, "little")
+    return bytes(header)
+
+
+def _opus_headers(pages: List[OggPage]) -> int:
+    """OpusHead 和 OpusTags 所占的页数；音频数据从新的一页开始"""
+    if not pages or bytes(pages[0].body[:8]) != b"OpusHead":
+        raise ValueError("不是有效的Ogg Opus数据")
+    for i, page in enumerate(pages[1:], 1):
+        if page.segments and page.segments[-1] < 255:
+            return i + 1
+    raise ValueError("Ogg Opus数据缺少OpusTags")
+
+
+def _opus_silence_pages(channels: int, seconds: float) -> List[Tuple[bytes, bytes, int]]:
+    """静音页的 (分段表, 内容, 采样数) 列表"""
+    packet = _OPUS_SILENCE[min(channels, 2)]
+    count = round(seconds * OPUS_SAMPLE_RATE / OPUS_SILENCE_SAMPLES)
+    pages = []
+    while count > 0:
+        n = min(count, 255)
+        pages.append((bytes((len(packet),)) * n, packet * n, n * OPUS_SILENCE_SAMPLES))
+        count -= n
+    return pages
+
+
+def _concat_ogg_opus(parts: Sequence[bytes], gap: float) -> Buffers:
+    """
+    合并为单个逻辑流
+
+    保留第一段的 OpusHead/OpusTags，其余各段去掉头部页，
+    重写序列号、页序号和 granule 位置并重新计算校验和；页内容不复制。
+    后续片段的 pre-skip 不再被跳过，每个接缝处会多出几毫秒编码器预热音频。
+    """
+    parsed = [parse_ogg_pages(part) for part in parts]
+    head = parsed[0][0].body
+    channels = head[9]
+    serial = parsed[0][0].serial
+    silence = _opus_silence_pages(channels, gap) if gap > 0 else []
+
+    # (flags, granule 或 -1, 分段表, 内容)
+    pages: List[Tuple[int, int, bytes, Any]] = []
+    header_count = _opus_headers(parsed[0])
+    for page in parsed[0][:header_count]:
+        pages.append((page.flags & ~OGG_EOS, page.granule, page.segments, page.body))
+
+    offset = 0
+    for i, part in enumerate(parsed):
+        if part[0].body[9] != channels:
+            raise ValueError("Ogg Opus片段的声道数不一致，无法直接拼接")
+        if i and silence:
+            for segments, body, samples in silence:
+                offset += samples
+                pages.append((0, offset, segments, body))
+        last = offset
+        for page in part[_opus_headers(part):]:
+            granule = page.granule if page.granule < 0 else offset + page.granule
+            if granule >= 0:
+                last = granule
+            pages.append((page.flags & ~(OGG_BOS | OGG_EOS), granule, page.segments, page.body))
+        offset = last
+
+    buffers: Buffers = []
+    for sequence, (flags, granule, segments, body) in enumerate(pages):
+        if sequence == len(pages) - 1:
+            flags |= OGG_EOS
+        buffers.append(ogg_page(flags, granule, serial, sequence, segments, body))
+        buffers.append(body)
+    return buffers
+
+
+# 入口 ----------------------------------------------------------------------
+
+AUDIO_ENCODINGS = ("mp3", "wav", "pcm", "ogg_opus")
+
+
+def concat_buffers(
+    parts: Sequence[bytes],
+    encoding: str,
+    gap: float = 0.0,
+    sample_rate: int = PCM_SAMPLE_RATE,
+) -> Buffers:
+    """
+    按音频格式拼接多段音频，返回可直接 writelines 的缓冲区列表
+
+    音频数据以原数据的 memoryview 切片返回，只有重写的文件头和静音是新生成的。
+
+    Args:
+        parts: 按顺序排列的各段音频，格式相同
+        encoding: mp3/wav/pcm/ogg_opus
+        gap: 相邻两段之间插入的静音时长（秒）
+        sample_rate: pcm 的采样率，其他格式从文件头读取
+
+    Raises:
+        ValueError: 不支持的格式，或片段无法解析、参数不一致
+    """
+    if encoding not in AUDIO_ENCODINGS:
+        raise ValueError(f"不支持拼接的音频格式: {encoding}")
+    parts = [part for part in parts if len(part)]
+    if not parts:
+        return []
+    if encoding == "mp3":
+        return _concat_mp3(parts, gap)
+    if encoding == "wav":
+        return _concat_wav(parts, gap)
+    if encoding == "pcm":
+        return _concat_pcm(parts, gap, sample_rate)
+    return _concat_ogg_opus(parts, gap)
+
+
+def concat_audio(parts: Sequence[bytes], encoding: str, gap: float = 0.0, sample_rate: int = PCM_SAMPLE_RATE) -> bytes:
+    """拼接多段音频并返回完整数据，参数同 concat_buffers"""
+    return b"".join(concat_buffers(parts, encoding, gap, sample_rate))
+
+
+def write_audio(f: BinaryIO, parts: Sequence[bytes], encoding: str, gap: float = 0.0,
+                sample_rate: int = PCM_SAMPLE_RATE) -> int:
+    """拼接多段音频并写入已打开的文件，不在内存中组装完整数据，返回写入的字节数"""
+    buffers = concat_buffers(parts, encoding, gap, sample_rate)
+    f.writelines(buffers)
+    return sum(len(b) for b in buffers)
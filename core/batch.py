@@ -0,0 +1,112 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Optional, Union
+
+
+@dataclass
+class SynthesisJob:
+    """批量合成中的单个任务"""
+    text: str
+    speaker_id: str
+    text_type: str = "plain"
+    encoding: str = "mp3"
+    speed_ratio: float = 1.0
+    output_path: Optional[str] = None  # 不为空时写入文件，结果中不再保留音频数据
+
+    @classmethod
+    def from_any(cls, job: Union["SynthesisJob", dict]) -> "SynthesisJob":
+        """从 SynthesisJob 或字典构造任务"""
+        if isinstance(job, cls):
+            return job
+        if isinstance(job, dict):
+            return cls(**job)
+        raise TypeError(f"不支持的任务类型: {type(job).__name__}")
+
+
+@dataclass
+class SynthesisResult:
+    """批量合成中单个任务的结果"""
+    index: int  # 任务在输入中的序号
+    job: Optional[SynthesisJob]
+    audio: Optional[bytes] = None
+    output_path: Optional[str] = None
+    error: Optional[Exception] = None
+    elapsed: float = 0.0  # 耗时（秒）
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+Jobs = Union[Iterable[Any], AsyncIterable[Any]]
+
+
+async def aiter_jobs(jobs: Jobs) -> AsyncIterator[Any]:
+    """把同步或异步可迭代对象统一为异步迭代器"""
+    if hasattr(jobs, "__aiter__"):
+        async for job in jobs:
+            yield job
+    else:
+        for job in jobs:
+            yield job
+
+
+async def run_jobs(
+    handler: Callable[[SynthesisJob], Awaitable[Optional[bytes]]],
+    jobs: Jobs,
+    concurrency: int = 8,
+) -> AsyncIterator[SynthesisResult]:
+    """
+    以有限并发执行任务，按完成顺序产出结果
+
+    任务按需从输入中拉取，不会一次性展开整个输入；单个任务失败只会体现在
+    该任务的结果中，不影响其余任务。
+
+    Args:
+        handler: 执行单个任务的协程函数，返回音频数据（已写入文件时返回None）
+        jobs: 任务的同步或异步可迭代对象（SynthesisJob 或字典）
+        concurrency: 最大并发任务数
+
+    Yields:
+        SynthesisResult: 已完成任务的结果
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency 必须大于等于1")
+
+    async def run(index: int, raw_job: Any) -> SynthesisResult:
+        start = time.perf_counter()
+        result = SynthesisResult(index=index, job=None)
+        try:
+            result.job = SynthesisJob.from_any(raw_job)
+            result.audio = await handler(result.job)
+            result.output_path = result.job.output_path
+        except Exception as e:
+            result.error = e
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    source = aiter_jobs(jobs).__aiter__()
+    pending = set()
+    index = 0
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    raw_job = await source.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending.add(asyncio.ensure_future(run(index, raw_job)))
+                index += 1
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=lambda t: t.result().index):
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
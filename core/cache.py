@@ -0,0 +1,312 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """统一Unicode形式并折叠空白，使等价文本得到相同的缓存键"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(
+    speaker_id: str,
+    text: str,
+    text_type: str,
+    encoding: str,
+    speed_ratio: float,
+    cluster: str,
+) -> str:
+    """根据合成参数计算内容寻址的缓存键（SHA-256）"""
+    payload = json.dumps(
+        [speaker_id, normalize_text(text), text_type, encoding, round(float(speed_ratio), 3), cluster],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    持久化的合成结果缓存
+
+    按缓存键存放音频文件，通过文件修改时间记录最近使用时间，
+    总大小超过上限时按LRU淘汰到上限的 low_water 比例，之后写满这段余量才会再次扫描目录。写入先落到临时文件再原子替换，
+    多个进程共享同一目录也不会读到半截文件。各方法是阻塞的文件操作，可以在线程池中并发调用。
+
+    用法:
+        tts = TTSService(config, cache=DiskCache("~/.cache/voice_clone"))
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1024 ** 3, low_water: float = 0.9):
+        """
+        Args:
+            directory: 缓存目录
+            max_bytes: 缓存总大小上限（字节）
+            low_water: 淘汰后保留的大小占上限的比例
+        """
+        if not 0 < low_water <= 1:
+            raise ValueError("low_water 必须在 (0, 1] 之间")
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()  # 保护计数和淘汰，各方法可能在多个线程中同时执行
+        os.makedirs(self.directory, exist_ok=True)
+        self._size = self._scan_size()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.startswith("."):  # 未完成的临时文件
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat
+
+    def _scan_size(self) -> int:
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def _touch(self, path: str):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def get_path(self, key: str) -> Optional[str]:
+        """命中时返回缓存文件路径并刷新其使用时间"""
+        path = self._path(key)
+        if os.path.exists(path):
+            self._touch(path)
+            with self._lock:
+                self.hits += 1
+            return path
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缓存的音频数据，未命中返回None"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        self._touch(path)
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> str:
+        """原子写入缓存，返回缓存文件路径"""
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            try:
+                replaced = os.stat(path).st_size  # 覆盖已有的键时不重复计算大小
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        with self._lock:
+            self._size += len(data) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+        return path
+
+    def evict(self):
+        """按最近使用时间淘汰，直到总大小不超过上限的 low_water 比例"""
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime)
+        # 重新统计，其他进程可能也写入了同一目录
+        self._size = sum(stat.st_size for _, stat in entries)
+        if self._size <= self.max_bytes:
+            return
+        target = self.max_bytes * self.low_water
+        for path, stat in entries:
+            if self._size <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+            self._size -= stat.st_size
+            self.evictions += 1
+            logger.debug(f"淘汰缓存: {path}")
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            for path, _ in list(self._entries()):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            self._size = 0
+
+    @property
+    def size(self) -> int:
+        """当前进程估计的缓存总大小（字节）"""
+        return self._size
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": self._size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class MemoryCache:
+    """
+    进程内的合成结果缓存
+
+    以音频数据的总字节数为上限，按LRU淘汰，可选设置过期时间。
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 ** 2, ttl: Optional[float] = None):
+        """
+        Args:
+            max_bytes: 缓存总大小上限（字节）
+            ttl: 过期时间（秒），None 表示不过期
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._size = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (data, expires_at)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缓存，未命中或已过期返回None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        data, expires_at = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        """写入缓存，超过上限时淘汰最久未使用的条目"""
+        if len(data) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (data, expires_at)
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        data, _ = self._entries.pop(key)
+        self._size -= len(data)
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "entries": len(self._entries),
+            "size": self._size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class SingleFlight:
+    """
+    合并相同键的并发调用
+
+    同一个键正在执行时，后来的调用者直接等待已有的结果，只会产生一次上游请求。
+    某个调用者被取消不会影响其他等待者。
+    """
+
+    def __init__(self):
+        self.calls = 0  # 实际执行的次数
+        self.shared = 0  # 被合并的调用次数
+        self._flights: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[bytes]]) -> bytes:
+        """执行 factory()，相同键的并发调用共享同一次执行结果"""
+        flight = self._flights.get(key)
+        if flight is None:
+            self.calls += 1
+            flight = asyncio.ensure_future(factory())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda f: self._done(key, f))
+        else:
+            self.shared += 1
+        return await asyncio.shield(flight)
+
+    def _done(self, key: str, flight: asyncio.Future):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            # 避免所有等待者都已取消时出现未获取异常的警告
+            flight.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._flights)}
@@ -0,0 +1,340 @@
+"""
+按清单批量合成的命令行工具
+
+从 JSONL 或 CSV 清单流式读取任务，并发合成后写入文件，已完成的任务ID记录在检查点文件中，
+中断后重新运行同一命令即可跳过已完成的任务继续执行。
+
+清单字段: id, text, speaker, speed, encoding, output, text_type（除 text 外均可省略，
+省略时使用命令行参数的默认值；id 省略时使用行号）。
+
+用法:
+    voice-clone-batch manifest.jsonl --speaker S_xxx --output-dir output --concurrency 16
+"""
+
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, Optional, Set, TextIO, Tuple
+
+from .batch import SynthesisJob, run_jobs
+from .cache import DiskCache
+from .config import Config
+from .http import HttpClient
+from .metrics import NULL_METRICS, Metrics, PrometheusExporter
+from .sharding import SHARD_KEYS, ShardedRunner
+from .sinks import FSYNC_POLICIES, DirectorySink
+from .text import MAX_TEXT_BYTES, byte_length
+from .tts import TTSService
+
+try:
+    from dotenv import load_dotenv
+except ImportError:  # python-dotenv 为可选依赖
+    load_dotenv = None
+
+logger = logging.getLogger(__name__)
+
+ENV_PREFIX = "BYTEDANCE_"
+
+# 清单字段名 -> SynthesisJob 字段名
+MANIFEST_FIELDS = {
+    "text": "text",
+    "speaker": "speaker_id",
+    "speaker_id": "speaker_id",
+    "speed": "speed_ratio",
+    "speed_ratio": "speed_ratio",
+    "encoding": "encoding",
+    "output": "output_path",
+    "output_path": "output_path",
+    "text_type": "text_type",
+}
+
+
+def load_config(path: Optional[str] = None) -> Config:
+    """
+    读取API配置
+
+    先读取JSON配置文件（字段同 Config），再用环境变量覆盖，
+    如 BYTEDANCE_APPID、BYTEDANCE_TOKEN、BYTEDANCE_HOST、BYTEDANCE_TTS_CLUSTER。
+    当前目录下的 .env 文件会被加载到环境变量中。
+
+    Raises:
+        ValueError: 缺少 appid 或 token
+    """
+    if load_dotenv is not None:
+        load_dotenv()
+    values: Dict[str, Any] = {}
+    if path:
+        with open(path, encoding="utf-8") as f:
+            values.update(json.load(f))
+    for field in Config.__dataclass_fields__.values():
+        env_value = os.getenv(ENV_PREFIX + field.name.upper())
+        if env_value is not None:
+            values[field.name] = _parse_env(field.type, env_value)
+    for required in ("appid", "token"):
+        if not values.get(required):
+            raise ValueError(f"缺少配置 {required}，请设置环境变量 {ENV_PREFIX}{required.upper()} 或使用 --config")
+    return Config(**{key: value for key, value in values.items() if key in Config.__dataclass_fields__})
+
+
+def _parse_env(hint: Any, value: str) -> Any:
+    if hint in (int, Optional[int]):
+        return int(value)
+    if hint in (float, Optional[float]):
+        return float(value)
+    return value
+
+
+def _open_manifest(path: str) -> TextIO:
+    if path == "-":
+        return sys.stdin
+    return open(path, encoding="utf-8", newline="")
+
+
+def read_manifest(path: str, manifest_format: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    逐行读取清单，产出 (任务ID, 原始字段)
+
+    Args:
+        path: 清单路径，"-" 表示标准输入
+        manifest_format: jsonl 或 csv，默认按扩展名判断
+    """
+    manifest_format = manifest_format or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    f = _open_manifest(path)
+    try:
+        if manifest_format == "csv":
+            rows = enumerate(csv.DictReader(f), 1)
+        else:
+            rows = ((lineno, line) for lineno, line in enumerate(f, 1) if line.strip())
+        for lineno, row in rows:
+            if manifest_format != "csv":
+                try:
+                    row = json.loads(row)
+                except json.JSONDecodeError as e:
+                    row = {"_error": f"第{lineno}行不是有效的JSON: {str(e)}"}
+                if not isinstance(row, dict):
+                    row = {"_error": f"第{lineno}行不是JSON对象"}
+            row_id = str(row.get("id") or lineno)
+            yield row_id, row
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def build_job(row: Dict[str, Any], defaults: Dict[str, Any], row_id: str, output_dir: str) -> SynthesisJob:
+    """把清单中的一行转换为合成任务"""
+    if "_error" in row:
+        raise ValueError(row["_error"])
+    fields = dict(defaults)
+    for key, value in row.items():
+        if key in MANIFEST_FIELDS and value not in (None, ""):
+            fields[MANIFEST_FIELDS[key]] = value
+    if not fields.get("text"):
+        raise ValueError("缺少 text")
+    if not fields.get("speaker_id"):
+        raise ValueError("缺少 speaker，请在清单中提供或使用 --speaker")
+    fields["speed_ratio"] = float(fields.get("speed_ratio", 1.0))
+    output = fields.get("output_path") or f"{row_id}.{fields.get('encoding', 'mp3')}"
+    fields["output_path"] = os.path.join(output_dir, output)
+    return SynthesisJob(**fields)
+
+
+class Checkpoint:
+    """
+    已完成任务ID的检查点文件，每行一个ID，只追加写入
+
+    写入经过缓冲，由 flush() 定期落盘；进程崩溃时最多丢失最后一次落盘之后的记录，
+    这些任务会在下次运行时重新合成。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.completed: Set[str] = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.completed.update(line.rstrip("\n") for line in f if line.strip())
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, row_id: str) -> bool:
+        return row_id in self.completed
+
+    def add(self, row_id: str):
+        self.completed.add(row_id)
+        self._file.write(row_id + "\n")
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class Progress:
+    """定期在标准错误输出进度与吞吐"""
+
+    def __init__(self, interval: float = 1.0, stream: TextIO = sys.stderr, enabled: bool = True):
+        self.interval = interval
+        self.stream = stream
+        self.enabled = enabled
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.started = time.monotonic()
+        self._last = 0.0
+
+    def line(self) -> str:
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        return (f"完成 {self.done}  失败 {self.failed}  跳过 {self.skipped}  "
+                f"{rate:.1f} 条/秒  已用 {elapsed:.0f} 秒")
+
+    def tick(self, force: bool = False) -> bool:
+        """到达输出间隔时输出进度，返回是否已输出"""
+        now = time.monotonic()
+        if not force and now - self._last < self.interval:
+            return False
+        self._last = now
+        if self.enabled:
+            end = "\r" if self.stream.isatty() and not force else "\n"
+            print(self.line(), end=end, file=self.stream, flush=True)
+        return True
+
+
+async def run_batch(args: argparse.Namespace, config: Config) -> Progress:
+    """执行批量合成，返回最终进度统计"""
+    checkpoint = Checkpoint(args.checkpoint or f"{args.manifest}.done")
+    progress = Progress(args.progress_interval, enabled=not args.quiet)
+    failures = open(args.failures, "a", encoding="utf-8") if args.failures else None
+    metrics = Metrics(label_speaker=False) if args.metrics_file else NULL_METRICS
+    defaults = {
+        key: value for key, value in {
+            "speaker_id": args.speaker,
+            "encoding": args.encoding,
+            "speed_ratio": args.speed,
+            "text_type": args.text_type,
+        }.items() if value is not None
+    }
+    ids: Dict[int, str] = {}  # 进行中任务的序号 -> 任务ID
+    counter = itertools.count()
+
+    def record_failure(row_id: str, error: Exception):
+        progress.failed += 1
+        if failures is not None:
+            failures.write(json.dumps({"id": row_id, "error": str(error)}, ensure_ascii=False) + "\n")
+        logger.warning(f"任务 {row_id} 失败: {str(error)}")
+
+    def jobs() -> Iterator[SynthesisJob]:
+        for row_id, row in read_manifest(args.manifest, args.format):
+            if row_id in checkpoint:
+                progress.skipped += 1
+                continue
+            try:
+                job = build_job(row, defaults, row_id, args.output_dir)
+            except (ValueError, TypeError) as e:
+                record_failure(row_id, e)
+                continue
+            ids[next(counter)] = row_id
+            yield job
+
+    async with HttpClient(config, metrics=metrics) as client:
+        cache = DiskCache(args.cache_dir) if args.cache_dir else None
+        tts = TTSService(config, client=client, cache=cache, sink=DirectorySink(fsync=args.fsync))
+
+        async def handle(job: SynthesisJob) -> None:
+            await tts.synthesize_to_file(
+                text=job.text,
+                output_path=job.output_path,
+                speaker_id=job.speaker_id,
+                text_type=job.text_type,
+                encoding=job.encoding,
+                speed_ratio=job.speed_ratio,
+                long_text=byte_length(job.text) > MAX_TEXT_BYTES,
+            )
+
+        if args.workers > 1:
+            # 每个工作进程分到总并发数的一部分
+            runner = ShardedRunner(config, workers=args.workers, shard_by=args.shard_by,
+                                   concurrency=max(1, -(-args.concurrency // args.workers)),
+                                   metrics=metrics if metrics.enabled else None, cache_dir=args.cache_dir,
+                                   fsync=args.fsync)
+            results = runner.run(jobs())
+        else:
+            results = run_jobs(handle, jobs(), concurrency=args.concurrency)
+
+        try:
+            async for result in results:
+                row_id = ids.pop(result.index)
+                if result.ok:
+                    checkpoint.add(row_id)
+                    progress.done += 1
+                else:
+                    record_failure(row_id, result.error)
+                if progress.tick():
+                    # 先同步输出文件，检查点中记录的任务在崩溃后不会丢失
+                    await tts.sink.flush()
+                    checkpoint.flush()
+        finally:
+            await tts.sink.close()
+            checkpoint.close()
+            if failures is not None:
+                failures.close()
+            progress.tick(force=True)
+            if args.metrics_file:
+                PrometheusExporter(metrics).write(args.metrics_file)
+    return progress
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="voice-clone-batch", description="按清单批量合成语音，支持断点续跑")
+    parser.add_argument("manifest", help="JSONL或CSV清单路径，- 表示从标准输入读取JSONL")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="清单格式，默认按扩展名判断")
+    parser.add_argument("--config", help="JSON配置文件，字段同 Config，环境变量优先")
+    parser.add_argument("--checkpoint", help="检查点文件，默认 <清单>.done")
+    parser.add_argument("--failures", help="失败任务的记录文件（JSONL）")
+    parser.add_argument("--output-dir", default="output", help="输出目录，清单中的相对路径相对于此目录")
+    parser.add_argument("--speaker", help="默认音色ID")
+    parser.add_argument("--encoding", default="mp3", help="默认音频编码格式")
+    parser.add_argument("--speed", type=float, default=1.0, help="默认语速")
+    parser.add_argument("--text-type", default="plain", choices=["plain", "ssml"], help="默认文本类型")
+    parser.add_argument("--concurrency", type=int, default=8, help="最大并发请求数")
+    parser.add_argument("--workers", type=int, default=1, help="工作进程数，大于1时多进程分片执行")
+    parser.add_argument("--shard-by", default="text", choices=SHARD_KEYS, help="多进程时按文本或音色分片")
+    parser.add_argument("--cache-dir", help="合成结果磁盘缓存目录")
+    parser.add_argument("--fsync", default="batch", choices=FSYNC_POLICIES,
+                        help="输出文件的 fsync 策略：none 不同步，batch 分批同步，always 每个文件同步")
+    parser.add_argument("--metrics-file", help="结束时写入 Prometheus 格式的耗时指标")
+    parser.add_argument("--progress-interval", type=float, default=1.0, help="进度输出间隔（秒）")
+    parser.add_argument("--quiet", action="store_true", help="不输出进度")
+    parser.add_argument("--verbose", action="store_true", help="输出每个文件的保存日志")
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.manifest == "-" and not args.checkpoint:
+        parser.error("从标准输入读取清单时必须指定 --checkpoint")
+    logging.getLogger("core").setLevel(logging.INFO if args.verbose else logging.WARNING)
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError) as e:
+        print(f"配置错误: {str(e)}", file=sys.stderr)
+        return 2
+    try:
+        progress = asyncio.run(run_batch(args, config))
+    except KeyboardInterrupt:
+        print("\n已中断，重新运行同一命令可从检查点继续", file=sys.stderr)
+        return 130
+    return 1 if progress.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+合成请求与响应的低拷贝编解码
+
+请求体：同一凭据、音色和参数的请求除 uid、reqid 和文本外完全相同，预先序列化成字节模板，
+每次只拼接这三个字段，不再构造嵌套字典和整体序列化。
+
+响应体：音频的 base64 字符串占响应的绝大部分。直接在原始字节中定位 data 字段，只解析其余的小段JSON，
+再从原始字节的切片一次解码出音频，不经过 str、不做 ASCII 重新编码，响应只在内存中保留原始字节和解码结果两份。
+
+安装 orjson 时使用它序列化和解析JSON，否则使用标准库 json。
+"""
+
+import binascii
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+# 模板中占位的字段值，序列化后按带引号的占位符切分
+_PLACEHOLDERS = ("@@uid@@", "@@reqid@@", "@@text@@")
+
+# data 字段及其后的字符串开头；base64 字符串中没有引号，遇到转义时回退到完整解析
+_DATA_FIELD = re.compile(rb'"data"\s*:\s*"')
+_JSON_STRING = re.compile(rb'"(?:[^"\\]|\\.)*"')
+
+
+def _top_level(prefix: bytes) -> bool:
+    """prefix 之后的位置是否处于最外层对象中（而不是 addition 等嵌套对象或数组里）"""
+    structure = _JSON_STRING.sub(b"", prefix)
+    depth = structure.count(b"{") + structure.count(b"[") - structure.count(b"}") - structure.count(b"]")
+    return depth == 1
+
+
+def dumps(obj: Any) -> bytes:
+    """序列化为UTF-8编码的JSON"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class RequestTemplate:
+    """预先序列化的合成请求体，只有 uid、reqid 和文本在每次请求时拼入"""
+
+    def __init__(self, app: Dict[str, str], audio: Dict[str, Any], text_type: str, operation: str):
+        uid, reqid, text = _PLACEHOLDERS
+        body = dumps({
+            "app": app,
+            "user": {"uid": uid},
+            "audio": audio,
+            "request": {"reqid": reqid, "text": text, "text_type": text_type, "operation": operation},
+        })
+        pieces: List[bytes] = []
+        for placeholder in _PLACEHOLDERS:
+            head, body = body.split(dumps(placeholder), 1)
+            pieces.append(head)
+        pieces.append(body)
+        self._pieces = pieces
+
+    def render(self, uid: str, reqid: str, text: str) -> bytes:
+        """生成请求体，结果与按相同字段构造字典再序列化的JSON等价"""
+        head, after_uid, after_reqid, tail = self._pieces
+        # uid 和 reqid 是 uuid 字符串，不需要转义
+        return b"".join((head, b'"', uid.encode("ascii"), b'"', after_uid, b'"', reqid.encode("ascii"), b'"',
+                         after_reqid, dumps(text), tail))
+
+
+@lru_cache(maxsize=256)
+def request_template(appid: str, token: str, cluster: str, speaker_id: str, encoding: str, speed_ratio: float,
+                     text_type: str, operation: str) -> RequestTemplate:
+    """按凭据和合成参数缓存的请求模板"""
+    return RequestTemplate(
+        {"appid": appid, "token": token, "cluster": cluster},
+        {"voice_type": speaker_id, "encoding": encoding, "speed_ratio": speed_ratio},
+        text_type,
+        operation,
+    )
+
+
+def parse_response(body: bytes) -> Tuple[Dict[str, Any], Optional[memoryview]]:
+    """
+    解析合成接口的响应
+
+    Returns:
+        (除 data 外的响应字段, data 字段的 base64 字节切片，没有 data 时为 None)
+    """
+    match = _DATA_FIELD.search(body)
+    if match is not None and _top_level(body[:match.start()]):
+        start = match.end()
+        end = body.find(b'"', start)
+        if end != -1 and body.find(b"\\", start, end) == -1:
+            # 去掉 data 字段后解析其余部分；data 不一定是最后一个字段
+            head = body[:match.start()].rstrip()
+            rest = body[end + 1:].lstrip()
+            if rest.startswith(b","):
+                rest = rest[1:]
+            elif head.endswith(b","):
+                head = head[:-1]
+            try:
+                result = loads(head + rest)
+            except ValueError:
+                result = None
+            # 其余部分仍有 data 字段（重复的键）时以完整解析为准
+            if isinstance(result, dict) and "data" not in result:
+                return result, memoryview(body)[start:end]
+
+    result = loads(body)
+    if not isinstance(result, dict):
+        raise ValueError("响应不是JSON对象")
+    data = result.pop("data", None)
+    if data is None:
+        return result, None
+    return result, memoryview(data.encode("ascii"))
+
+
+def decode_audio(data: memoryview) -> bytes:
+    """从 base64 字节切片解码音频，结果一次分配到位"""
+    return binascii.a2b_base64(data)
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 @dataclass
 class Config:
@@ -7,6 +8,14 @@ class Config:
     host: str = "https://openspeech.bytedance.com"
     tts_cluster: str = "volcano_icl"  # 或 volcano_icl_concurr
     resource_id: str = "volc.megatts.voiceclone"
+    # 连接池配置
+    connection_limit: int = 100  # 连接池总连接数上限
+    connection_limit_per_host: int = 32  # 单个主机的连接数上限
+    dns_cache_ttl: int = 300  # DNS缓存时间（秒）
+    keepalive_timeout: float = 30.0  # 空闲连接保持时间（秒）
+    # 客户端限流配置，None 表示使用集群的默认配额
+    rate_limit: Optional[float] = None  # 每秒请求数
+    max_concurrency: Optional[int] = None  # 最大并发请求数
 
     def get_headers(self, use_resource_id: bool = False) -> dict:
         """获取API请求头"""
@@ -14,8 +23,8 @@ class Config:
             "Content-Type": "application/json",
             "Authorization": f"Bearer;{self.token}"
         }
-        
+
         if use_resource_id:
             headers["Resource-Id"] = self.resource_id
-            
+
         return headers
\ No newline at end of file
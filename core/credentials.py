@@ -0,0 +1,296 @@
+"""
+多凭据池
+
+一个 Config 只有一组 appid/token/集群，吞吐受单个账号的配额限制。CredentialPool 持有多组凭据，
+每个请求按权重和剩余配额选择凭据，并在本地确认音色属于该 appid；volcano_icl 集群满载时溢出到
+volcano_icl_concurr，某组凭据连续出错时暂时停用并切换到其他凭据。
+
+用法:
+    pool = CredentialPool([
+        Credential(Config(appid="111", token="..."), weight=2, speakers={"S_a", "S_b"}),
+        Credential(Config(appid="222", token="..."), speakers={"S_c"}),
+    ])
+    async with TTSService(pool) as tts:
+        audio = await tts.synthesize("你好", speaker_id="S_c")
+"""
+
+import dataclasses
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar, \
+    Union
+
+from . import errors
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 集群 -> 满载时溢出的集群
+OVERFLOW_CLUSTERS: Dict[str, str] = {"volcano_icl": "volcano_icl_concurr"}
+
+# 按剩余配额折算权重时的下限，避免满载的凭据完全不被选中而无法恢复
+_MIN_HEADROOM = 0.05
+
+
+def _counts_against_credential(error: BaseException) -> bool:
+    """是否说明这组凭据（账号、配额或集群）本身有问题，文本无效等请求错误不计入"""
+    if isinstance(error, errors.InvalidRequestError):
+        return False
+    return isinstance(error, (errors.APIError, errors.CircuitOpenError))
+
+
+class Credential:
+    """凭据池中的一组凭据，以及它的负载和错误统计"""
+
+    def __init__(self, config: Config, weight: float = 1.0, speakers: Optional[Iterable[str]] = None,
+                 overflow: bool = False):
+        """
+        Args:
+            config: API配置
+            weight: 路由权重
+            speakers: 属于该 appid 的音色ID，None 表示不限制（请求返回音色不存在后会记住）
+            overflow: 是否为溢出集群，只在主集群满载时使用
+        """
+        if weight <= 0:
+            raise ValueError("weight 必须大于0")
+        self.config = config
+        self.weight = weight
+        self.speakers = frozenset(speakers) if speakers is not None else None
+        self.overflow = overflow
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.consecutive_errors = 0
+        self.failovers = 0
+        self.disabled_until = 0.0
+        self._current = 0.0  # 平滑加权轮询的当前值
+
+    @property
+    def name(self) -> str:
+        return f"{self.config.appid}/{self.config.tts_cluster}"
+
+    def __repr__(self) -> str:
+        return f"Credential({self.name}, weight={self.weight})"
+
+    def serves(self, speaker_id: str) -> bool:
+        return self.speakers is None or speaker_id in self.speakers
+
+    def available(self, now: float) -> bool:
+        return now >= self.disabled_until
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "weight": self.weight,
+            "overflow": self.overflow,
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "failovers": self.failovers,
+            "disabled": self.disabled_until > time.monotonic(),
+        }
+
+
+class CredentialPool:
+    """
+    多凭据池
+
+    选择顺序：属于该音色的凭据中，排除已停用的，在未满载的凭据里按 权重×剩余并发比例 平滑加权轮询；
+    全部满载时使用溢出集群，仍然没有时在所有可用凭据中选择（由限流器排队）。
+    """
+
+    def __init__(
+        self,
+        credentials: Iterable[Union[Config, Credential, Tuple[Config, float]]],
+        overflow: bool = True,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        invalid_ttl: float = 300.0,
+    ):
+        """
+        Args:
+            credentials: Config、(Config, 权重) 或 Credential 的列表
+            overflow: 是否为 OVERFLOW_CLUSTERS 中的集群自动添加溢出集群
+            failure_threshold: 连续出错多少次后停用该凭据
+            cooldown: 停用时长（秒），之后重新尝试
+            invalid_ttl: 请求返回音色不存在后，多久（秒）内不再把该音色路由到这个 appid
+        """
+        self.credentials: List[Credential] = []
+        for item in credentials:
+            if isinstance(item, Config):
+                item = Credential(item)
+            elif isinstance(item, tuple):
+                item = Credential(*item)
+            self.credentials.append(item)
+        if not self.credentials:
+            raise ValueError("凭据池至少需要一组凭据")
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.invalid_ttl = invalid_ttl
+        self.overflow: List[Credential] = []
+        if overflow:
+            existing = {(c.config.appid, c.config.tts_cluster) for c in self.credentials}
+            for credential in self.credentials:
+                cluster = OVERFLOW_CLUSTERS.get(credential.config.tts_cluster)
+                if cluster is None or (credential.config.appid, cluster) in existing:
+                    continue
+                existing.add((credential.config.appid, cluster))
+                self.overflow.append(Credential(dataclasses.replace(credential.config, tts_cluster=cluster),
+                                                credential.weight, credential.speakers, overflow=True))
+        # 请求返回音色不存在的 (appid, speaker_id) -> 过期时间；音色之后可能被上传训练，所以不永久记住
+        self._invalid: Dict[Tuple[str, str], float] = {}
+
+    @property
+    def config(self) -> Config:
+        """主凭据的配置，用于主机地址、连接池和缓存键等与账号无关的设置"""
+        return self.credentials[0].config
+
+    def mark_invalid(self, appid: str, speaker_id: str):
+        """记录音色不属于该 appid，invalid_ttl 秒内不再路由到这组凭据"""
+        self._invalid[(appid, speaker_id)] = time.monotonic() + self.invalid_ttl
+
+    def mark_valid(self, appid: str, speaker_id: str):
+        """训练或状态查询确认音色属于该 appid 后，立即恢复路由"""
+        self._invalid.pop((appid, speaker_id), None)
+
+    def is_invalid(self, appid: str, speaker_id: str) -> bool:
+        key = (appid, speaker_id)
+        expires = self._invalid.get(key)
+        if expires is None:
+            return False
+        if time.monotonic() >= expires:
+            del self._invalid[key]
+            return False
+        return True
+
+    def _eligible(self, credentials: Sequence[Credential], speaker_id: str,
+                  exclude: Sequence[Credential], check_invalid: bool = True) -> List[Credential]:
+        return [
+            c for c in credentials
+            if c.serves(speaker_id) and c not in exclude
+            and not (check_invalid and self.is_invalid(c.config.appid, speaker_id))
+        ]
+
+    def has_candidate(self, speaker_id: str, exclude: Sequence[Credential] = (), check_invalid: bool = True) -> bool:
+        """是否还有未停用、可用于该音色的凭据"""
+        now = time.monotonic()
+        return any(c.available(now) for c in self._eligible(self.credentials, speaker_id, exclude, check_invalid))
+
+    def select(self, client, speaker_id: str, exclude: Sequence[Credential] = (), overflow: bool = True,
+               check_invalid: bool = True) -> Credential:
+        """
+        为请求选择凭据
+
+        Args:
+            client: 发送请求的 HttpClient，用它的限流器判断剩余配额
+            speaker_id: 音色ID
+            exclude: 本次请求已经失败过的凭据
+            overflow: 是否允许使用溢出集群
+            check_invalid: 是否排除近期返回过音色不存在的 appid；训练和状态查询不排除
+
+        Raises:
+            SpeakerNotFoundError: 没有凭据拥有该音色，不发起请求
+        """
+        candidates = self._eligible(self.credentials, speaker_id, exclude, check_invalid)
+        if not candidates:
+            raise errors.SpeakerNotFoundError(f"凭据池中没有可用于音色 {speaker_id} 的 appid")
+
+        now = time.monotonic()
+        healthy = [c for c in candidates if c.available(now)]
+        if not healthy:
+            # 全部停用时选择最早恢复的一组，不直接失败
+            healthy = [min(candidates, key=lambda c: c.disabled_until)]
+
+        def headroom(credential: Credential) -> float:
+            return client.limiter_for(credential.config, credential.config.tts_cluster).headroom
+
+        choices = [c for c in healthy if headroom(c) > 0]
+        if not choices and overflow:
+            appids = {c.config.appid for c in healthy}
+            choices = [
+                c for c in self._eligible(self.overflow, speaker_id, exclude, check_invalid)
+                if c.config.appid in appids and c.available(now) and headroom(c) > 0
+            ]
+        return self._pick(choices or healthy, headroom)
+
+    def _pick(self, choices: List[Credential], headroom: Callable[[Credential], float]) -> Credential:
+        """平滑加权轮询，权重按剩余并发比例折算"""
+        weights = [c.weight * max(headroom(c), _MIN_HEADROOM) for c in choices]
+        total = sum(weights)
+        for credential, weight in zip(choices, weights):
+            credential._current += weight
+        chosen = max(choices, key=lambda c: c._current)
+        chosen._current -= total
+        return chosen
+
+    def _record(self, credential: Credential, error: Optional[BaseException]):
+        credential.in_flight -= 1
+        if error is None or not _counts_against_credential(error):
+            credential.consecutive_errors = 0
+            return
+        credential.errors += 1
+        credential.consecutive_errors += 1
+        if credential.consecutive_errors >= self.failure_threshold:
+            credential.disabled_until = time.monotonic() + self.cooldown
+            credential.consecutive_errors = 0
+            logger.warning(f"凭据 {credential.name} 连续出错，停用 {self.cooldown:.0f} 秒: {str(error)}")
+
+    @asynccontextmanager
+    async def lease(self, client, speaker_id: str, exclude: Sequence[Credential] = (),
+                    overflow: bool = True, check_invalid: bool = True) -> AsyncIterator[Credential]:
+        """选择凭据并记录这次使用的结果"""
+        credential = self.select(client, speaker_id, exclude, overflow, check_invalid)
+        credential.requests += 1
+        credential.in_flight += 1
+        try:
+            yield credential
+        except BaseException as e:
+            self._record(credential, e)
+            if isinstance(e, errors.SpeakerNotFoundError):
+                self.mark_invalid(credential.config.appid, speaker_id)
+            raise
+        self._record(credential, None)
+
+    async def call(
+        self,
+        client,
+        speaker_id: str,
+        func: Callable[[Config], Awaitable[T]],
+        failover: bool = True,
+        overflow: bool = True,
+        check_invalid: bool = True,
+    ) -> T:
+        """
+        用选中的凭据执行 func(config)
+
+        凭据本身出错（鉴权、限流、服务端或网络错误）或音色不属于该 appid 时，
+        切换到其他未停用的凭据重试，直到没有可用的凭据。
+
+        Args:
+            client: 发送请求的 HttpClient
+            speaker_id: 音色ID
+            func: 以凭据的 Config 发起请求的协程函数
+            failover: 是否在出错时切换凭据；有副作用的请求（如上传训练音频）应关闭
+            overflow: 是否允许使用溢出集群
+            check_invalid: 是否排除近期返回过音色不存在的 appid
+        """
+        tried: List[Credential] = []
+        while True:
+            credential = None
+            try:
+                async with self.lease(client, speaker_id, tried, overflow, check_invalid) as credential:
+                    return await func(credential.config)
+            except Exception as e:
+                retry = isinstance(e, errors.SpeakerNotFoundError) or _counts_against_credential(e)
+                if credential is None or not failover or not retry:
+                    raise
+                tried.append(credential)
+                if not self.has_candidate(speaker_id, tried, check_invalid):
+                    raise
+                credential.failovers += 1
+                logger.warning(f"凭据 {credential.name} 请求失败，切换到其他凭据: {str(e)}")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {credential.name: credential.stats() for credential in self.credentials + self.overflow}
@@ -0,0 +1,259 @@
+"""
+常驻合成进程
+
+长期持有已预热的 TTSService / VoiceCloningService、连接池和缓存，通过本地 Unix 套接字接收任务，
+省去每次调用时启动解释器、导入 aiohttp、创建SSL上下文和建立新连接的开销。
+协议见 core.daemon_client，客户端命令为 voice-clone-client。
+
+请求（op 字段）:
+    ping    返回 {"ok": true}
+    stats   返回连接池、限流器和缓存的统计
+    tts     字段同 TTSService.synthesize；带 output 时写入文件并返回 path，否则以二进制数据返回音频
+    status  查询音色训练状态，返回 result
+
+运行:
+    voice-clone-daemon --socket /run/user/1000/voice-clone.sock --cache-size 256
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import stat
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+from .config import Config
+from .daemon_client import FRAME_HEADER, UNIX_SOCKETS, UNSUPPORTED_MESSAGE, decode_header, default_socket_path, \
+    encode_frame
+from .http import HttpClient
+from .text import MAX_TEXT_BYTES, byte_length
+from .tts import TTSService
+from .voice_cloning import VoiceCloningService
+
+logger = logging.getLogger(__name__)
+
+
+def _socket_in_use(path: str) -> bool:
+    """套接字文件是否有进程在监听"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+class Daemon:
+    """
+    常驻合成进程
+
+    用法:
+        daemon = Daemon(config, socket_path="/tmp/voice-clone.sock")
+        await daemon.start()
+        await daemon.serve_forever()
+    """
+
+    def __init__(self, config: Config, socket_path: Optional[str] = None, max_concurrency: int = 32,
+                 client: Optional[HttpClient] = None):
+        """
+        Args:
+            config: API配置
+            socket_path: 监听的套接字路径，默认 default_socket_path()
+            max_concurrency: 同时处理的最大请求数，超出的请求在连接上等待
+            client: 共享的HTTP客户端，不传则自行创建并负责关闭
+        """
+        self.config = config
+        self.socket_path = socket_path or default_socket_path()
+        self._owns_client = client is None
+        self.client = client or HttpClient(config)
+        self.tts = TTSService(config, client=self.client)
+        self.cloning = VoiceCloningService(config, client=self.client)
+        self.requests = 0
+        self.errors = 0
+        self.max_concurrency = max_concurrency
+        # Python 3.9 及以下创建时就绑定事件循环，在 start() 中（asyncio.run 启动的循环内）创建
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, warm: bool = True):
+        """
+        开始监听
+
+        Args:
+            warm: 是否预先建立到服务端的连接
+
+        Raises:
+            RuntimeError: 已有其他进程在监听同一个套接字，或当前平台不支持 Unix 套接字
+        """
+        if not UNIX_SOCKETS:
+            raise RuntimeError(UNSUPPORTED_MESSAGE)
+        if os.path.exists(self.socket_path):
+            if not stat.S_ISSOCK(os.stat(self.socket_path).st_mode):
+                raise RuntimeError(f"{self.socket_path} 已存在且不是套接字")
+            if _socket_in_use(self.socket_path):
+                raise RuntimeError(f"已有常驻进程在监听 {self.socket_path}")
+            # 上次异常退出残留的套接字文件
+            os.unlink(self.socket_path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), exist_ok=True)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._stopped = asyncio.Event()
+        # 只允许当前用户连接
+        old_umask = os.umask(0o177)
+        try:
+            self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        finally:
+            os.umask(old_umask)
+        if warm:
+            await self.client.warm()
+        logger.info(f"常驻进程已启动: {self.socket_path}")
+
+    async def serve_forever(self):
+        """处理请求，直到调用 stop()"""
+        if self._stopped is None:
+            raise RuntimeError("常驻进程尚未启动")
+        await self._stopped.wait()
+
+    def stop(self):
+        if self._stopped is not None:
+            self._stopped.set()
+
+    async def close(self):
+        """停止监听并释放连接池"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        await self.tts.close()
+        if self._owns_client:
+            await self.client.close()
+
+    async def __aenter__(self) -> "Daemon":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    prefix = await reader.readexactly(FRAME_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break  # 客户端关闭连接
+                header_size, payload_size = decode_header(prefix)
+                request = await reader.readexactly(header_size)
+                payload = await reader.readexactly(payload_size) if payload_size else b""
+                response, data = await self._dispatch(request, payload)
+                writer.write(encode_frame(response, data))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            logger.warning(f"客户端连接异常: {str(e)}")
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request: bytes, payload: bytes) -> Tuple[Dict[str, Any], bytes]:
+        self.requests += 1
+        try:
+            fields = json.loads(request)
+            if not isinstance(fields, dict):
+                raise ValueError("请求必须是JSON对象")
+            async with self._semaphore:
+                return await self.handle(fields.pop("op", None), fields, payload)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"请求处理失败: {str(e)}")
+            return {"ok": False, "error": str(e), "type": type(e).__name__}, b""
+
+    async def handle(self, op: Optional[str], fields: Dict[str, Any], payload: bytes) -> Tuple[Dict[str, Any], bytes]:
+        """处理一个请求，返回 (响应字段, 二进制数据)"""
+        if op == "ping":
+            return {"ok": True}, b""
+        if op == "stats":
+            return {"ok": True, "stats": self.stats()}, b""
+        if op == "status":
+            if not fields.get("speaker_id"):
+                raise ValueError("缺少 speaker_id")
+            return {"ok": True, "result": await self.cloning.get_status(fields["speaker_id"])}, b""
+        if op == "tts":
+            return await self._synthesize(fields)
+        raise ValueError(f"未知的请求类型: {op}")
+
+    async def _synthesize(self, fields: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        for required in ("text", "speaker_id"):
+            if not fields.get(required):
+                raise ValueError(f"缺少 {required}")
+        params = {
+            "text": fields["text"],
+            "speaker_id": fields["speaker_id"],
+            "text_type": fields.get("text_type", "plain"),
+            "encoding": fields.get("encoding", "mp3"),
+            "speed_ratio": float(fields.get("speed_ratio", 1.0)),
+        }
+        long_text = byte_length(params["text"]) > MAX_TEXT_BYTES
+        output = fields.get("output")
+        if output:
+            await self.tts.synthesize_to_file(output_path=output, long_text=long_text, **params)
+            return {"ok": True, "path": output}, b""
+        if long_text:
+            audio_data = await self.tts.synthesize_long(**params)
+        else:
+            audio_data = await self.tts.synthesize(**params)
+        return {"ok": True, "size": len(audio_data)}, audio_data
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "cache": self.tts.cache_stats(),
+            "resilience": self.client.resilience.stats(),
+            "rate_limiters": self.client.rate_limiters.stats(),
+        }
+
+
+async def _serve(daemon: Daemon):
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, daemon.stop)
+    await daemon.start()
+    try:
+        await daemon.serve_forever()
+    finally:
+        await daemon.close()
+
+
+def main(argv=None) -> int:
+    from .cli import load_config
+
+    parser = argparse.ArgumentParser(prog="voice-clone-daemon", description="常驻合成进程，通过Unix套接字接收任务")
+    parser.add_argument("--config", help="JSON配置文件，字段同 Config，环境变量优先")
+    parser.add_argument("--socket", help="监听的套接字路径，默认读取环境变量 VOICE_CLONE_SOCKET")
+    parser.add_argument("--max-concurrency", type=int, default=32, help="同时处理的最大请求数")
+    parser.add_argument("--cache-size", type=int, default=64, help="进程内缓存大小（MB），0 表示关闭")
+    args = parser.parse_args(argv)
+
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError) as e:
+        print(f"配置错误: {str(e)}", file=sys.stderr)
+        return 2
+    daemon = Daemon(config, args.socket, max_concurrency=args.max_concurrency)
+    if args.cache_size:
+        daemon.tts.enable_memory_cache(max_bytes=args.cache_size * 1024 ** 2)
+    try:
+        asyncio.run(_serve(daemon))
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""
+常驻合成进程的客户端
+
+只依赖标准库，启动时不加载 aiohttp，适合脚本和定时任务频繁调用：
+合成请求通过本地 Unix 套接字交给已预热的 voice-clone-daemon 执行。
+
+协议: 每个帧为 8 字节头（大端序的JSON长度、数据长度）+ UTF-8 JSON + 二进制数据。
+请求与响应一一对应，同一连接上可以连续发送多个请求。
+
+用法:
+    voice-clone-client "你好" --speaker S_xxx -o output/hello.mp3
+    echo "你好" | voice-clone-client - --speaker S_xxx > hello.mp3
+"""
+
+import argparse
+import json
+import os
+import socket
+import struct
+import sys
+from typing import Any, Dict, Optional, Tuple, Union
+
+FRAME_HEADER = struct.Struct(">II")
+# 单个帧JSON部分的上限，防止异常数据导致一次分配过多内存
+MAX_HEADER_BYTES = 1024 ** 2
+SOCKET_ENV = "VOICE_CLONE_SOCKET"
+# Windows 上的 Python 不提供 Unix 套接字，常驻进程只支持 Linux 和 macOS
+UNIX_SOCKETS = hasattr(socket, "AF_UNIX")
+UNSUPPORTED_MESSAGE = "当前平台不支持 Unix 套接字，常驻进程仅支持 Linux 和 macOS"
+
+
+class DaemonError(Exception):
+    """常驻进程返回的错误"""
+
+    def __init__(self, message: str, error_type: Optional[str] = None):
+        super().__init__(message)
+        self.error_type = error_type  # 服务端的异常类名，如 ThrottledError
+
+
+def default_socket_path() -> str:
+    """默认套接字路径：环境变量 VOICE_CLONE_SOCKET，其次为用户的运行时目录"""
+    path = os.getenv(SOCKET_ENV)
+    if path:
+        return path
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "voice-clone.sock")
+    user = os.getuid() if hasattr(os, "getuid") else os.getenv("USERNAME", "user")
+    return os.path.join("/tmp", f"voice-clone-{user}.sock")
+
+
+def encode_frame(header: Dict[str, Any], payload: bytes = b"") -> bytes:
+    """编码一个帧"""
+    body = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return FRAME_HEADER.pack(len(body), len(payload)) + body + payload
+
+
+def decode_header(prefix: bytes) -> Tuple[int, int]:
+    """解析帧头，返回 (JSON长度, 数据长度)"""
+    header_size, payload_size = FRAME_HEADER.unpack(prefix)
+    if header_size > MAX_HEADER_BYTES:
+        raise ValueError(f"帧头过大: {header_size} 字节")
+    return header_size, payload_size
+
+
+class DaemonClient:
+    """
+    同步的常驻进程客户端
+
+    用法:
+        with DaemonClient() as client:
+            audio = client.synthesize("你好", speaker_id="S_xxx")
+            path = client.synthesize("你好", speaker_id="S_xxx", output_path="output/hello.mp3")
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: Optional[float] = 300.0):
+        """
+        Args:
+            socket_path: 套接字路径，默认 default_socket_path()
+            timeout: 单次请求的超时时间（秒），None 表示不超时
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+
+    def connect(self):
+        if self._sock is None:
+            if not UNIX_SOCKETS:
+                raise ConnectionError(UNSUPPORTED_MESSAGE)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._sock = sock
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self) -> "DaemonClient":
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _read_exactly(self, size: int) -> bytes:
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            count = self._sock.recv_into(view[received:])
+            if not count:
+                raise ConnectionError("常驻进程关闭了连接")
+            received += count
+        return bytes(buffer)
+
+    def request(self, op: str, payload: bytes = b"", **fields) -> Tuple[Dict[str, Any], bytes]:
+        """
+        发送一个请求并等待响应
+
+        Returns:
+            (响应字段, 二进制数据)
+
+        Raises:
+            DaemonError: 常驻进程处理失败
+        """
+        self.connect()
+        try:
+            self._sock.sendall(encode_frame(dict(fields, op=op), payload))
+            header_size, payload_size = decode_header(self._read_exactly(FRAME_HEADER.size))
+            header = json.loads(self._read_exactly(header_size))
+            data = self._read_exactly(payload_size) if payload_size else b""
+        except BaseException:
+            # 连接上可能残留未读完的数据，不再复用
+            self.close()
+            raise
+        if not header.get("ok"):
+            raise DaemonError(header.get("error", "未知错误"), header.get("type"))
+        return header, data
+
+    def ping(self) -> Dict[str, Any]:
+        return self.request("ping")[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return self.request("stats")[0]["stats"]
+
+    def synthesize(
+        self,
+        text: str,
+        speaker_id: str,
+        output_path: Optional[str] = None,
+        text_type: str = "plain",
+        encoding: str = "mp3",
+        speed_ratio: float = 1.0,
+    ) -> Union[bytes, str]:
+        """
+        合成语音
+
+        Args:
+            output_path: 输出路径，由常驻进程直接写入文件并返回绝对路径；不传则返回音频数据
+            其余参数同 TTSService.synthesize
+
+        Returns:
+            音频数据，或写入文件的绝对路径
+        """
+        fields = {
+            "text": text,
+            "speaker_id": speaker_id,
+            "text_type": text_type,
+            "encoding": encoding,
+            "speed_ratio": speed_ratio,
+        }
+        if output_path:
+            # 常驻进程的工作目录可能不同，传绝对路径
+            fields["output"] = os.path.abspath(output_path)
+        header, data = self.request("tts", **fields)
+        return header["path"] if output_path else data
+
+    def status(self, speaker_id: str) -> Dict[str, Any]:
+        """查询音色训练状态"""
+        return self.request("status", speaker_id=speaker_id)[0]["result"]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="voice-clone-client", description="通过常驻进程合成语音")
+    parser.add_argument("text", nargs="?", help="要合成的文本，- 表示从标准输入读取")
+    parser.add_argument("--socket", help=f"套接字路径，默认读取环境变量 {SOCKET_ENV}")
+    parser.add_argument("--speaker", help="音色ID")
+    parser.add_argument("-o", "--output", help="输出文件，不指定时把音频写到标准输出")
+    parser.add_argument("--encoding", default="mp3", help="音频编码格式")
+    parser.add_argument("--speed", type=float, default=1.0, help="语速")
+    parser.add_argument("--text-type", default="plain", choices=["plain", "ssml"], help="文本类型")
+    parser.add_argument("--status", metavar="SPEAKER", help="查询音色训练状态")
+    parser.add_argument("--ping", action="store_true", help="检查常驻进程是否在运行")
+    args = parser.parse_args(argv)
+
+    try:
+        with DaemonClient(args.socket) as client:
+            if args.ping:
+                print(json.dumps(client.ping(), ensure_ascii=False))
+                return 0
+            if args.status:
+                print(json.dumps(client.status(args.status), ensure_ascii=False))
+                return 0
+            if not args.text or not args.speaker:
+                parser.error("合成时需要提供文本和 --speaker")
+            text = sys.stdin.read() if args.text == "-" else args.text
+            result = client.synthesize(text.strip(), args.speaker, args.output, args.text_type,
+                                       args.encoding, args.speed)
+    except OSError as e:
+        # 包括连接失败和 socket.timeout 等通信错误
+        print(f"无法连接常驻进程（{str(e) or type(e).__name__}），请先运行 voice-clone-daemon", file=sys.stderr)
+        return 2
+    except DaemonError as e:
+        print(f"合成失败: {str(e)}", file=sys.stderr)
+        return 1
+
+    if args.output:
+        print(result)
+    else:
+        sys.stdout.buffer.write(result)
+        sys.stdout.buffer.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""接口错误类型"""
+
+import asyncio
+from typing import Optional
+
+import aiohttp
+
+
+class VoiceCloneError(Exception):
+    """本项目所有错误的基类"""
+
+
+class APIError(VoiceCloneError):
+    """接口返回的错误"""
+    retryable = False
+
+    def __init__(self, message: str, status: Optional[int] = None, code: Optional[int] = None):
+        super().__init__(message)
+        self.status = status  # HTTP状态码
+        self.code = code  # 业务错误码
+
+
+class InvalidRequestError(APIError):
+    """请求参数或文本无效，重试不会成功"""
+
+
+class AuthError(APIError):
+    """鉴权失败"""
+
+
+class SsmlError(InvalidRequestError, ValueError):
+    """SSML 无效（本地校验失败）"""
+
+
+class SpeakerNotFoundError(InvalidRequestError):
+    """音色不存在"""
+
+
+class SpeakerNotReadyError(InvalidRequestError):
+    """音色训练中或训练失败，暂不能用于合成"""
+
+
+class RetryableError(APIError):
+    """可重试的错误"""
+    retryable = True
+
+
+class ThrottledError(RetryableError):
+    """请求被限流（并发或QPS超限）"""
+
+
+class ServerError(RetryableError):
+    """服务端繁忙、超时或内部错误"""
+
+
+class NetworkError(RetryableError):
+    """连接失败、连接中断或请求超时"""
+
+
+class CircuitOpenError(VoiceCloneError):
+    """熔断器打开，主机暂时不可用"""
+
+
+class TrainingFailedError(VoiceCloneError):
+    """音色训练失败"""
+
+
+# 语音合成接口的业务错误码
+TTS_ERROR_CODES = {
+    3001: InvalidRequestError,  # 无效的请求
+    3003: ThrottledError,  # 并发超限
+    3005: ServerError,  # 后端服务忙
+    3006: ServerError,  # 服务中断
+    3010: InvalidRequestError,  # 文本长度超限
+    3011: InvalidRequestError,  # 无效文本
+    3030: ServerError,  # 处理超时
+    3031: ServerError,  # 处理错误
+    3032: ServerError,  # 等待获取音频超时
+    3040: ServerError,  # 后端链路连接错误
+    3050: SpeakerNotFoundError,  # 音色不存在
+}
+
+
+def from_tts_code(code: Optional[int], message: str) -> APIError:
+    """根据合成接口的业务错误码构造异常"""
+    error_class = TTS_ERROR_CODES.get(code, APIError)
+    return error_class(message, status=200, code=code)
+
+
+def from_http_status(status: int, message: str) -> APIError:
+    """根据HTTP状态码构造异常"""
+    if status == 429:
+        return ThrottledError(message, status=status)
+    if status in (401, 403):
+        return AuthError(message, status=status)
+    if status >= 500:
+        return ServerError(message, status=status)
+    return InvalidRequestError(message, status=status)
+
+
+def classify(error: BaseException) -> BaseException:
+    """把底层网络异常转换为 NetworkError，其余异常原样返回"""
+    if isinstance(error, APIError):
+        return error
+    if isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)):
+        network_error = NetworkError(f"网络错误: {type(error).__name__}: {error}")
+        network_error.__cause__ = error
+        return network_error
+    return error
+
+
+def is_retryable(error: BaseException) -> bool:
+    return isinstance(error, RetryableError)
@@ -0,0 +1,322 @@
+"""
+语音合成网关服务
+
+把 TTSService 以HTTP接口的形式提供给多个内部服务使用，所有请求共享同一个连接池、限流器和缓存。
+请求先经过有界队列：排队已满时返回429，排队超时或熔断时返回503；相同参数的并发请求只向上游合成一次。
+
+接口:
+    POST /v1/tts    请求体 {"text", "speaker_id", "text_type", "encoding", "speed_ratio", "stream"}，返回音频流
+    GET  /healthz   健康检查与队列状态
+    GET  /metrics   Prometheus 格式的指标
+
+运行:
+    voice-clone-gateway --port 8000 --max-concurrency 32 --max-queue 256
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from aiohttp import web
+
+from . import errors
+from .cache import SingleFlight, cache_key
+from .config import Config
+from .http import HttpClient
+from .metrics import Metrics, PrometheusExporter
+from .text import MAX_TEXT_BYTES, byte_length
+from .tts import TTSService
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    "mp3": "audio/mpeg",
+    "wav": "audio/wav",
+    "ogg_opus": "audio/ogg",
+    "pcm": "application/octet-stream",
+}
+
+RESPONSE_CHUNK_SIZE = 64 * 1024
+
+
+class GatewayError(Exception):
+    """需要以指定HTTP状态码返回给调用方的错误"""
+
+    def __init__(self, status: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class Admission:
+    """
+    有界请求队列
+
+    最多 max_concurrency 个请求同时执行，另有最多 max_queue 个请求排队；
+    队列已满时立即拒绝（429），排队超过 queue_timeout 秒时放弃（503）。
+    """
+
+    def __init__(self, max_concurrency: int = 32, max_queue: int = 256, queue_timeout: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # main() 在 web.run_app 启动事件循环之前创建网关，Python 3.9 及以下的信号量创建时就绑定事件循环，
+        # 所以在第一次请求时创建
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if not self._semaphore.locked():
+            # 有空闲名额时立即获得，不会挂起
+            await self._semaphore.acquire()
+        elif self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise GatewayError(429, "请求队列已满", retry_after=1)
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise GatewayError(503, "排队超时", retry_after=self.queue_timeout)
+            finally:
+                self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": self.active,
+            "queued": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+def _error_status(error: BaseException) -> int:
+    """把合成错误映射为返回给调用方的HTTP状态码"""
+    if isinstance(error, errors.SpeakerNotFoundError):
+        return 404
+    if isinstance(error, (errors.InvalidRequestError, ValueError)):
+        return 400
+    if isinstance(error, errors.ThrottledError):
+        return 429
+    if isinstance(error, errors.CircuitOpenError):
+        return 503
+    return 502
+
+
+class Gateway:
+    """
+    语音合成网关
+
+    用法:
+        gateway = Gateway(config, max_concurrency=32, max_queue=256)
+        web.run_app(gateway.app(), port=8000)
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        tts: Optional[TTSService] = None,
+        max_concurrency: int = 32,
+        max_queue: int = 256,
+        queue_timeout: float = 30.0,
+    ):
+        """
+        Args:
+            config: API配置
+            tts: 使用的合成服务，不传则创建带耗时指标的共享客户端
+            max_concurrency: 同时向上游合成的最大请求数
+            max_queue: 最大排队请求数，超出时返回429
+            queue_timeout: 最长排队时间（秒），超出时返回503
+        """
+        self.config = config
+        self._owns_tts = tts is None
+        self.tts = tts or TTSService(config, client=HttpClient(config, metrics=Metrics(label_speaker=False)))
+        self.admission = Admission(max_concurrency, max_queue, queue_timeout)
+        self.flights = SingleFlight()
+        self.requests = 0
+        self.draining = False
+
+    def _parse(self, body: Any) -> Dict[str, Any]:
+        if not isinstance(body, dict):
+            raise GatewayError(400, "请求体必须是JSON对象")
+        text = body.get("text")
+        speaker_id = body.get("speaker_id") or body.get("speaker")
+        if not text or not isinstance(text, str):
+            raise GatewayError(400, "缺少 text")
+        if not speaker_id:
+            raise GatewayError(400, "缺少 speaker_id")
+        encoding = body.get("encoding", "mp3")
+        if encoding not in CONTENT_TYPES:
+            raise GatewayError(400, f"不支持的音频编码格式: {encoding}")
+        try:
+            speed_ratio = float(body.get("speed_ratio", body.get("speed", 1.0)))
+        except (TypeError, ValueError):
+            raise GatewayError(400, "speed_ratio 必须是数字")
+        return {
+            "text": text,
+            "speaker_id": speaker_id,
+            "text_type": body.get("text_type", "plain"),
+            "encoding": encoding,
+            "speed_ratio": speed_ratio,
+        }
+
+    async def _synthesize(self, params: Dict[str, Any]) -> bytes:
+        async with self.admission.slot():
+            if byte_length(params["text"]) > MAX_TEXT_BYTES:
+                return await self.tts.synthesize_long(**params)
+            return await self.tts.synthesize(**params)
+
+    async def _chunks(self, params: Dict[str, Any], stream: bool) -> AsyncIterator[bytes]:
+        """产出返回给调用方的音频片段"""
+        if stream and byte_length(params["text"]) <= MAX_TEXT_BYTES:
+            # 流式合成边合成边返回，首包延迟最低，但不参与请求合并
+            async with self.admission.slot():
+                async for chunk in self.tts.synthesize_stream(**params):
+                    yield chunk
+            return
+        key = cache_key(params["speaker_id"], params["text"], params["text_type"], params["encoding"],
+                        params["speed_ratio"], self.config.tts_cluster)
+        audio = await self.flights.do(key, lambda: self._synthesize(params))
+        view = memoryview(audio)
+        for start in range(0, len(view), RESPONSE_CHUNK_SIZE):
+            yield view[start:start + RESPONSE_CHUNK_SIZE]
+
+    async def handle_tts(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        if self.draining:
+            return self._error(GatewayError(503, "服务正在停止"))
+        try:
+            body = await request.json()
+        except ValueError:
+            return self._error(GatewayError(400, "请求体不是有效的JSON"))
+
+        try:
+            params = self._parse(body)
+        except GatewayError as e:
+            return self._error(e)
+
+        response = None
+        chunks = self._chunks(params, bool(body.get("stream")))
+        try:
+            # 拿到第一个片段后再发送响应头，之前的错误仍可以返回对应的状态码
+            first = await chunks.__anext__()
+            response = web.StreamResponse(headers={"Content-Type": CONTENT_TYPES[params["encoding"]]})
+            await response.prepare(request)
+            await response.write(first)
+            async for chunk in chunks:
+                await response.write(chunk)
+            await response.write_eof()
+            return response
+        except StopAsyncIteration:
+            return self._error(GatewayError(502, "上游没有返回音频"))
+        except GatewayError as e:
+            return self._error(e)
+        except Exception as e:
+            if response is not None:
+                # 响应头已发出，只能中断连接
+                logger.error(f"音频发送中断: {str(e)}")
+                raise
+            logger.warning(f"合成失败: {str(e)}")
+            return self._error(GatewayError(_error_status(e), str(e)))
+        finally:
+            # 提前结束时释放生成器占用的排队名额
+            await chunks.aclose()
+
+    def _error(self, error: GatewayError) -> web.Response:
+        headers = {"Retry-After": str(int(error.retry_after))} if error.retry_after else None
+        self.tts.client.metrics.inc("voice_clone_gateway_errors_total", status=str(error.status))
+        return web.json_response({"error": str(error)}, status=error.status, headers=headers)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "admission": self.admission.stats(),
+            "dedup": self.flights.stats(),
+            "resilience": self.tts.client.resilience.stats(),
+            "rate_limiters": self.tts.client.rate_limiters.stats(),
+        }
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        status = "draining" if self.draining else "ok"
+        return web.json_response(dict(self.stats(), status=status), status=503 if self.draining else 200)
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        gauges = {
+            "voice_clone_gateway_active_requests": self.admission.active,
+            "voice_clone_gateway_queued_requests": self.admission.waiting,
+            "voice_clone_gateway_requests_total": self.requests,
+            "voice_clone_gateway_rejected_total": self.admission.rejected,
+            "voice_clone_gateway_queue_timeouts_total": self.admission.timed_out,
+            "voice_clone_gateway_dedup_shared_total": self.flights.shared,
+        }
+        lines = [PrometheusExporter(self.tts.client.metrics).render().rstrip("\n")]
+        for name, value in gauges.items():
+            kind = "counter" if name.endswith("_total") else "gauge"
+            lines.append(f"# TYPE {name} {kind}\n{name} {value}")
+        return web.Response(text="\n".join(line for line in lines if line) + "\n",
+                            content_type="text/plain", charset="utf-8")
+
+    async def _on_shutdown(self, app: web.Application):
+        self.draining = True
+
+    async def _on_cleanup(self, app: web.Application):
+        if self._owns_tts:
+            await self.tts.close()
+            await self.tts.client.close()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/tts", self.handle_tts)
+        app.router.add_get("/healthz", self.handle_health)
+        app.router.add_get("/metrics", self.handle_metrics)
+        app.on_shutdown.append(self._on_shutdown)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+
+def main(argv=None) -> int:
+    from .cli import load_config
+
+    parser = argparse.ArgumentParser(prog="voice-clone-gateway", description="语音合成网关服务")
+    parser.add_argument("--config", help="JSON配置文件，字段同 Config，环境变量优先")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-concurrency", type=int, default=32, help="同时向上游合成的最大请求数")
+    parser.add_argument("--max-queue", type=int, default=256, help="最大排队请求数")
+    parser.add_argument("--queue-timeout", type=float, default=30.0, help="最长排队时间（秒）")
+    parser.add_argument("--cache-size", type=int, default=256, help="进程内缓存大小（MB），0 表示关闭")
+    args = parser.parse_args(argv)
+
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError) as e:
+        print(f"配置错误: {str(e)}", file=sys.stderr)
+        return 2
+    gateway = Gateway(config, max_concurrency=args.max_concurrency,
+                      max_queue=args.max_queue, queue_timeout=args.queue_timeout)
+    if args.cache_size:
+        gateway.tts.enable_memory_cache(max_bytes=args.cache_size * 1024 ** 2, dedup=False)
+    web.run_app(gateway.app(), host=args.host, port=args.port, access_log=None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
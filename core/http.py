@@ -0,0 +1,120 @@
+import asyncio
+import ssl
+from typing import Optional
+import aiohttp
+import logging
+from .config import Config
+from .metrics import NULL_METRICS, Metrics
+from .ratelimit import AdaptiveLimiter, RateLimiterRegistry
+from .resilience import Resilience
+
+logger = logging.getLogger(__name__)
+
+
+def create_ssl_context() -> ssl.SSLContext:
+    """创建不校验证书的SSL上下文（与服务端当前的证书配置保持一致）"""
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+    return ssl_context
+
+
+class HttpClient:
+    """
+    长连接HTTP客户端
+
+    在多个服务之间共享同一个连接池，复用TCP/TLS连接、DNS缓存和SSL上下文，
+    避免每个请求都重新握手。会话在首次使用时于当前事件循环中创建。
+    共享同一客户端的服务也共享重试、熔断等弹性策略，以及按 (appid, cluster) 区分的限流器。
+    传入 metrics 时记录每个请求各阶段的耗时，不传时不安装跟踪钩子，几乎没有额外开销。
+
+    用法:
+        async with HttpClient(config) as client:
+            tts = TTSService(config, client=client)
+            cloning = VoiceCloningService(config, client=client)
+    """
+
+    def __init__(self, config: Config, resilience: Optional[Resilience] = None, metrics: Optional[Metrics] = None):
+        """
+        Args:
+            config: API配置
+            resilience: 重试、熔断和对冲策略，默认最多尝试3次、不开启对冲
+            metrics: 请求耗时指标，默认关闭
+        """
+        self.config = config
+        self.resilience = resilience or Resilience()
+        self.metrics = metrics or NULL_METRICS
+        self.rate_limiters = RateLimiterRegistry()
+        self.ssl_context = create_ssl_context()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            ssl=self.ssl_context,
+            limit=self.config.connection_limit,
+            limit_per_host=self.config.connection_limit_per_host,
+            ttl_dns_cache=self.config.dns_cache_ttl,
+            use_dns_cache=True,
+            keepalive_timeout=self.config.keepalive_timeout,
+        )
+        trace_configs = [self.metrics.trace_config()] if self.metrics.enabled else None
+        return aiohttp.ClientSession(connector=connector, trace_configs=trace_configs)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """获取当前事件循环中的会话，必要时创建"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            # 旧会话所属的事件循环已结束时无法再关闭，直接丢弃
+            self._session = self._create_session()
+            self._loop = loop
+        return self._session
+
+    def limiter_for(self, config: Config, cluster: str) -> AdaptiveLimiter:
+        """获取账号和集群对应的限流器"""
+        return self.rate_limiters.get(config.appid, cluster, config.rate_limit, config.max_concurrency)
+
+    @property
+    def closed(self) -> bool:
+        return self._session is None or self._session.closed
+
+    def post(self, url: str, timer=None, **kwargs):
+        """
+        发送POST请求，返回可用于 async with 的响应上下文
+
+        Args:
+            url: 请求地址
+            timer: metrics.timer() 返回的计时器，由跟踪钩子记录连接阶段耗时
+        """
+        if self.metrics.enabled and timer is not None:
+            kwargs["trace_request_ctx"] = timer
+        return self.session.post(url, **kwargs)
+
+    async def warm(self, url: Optional[str] = None, timeout: float = 10.0):
+        """
+        预先建立到服务端的连接，完成DNS解析和TLS握手，之后的第一个请求可以直接复用
+
+        Args:
+            url: 预热的地址，默认为配置的 host
+            timeout: 超时时间（秒），预热失败只记录日志
+        """
+        try:
+            async with self.session.head(url or self.config.host, allow_redirects=False,
+                                         timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"预热连接失败: {str(e)}")
+
+    async def close(self):
+        """关闭会话并释放连接池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    async def __aenter__(self) -> "HttpClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
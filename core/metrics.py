@@ -0,0 +1,317 @@
+"""请求分阶段耗时统计与导出"""
+
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PHASE_METRIC = "voice_clone_request_phase_seconds"
+REQUEST_METRIC = "voice_clone_requests_total"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """累积分桶直方图"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个为 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, counts: List[int], total: float, count: int):
+        """合并另一个相同分桶的直方图"""
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.sum += total
+        self.count += count
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Prometheus 格式的累积计数 [(le, count), ...]"""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return result
+
+
+class RequestTimer:
+    """单个请求的分阶段计时，结束时写入指标"""
+
+    def __init__(self, metrics: "Metrics", endpoint: str, speaker: str, cluster: str):
+        self.metrics = metrics
+        self.endpoint = endpoint
+        self.speaker = speaker
+        self.cluster = cluster
+        self.phases: Dict[str, float] = {}
+        self.started = time.perf_counter()
+        self._finished = False
+
+    def record(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def finish(self, status: str = "ok"):
+        if self._finished:
+            return
+        self._finished = True
+        self.record("total", time.perf_counter() - self.started)
+        self.metrics.record_request(self, status)
+
+    def __enter__(self) -> "RequestTimer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 状态取异常类名，如 ThrottledError、CancelledError
+        self.finish("ok" if exc_type is None else exc_type.__name__)
+
+
+class _NullTimer:
+    """指标关闭时使用的空计时器"""
+
+    phases: Dict[str, float] = {}
+
+    def record(self, phase: str, seconds: float):
+        pass
+
+    @contextmanager
+    def phase(self, name: str):
+        yield
+
+    def finish(self, status: str = "ok"):
+        pass
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """
+    指标注册表
+
+    按 endpoint、speaker、cluster、phase 分组记录各阶段耗时直方图，
+    按 endpoint、cluster、status 统计请求数。每个完成的请求还会交给已注册的 sink，
+    例如 LogSink 输出结构化日志。
+
+    用法:
+        metrics = Metrics(sinks=[LogSink()])
+        client = HttpClient(config, metrics=metrics)
+        ...
+        print(PrometheusExporter(metrics).render())
+    """
+
+    enabled = True
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS, sinks: Optional[list] = None,
+                 label_speaker: bool = True):
+        """
+        Args:
+            buckets: 直方图分桶上界（秒）
+            sinks: 每个请求完成时调用 sink.export_request(record) 的对象列表
+            label_speaker: 是否按音色区分，音色很多时可关闭以减少序列数
+        """
+        self.buckets = tuple(buckets)
+        self.sinks = list(sinks or [])
+        self.label_speaker = label_speaker
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+
+    def timer(self, endpoint: str, speaker: str = "", cluster: str = ""):
+        return RequestTimer(self, endpoint, speaker if self.label_speaker else "", cluster)
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def record_phase(self, endpoint: str, phase: str, seconds: float, speaker: str = "", cluster: str = ""):
+        """记录请求之外的单个阶段耗时（如写文件）"""
+        self.observe(PHASE_METRIC, seconds, endpoint=endpoint, phase=phase,
+                     speaker=speaker if self.label_speaker else "", cluster=cluster)
+
+    def record_request(self, timer: RequestTimer, status: str):
+        for phase, seconds in timer.phases.items():
+            self.observe(PHASE_METRIC, seconds, endpoint=timer.endpoint, phase=phase,
+                         speaker=timer.speaker, cluster=timer.cluster)
+        self.inc(REQUEST_METRIC, endpoint=timer.endpoint, cluster=timer.cluster, status=status)
+        if self.sinks:
+            record = {
+                "endpoint": timer.endpoint,
+                "speaker": timer.speaker,
+                "cluster": timer.cluster,
+                "status": status,
+                "phases": {phase: round(seconds, 6) for phase, seconds in timer.phases.items()},
+            }
+            for sink in self.sinks:
+                try:
+                    sink.export_request(record)
+                except Exception as e:
+                    logger.warning(f"指标导出失败: {str(e)}")
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """导出可序列化的指标数据，用于跨进程汇总"""
+        return {
+            "histograms": {key: (list(h.counts), h.sum, h.count) for key, h in self.histograms.items()},
+            "counters": dict(self.counters),
+        }
+
+    def merge(self, snapshot: Dict[str, Dict]):
+        """合并 snapshot() 导出的指标，分桶必须相同"""
+        for key, (counts, total, count) in snapshot["histograms"].items():
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            if len(counts) != len(histogram.counts):
+                raise ValueError("无法合并分桶不同的直方图")
+            histogram.merge(counts, total, count)
+        for key, value in snapshot["counters"].items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """aiohttp 跟踪钩子：记录连接池排队、DNS、建连（含TLS）和首字节耗时"""
+        trace_config = aiohttp.TraceConfig()
+
+        def timer_of(ctx) -> Optional[RequestTimer]:
+            timer = ctx.trace_request_ctx
+            return timer if isinstance(timer, RequestTimer) else None
+
+        def start(name: str):
+            async def hook(session, ctx, params):
+                setattr(ctx, name, time.perf_counter())
+            return hook
+
+        def end(name: str, phase: str):
+            async def hook(session, ctx, params):
+                timer = timer_of(ctx)
+                started = getattr(ctx, name, None)
+                if timer is not None and started is not None:
+                    timer.record(phase, time.perf_counter() - started)
+            return hook
+
+        trace_config.on_request_start.append(start("request_started"))
+        trace_config.on_connection_queued_start.append(start("queued_started"))
+        trace_config.on_connection_queued_end.append(end("queued_started", "pool_wait"))
+        trace_config.on_dns_resolvehost_start.append(start("dns_started"))
+        trace_config.on_dns_resolvehost_end.append(end("dns_started", "dns"))
+        trace_config.on_connection_create_start.append(start("connect_started"))
+        trace_config.on_connection_create_end.append(end("connect_started", "connect"))
+        trace_config.on_request_end.append(end("request_started", "ttfb"))
+        return trace_config
+
+
+class NullMetrics(Metrics):
+    """关闭状态的指标，所有操作为空，不安装跟踪钩子"""
+
+    enabled = False
+
+    def __init__(self):
+        super().__init__()
+
+    def timer(self, endpoint: str, speaker: str = "", cluster: str = ""):
+        return NULL_TIMER
+
+    def observe(self, name: str, value: float, **labels: str):
+        pass
+
+    def inc(self, name: str, amount: float = 1, **labels: str):
+        pass
+
+    def record_phase(self, endpoint: str, phase: str, seconds: float, speaker: str = "", cluster: str = ""):
+        pass
+
+    def merge(self, snapshot: Dict[str, Dict]):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Labels = ()) -> str:
+    """格式化标签，空值的标签省略"""
+    items = [f'{k}="{_escape(v)}"' for k, v in labels + extra if v != ""]
+    return "{" + ",".join(items) + "}" if items else ""
+
+
+class PrometheusExporter:
+    """以 Prometheus 文本格式导出指标"""
+
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+
+    def render(self) -> str:
+        lines = []
+        histogram_names = sorted({name for name, _ in self.metrics.histograms})
+        for name in histogram_names:
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), histogram in sorted(self.metrics.histograms.items()):
+                if metric != name:
+                    continue
+                for le, count in histogram.cumulative():
+                    lines.append(f"{name}_bucket{_format_labels(labels, (('le', le),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        counter_names = sorted({name for name, _ in self.metrics.counters})
+        for name in counter_names:
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), value in sorted(self.metrics.counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """写入文件，可配合 node_exporter 的 textfile 采集器使用"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+class LogSink:
+    """把每个请求的分阶段耗时输出为一行JSON日志"""
+
+    def __init__(self, log: Optional[logging.Logger] = None, level: int = logging.INFO):
+        self.log = log or logging.getLogger("voice_clone.metrics")
+        self.level = level
+
+    def export_request(self, record: Dict):
+        self.log.log(self.level, json.dumps(record, ensure_ascii=False))
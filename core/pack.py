@@ -0,0 +1,652 @@
+"""
+音频包：把大量短音频存放在一个只追加的数据文件中
+
+每个音频作为一条记录追加到数据文件 <path>，紧凑的索引文件 <path>.idx 记录 键 -> (偏移, 长度, 编码, CRC)，
+键可以是内容哈希或任意ID。数百万条提示语只占两个文件，随机读取只需一次索引查找。
+
+- 写入：记录和索引项都只追加，多个线程和进程可以同时写入同一个包（文件锁串行化追加）
+- 读取：数据文件以 mmap 映射，get 返回指向映射内存的 memoryview，不复制音频数据
+- 删除和覆盖：追加新的索引项，旧数据在 compact 时回收
+- 恢复：数据文件中的每条记录自带键和编码，索引损坏、缺失或与数据文件不匹配时从数据文件重建；
+  崩溃留下的未索引记录在打开和写入时补写索引，末尾不完整的记录被截掉
+- Windows 没有文件锁，只支持单个进程写入；compact 替换文件前关闭自己打开的文件，但不能有其他 AudioPack（包括其他进程）打开该音频包
+
+命令行:
+    voice-clone-pack import output/ library.pack --key hash
+    voice-clone-pack list library.pack
+    voice-clone-pack extract library.pack <键> -o clip.mp3
+    voice-clone-pack compact library.pack
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+import uuid
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from .audio import Buffers, detect_file_format
+from .sinks import FSYNC_POLICIES, _ThreadedSink
+
+try:
+    import fcntl
+except ImportError:  # 非 POSIX 平台只在进程内串行化写入
+    fcntl = None
+
+DATA_MAGIC = b"VCPACK1\n"
+INDEX_MAGIC = b"VCPIDX1\n"
+# 文件头：魔数 + 代号。compact 生成新代号，索引与数据文件代号不一致时从数据文件重建索引
+FILE_HEADER = struct.Struct(">8s16s")
+RECORD_MAGIC = b"VCR1"
+# 数据记录头：魔数、键长度、编码长度、音频长度、CRC32，之后依次是键、编码和音频
+RECORD_HEADER = struct.Struct(">4sHBQI")
+# 索引项：音频偏移、音频长度、CRC32、键长度、编码长度，之后依次是键和编码
+INDEX_ENTRY = struct.Struct(">QQIHB")
+# 删除标记（长度字段），删除项的偏移字段记录删除记录的结束位置
+DELETED = 2 ** 64 - 1
+
+_OPEN_FLAGS = os.O_RDWR | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0)
+
+# 文件格式 -> 合成接口的编码名
+_ENCODINGS = {"ogg": "ogg_opus", "opus": "ogg_opus"}
+
+
+class PackEntry(NamedTuple):
+    offset: int  # 音频在数据文件中的偏移
+    length: int
+    encoding: str
+    crc: int
+
+
+class PackError(ValueError):
+    """音频包文件损坏或格式不正确"""
+
+
+def _pread(fd: int, size: int, offset: int) -> bytes:
+    """按偏移读取；没有 os.pread 的平台（Windows）退化为 lseek + read，调用方持有锁"""
+    if hasattr(os, "pread"):
+        return os.pread(fd, size, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+def _writev(fd: int, chunks: Sequence[Union[bytes, memoryview]]) -> int:
+    """一次写入多段数据，返回实际写入的字节数；没有 os.writev 的平台（Windows）拼接后写入"""
+    if hasattr(os, "writev"):
+        return os.writev(fd, chunks)
+    return os.write(fd, b"".join(chunks))
+
+
+def _encode_key(key: str) -> bytes:
+    data = key.encode("utf-8")
+    if not data or len(data) > 0xFFFF:
+        raise ValueError("键不能为空且不能超过65535字节")
+    return data
+
+
+class AudioPack:
+    """
+    音频包
+
+    用法:
+        with AudioPack("library.pack") as pack:
+            pack.put("greeting", audio_data, "mp3")
+            clip = pack.get("greeting")  # memoryview，使用完毕后再关闭音频包
+    """
+
+    def __init__(self, path: str, fsync: str = "batch", fsync_every: int = 256):
+        """
+        Args:
+            path: 数据文件路径，索引为 <path>.idx；不存在时创建
+            fsync: 写入的 fsync 策略，none/batch/always（见 core.sinks）
+            fsync_every: batch 策略下每写入多少条同步一次
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync 必须是 {'/'.join(FSYNC_POLICIES)} 之一")
+        self.path = path
+        self.index_path = path + ".idx"
+        self.fsync = fsync
+        self.fsync_every = fsync_every
+        self._lock = threading.RLock()
+        self._entries: Dict[str, PackEntry] = {}
+        self._map: Optional[mmap.mmap] = None
+        self._unsynced = 0
+        self._data_fd = -1
+        self._index_fd = -1
+        self._open()
+
+    # ------------------------------------------------------------------ 打开与索引
+
+    def _open(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._data_fd = os.open(self.path, _OPEN_FLAGS, 0o644)
+        self._index_fd = os.open(self.index_path, _OPEN_FLAGS, 0o644)
+        self._data_inode = os.fstat(self._data_fd).st_ino
+        with self._file_lock():
+            if os.fstat(self._data_fd).st_size == 0:
+                self.generation = uuid.uuid4().bytes
+                os.write(self._data_fd, FILE_HEADER.pack(DATA_MAGIC, self.generation))
+                os.ftruncate(self._index_fd, 0)
+                os.write(self._index_fd, FILE_HEADER.pack(INDEX_MAGIC, self.generation))
+            else:
+                self.generation = self._read_header(self._data_fd, DATA_MAGIC)
+            self._entries = {}
+            self._index_pos = 0
+            self._data_end = FILE_HEADER.size
+            if not self._load_index():
+                self._reset_index()
+            elif os.fstat(self._index_fd).st_size > self._index_pos:
+                # 持有文件锁时不会有写入中的索引项，末尾残缺的部分是崩溃残留
+                os.ftruncate(self._index_fd, self._index_pos)
+            if os.fstat(self._data_fd).st_size < self._data_end:
+                # 索引指向数据文件之外（数据未落盘就崩溃），以数据文件为准
+                self._reset_index()
+            self._recover_tail()
+        self._map = None
+        self._remap()
+
+    @staticmethod
+    def _read_header(fd: int, magic: bytes) -> bytes:
+        header = _pread(fd, FILE_HEADER.size, 0)
+        if len(header) < FILE_HEADER.size:
+            raise PackError("文件头不完整")
+        file_magic, generation = FILE_HEADER.unpack(header)
+        if file_magic != magic:
+            raise PackError("不是音频包文件")
+        return generation
+
+    def _load_index(self) -> bool:
+        """读取索引，索引缺失或与数据文件不匹配时返回False"""
+        try:
+            if self._read_header(self._index_fd, INDEX_MAGIC) != self.generation:
+                return False
+        except PackError:
+            return False
+        self._index_pos = FILE_HEADER.size
+        self._read_index_tail()
+        return True
+
+    def _read_index_tail(self):
+        """读取 _index_pos 之后新追加的索引项，末尾不完整的索引项（写入中或崩溃残留）留到下次"""
+        size = os.fstat(self._index_fd).st_size
+        if size <= self._index_pos:
+            return
+        data = _pread(self._index_fd, size - self._index_pos, self._index_pos)
+        pos = 0
+        while pos + INDEX_ENTRY.size <= len(data):
+            offset, length, crc, key_size, encoding_size = INDEX_ENTRY.unpack_from(data, pos)
+            end = pos + INDEX_ENTRY.size + key_size + encoding_size
+            if end > len(data):
+                break
+            key = data[pos + INDEX_ENTRY.size:pos + INDEX_ENTRY.size + key_size].decode("utf-8")
+            if length == DELETED:
+                self._entries.pop(key, None)
+                self._data_end = max(self._data_end, offset)
+            else:
+                encoding = data[end - encoding_size:end].decode("ascii")
+                self._entries[key] = PackEntry(offset, length, encoding, crc)
+                self._data_end = max(self._data_end, offset + length)
+            pos = end
+        self._index_pos += pos
+
+    def _scan_records(self, start: int) -> Iterator[Tuple[str, Optional[PackEntry], int]]:
+        """从 start 开始按顺序解析数据文件中的记录，返回 (键, 索引项, 记录结束位置)，遇到不完整的记录时停止"""
+        size = os.fstat(self._data_fd).st_size
+        pos = start
+        while pos + RECORD_HEADER.size <= size:
+            magic, key_size, encoding_size, length, crc = RECORD_HEADER.unpack(
+                _pread(self._data_fd, RECORD_HEADER.size, pos))
+            if magic != RECORD_MAGIC:
+                raise PackError(f"数据文件在偏移 {pos} 处损坏")
+            names = _pread(self._data_fd, key_size + encoding_size, pos + RECORD_HEADER.size)
+            offset = pos + RECORD_HEADER.size + key_size + encoding_size
+            audio_size = 0 if length == DELETED else length
+            if len(names) < key_size + encoding_size or offset + audio_size > size:
+                break
+            key = names[:key_size].decode("utf-8")
+            pos = offset + audio_size
+            if length == DELETED:
+                yield key, None, pos
+            else:
+                yield key, PackEntry(offset, length, names[key_size:].decode("ascii"), crc), pos
+
+    def _reset_index(self):
+        """清空索引，之后由 _recover_tail 从数据文件开头重建"""
+        os.ftruncate(self._index_fd, 0)
+        os.write(self._index_fd, FILE_HEADER.pack(INDEX_MAGIC, self.generation))
+        self._entries = {}
+        self._index_pos = FILE_HEADER.size
+        self._data_end = FILE_HEADER.size
+
+    def _recover_tail(self):
+        """
+        为数据文件中索引之后的完整记录补写索引项，并截掉末尾不完整的记录
+
+        记录写入数据文件后、索引项写入前崩溃，或记录只写了一半时会留下这样的尾部；
+        不截掉的话之后的记录会追加在残缺数据之后，重建索引时无法越过。调用方持有文件锁。
+        """
+        size = os.fstat(self._data_fd).st_size
+        if size <= self._data_end:
+            return
+        chunks = []
+        for key, entry, end in self._scan_records(self._data_end):
+            chunks.append(self._index_entry(key, entry, end))
+            if entry is None:
+                self._entries.pop(key, None)
+            else:
+                self._entries[key] = entry
+            self._data_end = end
+        if chunks:
+            os.write(self._index_fd, b"".join(chunks))
+            self._index_pos = os.fstat(self._index_fd).st_size
+        if size > self._data_end:
+            os.ftruncate(self._data_fd, self._data_end)
+
+    @staticmethod
+    def _index_entry(key: str, entry: Optional[PackEntry], end: int = 0) -> bytes:
+        """编码索引项，删除项以 end 记录删除记录的结束位置"""
+        key_data = _encode_key(key)
+        if entry is None:
+            return INDEX_ENTRY.pack(end, DELETED, 0, len(key_data), 0) + key_data
+        encoding = entry.encoding.encode("ascii")
+        header = INDEX_ENTRY.pack(entry.offset, entry.length, entry.crc, len(key_data), len(encoding))
+        return header + key_data + encoding
+
+    def _file_lock(self):
+        return _FileLock(self._data_fd if fcntl is not None else None, self._lock)
+
+    def refresh(self):
+        """读取其他进程追加的索引项；数据文件被 compact 替换后重新打开"""
+        with self._lock:
+            if self._replaced():
+                self._reopen()
+            else:
+                self._read_index_tail()
+
+    def _replaced(self) -> bool:
+        try:
+            return os.stat(self.path).st_ino != self._data_inode
+        except FileNotFoundError:
+            return False
+
+    def _reopen(self):
+        os.close(self._data_fd)
+        os.close(self._index_fd)
+        self._open()
+
+    # ------------------------------------------------------------------ 读取
+
+    def _remap(self):
+        """映射到当前文件末尾；旧映射不主动关闭，仍被 memoryview 引用时随视图释放"""
+        size = os.fstat(self._data_fd).st_size
+        if self._map is not None and len(self._map) == size:
+            return
+        self._map = mmap.mmap(self._data_fd, size, access=mmap.ACCESS_READ)
+
+    def entry(self, key: str) -> Optional[PackEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.refresh()
+                entry = self._entries.get(key)
+            return entry
+
+    def get(self, key: str, verify: bool = False) -> Optional[memoryview]:
+        """
+        读取音频，返回指向映射内存的 memoryview，不存在时返回None
+
+        Args:
+            key: 键
+            verify: 是否校验CRC
+        """
+        with self._lock:
+            entry = self.entry(key)
+            if entry is None:
+                return None
+            if entry.offset + entry.length > len(self._map):
+                self._remap()
+            view = memoryview(self._map)[entry.offset:entry.offset + entry.length]
+        if verify and zlib.crc32(view) != entry.crc:
+            raise PackError(f"音频 {key} 的CRC校验失败")
+        return view
+
+    @property
+    def closed(self) -> bool:
+        return self._data_fd < 0
+
+    def __contains__(self, key: str) -> bool:
+        return self.entry(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._entries)
+
+    def items(self) -> Iterator[Tuple[str, PackEntry]]:
+        return iter(list(self._entries.items()))
+
+    # ------------------------------------------------------------------ 写入
+
+    def put(self, key: str, data: Union[bytes, memoryview, Sequence[Union[bytes, memoryview]]],
+            encoding: str) -> PackEntry:
+        """
+        追加一个音频；键已存在时覆盖，旧数据在 compact 时回收
+
+        Args:
+            key: 键（内容哈希或ID）
+            data: 音频数据，或按顺序拼接的多段数据
+            encoding: 音频编码
+        """
+        buffers = [data] if isinstance(data, (bytes, bytearray, memoryview)) else list(data)
+        length = sum(len(buffer) for buffer in buffers)
+        crc = 0
+        for buffer in buffers:
+            crc = zlib.crc32(buffer, crc)
+        key_data = _encode_key(key)
+        encoding_data = encoding.encode("ascii")
+        header = RECORD_HEADER.pack(RECORD_MAGIC, len(key_data), len(encoding_data), length, crc)
+        with self._write_lock():
+            offset = self._append([header, key_data, encoding_data] + buffers)
+            entry = PackEntry(offset + len(header) + len(key_data) + len(encoding_data), length, encoding, crc)
+            self._commit(key, entry, entry.offset + length)
+        return entry
+
+    def delete(self, key: str) -> bool:
+        """删除一个音频，不存在时返回False"""
+        with self._write_lock():
+            if self._entries.get(key) is None:
+                return False
+            key_data = _encode_key(key)
+            offset = self._append([RECORD_HEADER.pack(RECORD_MAGIC, len(key_data), 0, DELETED, 0), key_data])
+            self._commit(key, None, offset + RECORD_HEADER.size + len(key_data))
+        return True
+
+    def _append(self, chunks: List[Union[bytes, memoryview]]) -> int:
+        """追加一条记录，返回记录在文件中的偏移；调用方持有写锁"""
+        offset = os.fstat(self._data_fd).st_size
+        total = sum(len(chunk) for chunk in chunks)
+        written = _writev(self._data_fd, chunks)
+        while written < total:
+            # 大记录可能分多次写入
+            remaining = b"".join(bytes(chunk) for chunk in chunks)[written:]
+            written += os.write(self._data_fd, remaining)
+        return offset
+
+    @contextmanager
+    def _write_lock(self):
+        """持有进程内锁和文件锁；其他进程 compact 替换了文件时重新打开"""
+        with self._lock:
+            if fcntl is not None:
+                while True:
+                    fcntl.flock(self._data_fd, fcntl.LOCK_EX)
+                    if not self._replaced():
+                        break
+                    fcntl.flock(self._data_fd, fcntl.LOCK_UN)
+                    self._reopen()
+            try:
+                # 先读取其他进程追加的索引项，本地视图中同一个键以最后写入的为准；
+                # 其他写入者崩溃留下的残缺记录在追加前截掉
+                self._read_index_tail()
+                self._recover_tail()
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._data_fd, fcntl.LOCK_UN)
+
+    def _commit(self, key: str, entry: Optional[PackEntry], end: int):
+        os.write(self._index_fd, self._index_entry(key, entry, end))
+        self._index_pos = os.fstat(self._index_fd).st_size
+        self._data_end = end
+        if entry is None:
+            self._entries.pop(key, None)
+        else:
+            self._entries[key] = entry
+        self._unsynced += 1
+        if self.fsync == "always" or (self.fsync == "batch" and self._unsynced >= self.fsync_every):
+            self._sync()
+
+    def _sync(self):
+        os.fsync(self._data_fd)
+        os.fsync(self._index_fd)
+        self._unsynced = 0
+
+    def flush(self):
+        """同步尚未持久化的写入"""
+        with self._lock:
+            if self._unsynced and self.fsync != "none":
+                self._sync()
+
+    # ------------------------------------------------------------------ 统计与关闭
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        with self._lock:
+            data_bytes = os.fstat(self._data_fd).st_size
+            live_bytes = sum(entry.length for entry in self._entries.values())
+            return {
+                "entries": len(self._entries),
+                "data_bytes": data_bytes,
+                "live_bytes": live_bytes,
+                "index_bytes": os.fstat(self._index_fd).st_size,
+                "garbage_ratio": round(1 - live_bytes / data_bytes, 4) if data_bytes else 0.0,
+            }
+
+    def close(self):
+        """关闭文件；仍被 memoryview 引用的映射在这些视图释放后由垃圾回收关闭"""
+        with self._lock:
+            if self._data_fd < 0:
+                return
+            self.flush()
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # 仍被 memoryview 引用
+            self._map = None
+            os.close(self._data_fd)
+            os.close(self._index_fd)
+            self._data_fd = self._index_fd = -1
+
+    def __enter__(self) -> "AudioPack":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _FileLock:
+    """进程内锁加可选的文件锁"""
+
+    def __init__(self, fd: Optional[int], lock: threading.RLock):
+        self.fd = fd
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.acquire()
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.lock.release()
+
+
+def compact(path: str) -> Tuple[int, int]:
+    """
+    压缩音频包，去掉被覆盖和删除的数据
+
+    压缩期间持有文件锁，其他写入者等待，完成后发现文件已被替换会自动重新打开；
+    已映射旧文件的读取者继续读取旧数据，调用 refresh() 后切换到新文件。
+    Windows 不能替换仍被打开的文件，compact 在替换前关闭自己的文件和映射，此时也不能有其他 AudioPack 打开该音频包。
+
+    Returns:
+        (压缩前数据文件字节数, 压缩后数据文件字节数)
+    """
+    with AudioPack(path, fsync="none") as pack, pack._file_lock():
+        pack._read_index_tail()
+        pack._recover_tail()
+        before = os.fstat(pack._data_fd).st_size
+        pack._remap()
+        generation = uuid.uuid4().bytes
+        tmp_data, tmp_index = f"{path}.{os.getpid()}.compact", f"{path}.idx.{os.getpid()}.compact"
+        try:
+            with open(tmp_data, "wb") as data_file, open(tmp_index, "wb") as index_file:
+                data_file.write(FILE_HEADER.pack(DATA_MAGIC, generation))
+                index_file.write(FILE_HEADER.pack(INDEX_MAGIC, generation))
+                for key, entry in sorted(pack._entries.items(), key=lambda item: item[1].offset):
+                    key_data = _encode_key(key)
+                    encoding = entry.encoding.encode("ascii")
+                    data_file.write(RECORD_HEADER.pack(RECORD_MAGIC, len(key_data), len(encoding), entry.length,
+                                                       entry.crc) + key_data + encoding)
+                    offset = data_file.tell()
+                    data_file.write(memoryview(pack._map)[entry.offset:entry.offset + entry.length])
+                    index_file.write(AudioPack._index_entry(key, entry._replace(offset=offset)))
+                after = data_file.tell()
+                for f in (data_file, index_file):
+                    f.flush()
+                    os.fsync(f.fileno())
+            if fcntl is None:
+                # 没有文件锁可持有，先关闭文件和映射，Windows 才能替换
+                pack.close()
+            # 先替换数据文件：两次替换之间崩溃时，索引代号与数据文件不一致，打开时从数据文件重建
+            os.replace(tmp_data, path)
+            os.replace(tmp_index, pack.index_path)
+        except BaseException:
+            for tmp in (tmp_data, tmp_index):
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+            raise
+    return before, after
+
+
+def import_directory(pack: AudioPack, directory: str, key: str = "path") -> int:
+    """
+    把输出目录中的音频文件导入音频包
+
+    Args:
+        pack: 目标音频包
+        directory: 输出目录
+        key: path 以相对路径为键，hash 以内容的 SHA-256 为键（相同内容只存一份）
+
+    Returns:
+        int: 导入的文件数
+    """
+    if key not in ("path", "hash"):
+        raise ValueError("key 必须是 path 或 hash")
+    count = 0
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.startswith("."):  # 未完成的临时文件
+                continue
+            path = os.path.join(root, name)
+            audio_format = detect_file_format(path)
+            with open(path, "rb") as f:
+                data = f.read()
+            if key == "hash":
+                clip_key = hashlib.sha256(data).hexdigest()
+                if clip_key in pack:
+                    continue
+            else:
+                clip_key = os.path.relpath(path, directory).replace(os.sep, "/")
+            pack.put(clip_key, data, _ENCODINGS.get(audio_format, audio_format or "bin"))
+            count += 1
+    return count
+
+
+class PackSink(_ThreadedSink):
+    """
+    把合成结果追加到音频包的输出目标，输出名称作为键
+
+    用法:
+        async with PackSink("library.pack") as sink:
+            async with TTSService(config, sink=sink) as tts:
+                async for result in tts.synthesize_many(jobs):
+                    ...
+    """
+
+    def __init__(self, path: str, fsync: str = "batch", fsync_every: int = 256, max_pending: int = 64):
+        super().__init__(1, max_pending)
+        self.path = path
+        self.fsync = fsync
+        self.fsync_every = fsync_every
+        self.pack = AudioPack(path, fsync=fsync, fsync_every=fsync_every)
+
+    async def write(self, name: str, buffers: Buffers) -> str:
+        if self.pack.closed:
+            # 与其他输出目标一致，关闭后再写入时重新打开
+            self.pack = AudioPack(self.path, fsync=self.fsync, fsync_every=self.fsync_every)
+        self._count(buffers)
+        encoding = os.path.splitext(name)[1][1:].lower()
+        await self._run(self.pack.put, name, buffers, _ENCODINGS.get(encoding, encoding or "bin"))
+        return name
+
+    async def flush(self):
+        if not self.pack.closed:
+            await self._run(self.pack.flush)
+
+    async def close(self):
+        try:
+            await super().close()
+        finally:
+            self.pack.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="voice-clone-pack", description="音频包的导入、查看、提取和压缩")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="导入输出目录中的音频文件")
+    import_parser.add_argument("directory")
+    import_parser.add_argument("pack")
+    import_parser.add_argument("--key", default="path", choices=["path", "hash"], help="以相对路径或内容哈希为键")
+    list_parser = commands.add_parser("list", help="列出键、编码和大小")
+    list_parser.add_argument("pack")
+    extract_parser = commands.add_parser("extract", help="提取一个音频")
+    extract_parser.add_argument("pack")
+    extract_parser.add_argument("key")
+    extract_parser.add_argument("-o", "--output", help="输出文件，默认写到标准输出")
+    compact_parser = commands.add_parser("compact", help="回收被覆盖和删除的数据")
+    compact_parser.add_argument("pack")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "compact":
+            before, after = compact(args.pack)
+            print(f"{before} -> {after} 字节")
+            return 0
+        if args.command != "import" and not os.path.exists(args.pack):
+            print(f"音频包不存在: {args.pack}", file=sys.stderr)
+            return 1
+        with AudioPack(args.pack) as pack:
+            if args.command == "import":
+                count = import_directory(pack, args.directory, key=args.key)
+                print(f"已导入 {count} 个文件，共 {len(pack)} 个音频")
+            elif args.command == "list":
+                for key, entry in pack.items():
+                    print(f"{key}\t{entry.encoding}\t{entry.length}")
+            else:
+                clip = pack.get(args.key, verify=True)
+                if clip is None:
+                    print(f"音频不存在: {args.key}", file=sys.stderr)
+                    return 1
+                if args.output:
+                    with open(args.output, "wb") as f:
+                        f.write(clip)
+                else:
+                    sys.stdout.buffer.write(clip)
+                clip.release()
+    except (OSError, PackError) as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from .errors import TrainingFailedError
+
+logger = logging.getLogger(__name__)
+
+# 训练状态：0=未找到, 1=训练中, 2=成功, 3=失败, 4=激活
+FINISHED_STATUSES = (2, 3, 4)
+
+
+@dataclass
+class _Subscription:
+    future: asyncio.Future
+    started: float
+    next_poll: float
+    interval: float
+    subscribers: int = 0
+    errors: int = 0
+    in_flight: bool = False
+    polls: int = 0
+
+
+class StatusPoller:
+    """
+    多个音色共享的训练状态轮询器
+
+    所有等待者由一个后台任务统一调度：同一音色只轮询一次，状态查询受全局速率限制，
+    轮询间隔根据历史训练时长自适应并按指数退避增长，带随机抖动避免集中请求。
+    音色进入成功/失败/激活状态时，所有等待该音色的调用返回。
+
+    用法:
+        poller = StatusPoller(cloning)
+        results = await asyncio.gather(*[poller.wait(sid) for sid in speaker_ids])
+        await poller.close()
+    """
+
+    def __init__(
+        self,
+        service,
+        max_rate: float = 5.0,
+        min_interval: float = 2.0,
+        max_interval: float = 60.0,
+        backoff: float = 2.0,
+        jitter: float = 0.2,
+        expected_duration: float = 60.0,
+        max_errors: int = 5,
+    ):
+        """
+        Args:
+            service: VoiceCloningService 实例
+            max_rate: 每秒最多发起的状态查询次数（所有音色合计）
+            min_interval: 最小轮询间隔（秒）
+            max_interval: 最大轮询间隔（秒）
+            backoff: 每次轮询后间隔的增长倍数
+            jitter: 随机抖动比例
+            expected_duration: 初始的预期训练时长（秒），之后按实际完成时间滑动更新
+            max_errors: 连续查询失败多少次后放弃
+        """
+        self.service = service
+        self.max_rate = max_rate
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.expected_duration = expected_duration
+        self.max_errors = max_errors
+        self.status_calls = 0
+        self._subscriptions: Dict[str, _Subscription] = {}
+        # Python 3.9 及以下的 Event 创建时就绑定事件循环，在运行中的循环里按需创建
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._polls = set()  # 进行中的状态查询任务
+        self._next_call_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def _now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def _jittered(self, delay: float) -> float:
+        return max(0.0, delay * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def subscribe(self, speaker_id: str) -> asyncio.Future:
+        """订阅音色的训练结果，返回在训练结束时完成的 Future"""
+        subscription = self._subscriptions.get(speaker_id)
+        if subscription is None:
+            now = self._now()
+            subscription = _Subscription(
+                future=asyncio.get_running_loop().create_future(),
+                started=now,
+                next_poll=now,  # 首次立即查询
+                interval=self.min_interval,
+            )
+            self._subscriptions[speaker_id] = subscription
+            self._ensure_running()
+            self._wakeup.set()
+        subscription.subscribers += 1
+        return subscription.future
+
+    def unsubscribe(self, speaker_id: str):
+        """取消一个订阅，没有等待者的音色停止轮询"""
+        subscription = self._subscriptions.get(speaker_id)
+        if subscription is None:
+            return
+        subscription.subscribers -= 1
+        if subscription.subscribers <= 0:
+            del self._subscriptions[speaker_id]
+            if not subscription.future.done():
+                subscription.future.cancel()
+
+    async def wait(self, speaker_id: str, timeout: float = 3600) -> Dict[str, Any]:
+        """
+        等待音色训练结束
+
+        Args:
+            speaker_id: 声音ID
+            timeout: 超时时间（秒）
+
+        Returns:
+            Dict[str, Any]: 成功或激活时的状态信息
+
+        Raises:
+            TrainingFailedError: 训练失败
+            TimeoutError: 超时
+        """
+        future = self.subscribe(speaker_id)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("训练超时")
+        finally:
+            # 训练结束时订阅已被移除，只有超时或取消时需要退订
+            if not future.done():
+                self.unsubscribe(speaker_id)
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._wakeup is None or self._loop is not loop:
+            self._wakeup = asyncio.Event()
+            self._loop = loop
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        while self._subscriptions:
+            now = self._now()
+            ready = [
+                (speaker_id, sub) for speaker_id, sub in self._subscriptions.items()
+                if not sub.in_flight and sub.next_poll <= now
+            ]
+            for speaker_id, subscription in sorted(ready, key=lambda item: item[1].next_poll):
+                # 全局速率限制：相邻两次查询至少间隔 1/max_rate 秒
+                delay = self._next_call_at - self._now()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._next_call_at = max(self._now(), self._next_call_at) + 1.0 / self.max_rate
+                if self._subscriptions.get(speaker_id) is not subscription:
+                    continue
+                subscription.in_flight = True
+                task = asyncio.ensure_future(self._poll(speaker_id, subscription))
+                self._polls.add(task)
+                task.add_done_callback(self._polls.discard)
+
+            pending = [sub.next_poll for sub in self._subscriptions.values() if not sub.in_flight]
+            timeout = max(0.0, min(pending) - self._now()) if pending else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, speaker_id: str, subscription: _Subscription):
+        try:
+            self.status_calls += 1
+            subscription.polls += 1
+            status = await self.service.get_status(speaker_id)
+        except Exception as e:
+            subscription.errors += 1
+            logger.warning(f"查询训练状态失败 {speaker_id}（第{subscription.errors}次）: {str(e)}")
+            if subscription.errors >= self.max_errors:
+                self._finish(speaker_id, subscription, error=e)
+            else:
+                self._reschedule(subscription)
+            return
+        finally:
+            subscription.in_flight = False
+            self._wakeup.set()
+
+        subscription.errors = 0
+        code = status.get("status")
+        if code in FINISHED_STATUSES:
+            if code == 3:
+                self._finish(speaker_id, subscription, error=TrainingFailedError(f"训练失败: {status}"))
+            else:
+                self._record_duration(self._now() - subscription.started)
+                self._finish(speaker_id, subscription, result=status)
+        else:
+            self._reschedule(subscription)
+
+    def _reschedule(self, subscription: _Subscription):
+        now = self._now()
+        remaining = self.expected_duration - (now - subscription.started)
+        if subscription.polls == 1 and remaining > self.min_interval:
+            # 首次查询后直接等到预计完成时间附近
+            delay = min(remaining, self.max_interval)
+        else:
+            delay = subscription.interval
+            subscription.interval = min(self.max_interval, subscription.interval * self.backoff)
+        subscription.next_poll = now + self._jittered(max(delay, self.min_interval))
+
+    def _record_duration(self, duration: float):
+        # 指数滑动平均，适应服务端训练耗时的变化
+        self.expected_duration = 0.8 * self.expected_duration + 0.2 * duration
+
+    def _finish(self, speaker_id: str, subscription: _Subscription, result=None, error=None):
+        if self._subscriptions.get(speaker_id) is subscription:
+            del self._subscriptions[speaker_id]
+        if subscription.future.done():
+            return
+        if error is not None:
+            subscription.future.set_exception(error)
+        else:
+            subscription.future.set_result(result)
+
+    async def close(self):
+        """停止轮询并取消所有等待"""
+        for subscription in self._subscriptions.values():
+            if not subscription.future.done():
+                subscription.future.cancel()
+        self._subscriptions.clear()
+        tasks = list(self._polls)
+        if self._task is not None and not self._task.done():
+            tasks.append(self._task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from .errors import ThrottledError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 各集群的默认配额：(每秒请求数, 最大并发数)，可通过 Config.rate_limit / Config.max_concurrency 覆盖
+CLUSTER_QUOTAS: Dict[str, Tuple[float, int]] = {
+    "volcano_icl": (10.0, 5),
+    "volcano_icl_concurr": (100.0, 50),
+    "volc.megatts.voiceclone": (10.0, 10),
+}
+DEFAULT_QUOTA: Tuple[float, int] = (10.0, 10)
+
+
+class AdaptiveLimiter:
+    """
+    令牌桶加并发数的客户端限流器，按AIMD调整
+
+    成功时线性提高速率和并发上限（不超过配额），被服务端限流时成倍降低，
+    使批量任务尽量贴近配额运行而不触发限流错误。
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        max_concurrency: int,
+        min_rate: float = 0.5,
+        burst: Optional[float] = None,
+        increase: float = 0.05,
+        decrease: float = 0.5,
+        cooldown: float = 1.0,
+    ):
+        """
+        Args:
+            rate: 配额允许的每秒请求数
+            max_concurrency: 配额允许的最大并发数
+            min_rate: 速率下限
+            burst: 令牌桶容量，默认等于 rate
+            increase: 每次成功时速率增加配额的比例
+            decrease: 被限流时速率和并发上限的缩小倍数
+            cooldown: 两次降速之间的最小间隔（秒），避免同一波限流被重复计算
+        """
+        self.max_rate = rate
+        self.max_concurrency = max_concurrency
+        self.min_rate = min(min_rate, rate)
+        self.burst = burst or max(1.0, rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+
+        self.rate = rate
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.acquired = 0
+        self.throttles = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._last_decrease = float("-inf")
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """等待并发名额和令牌，返回排队等待的秒数"""
+        start = time.monotonic()
+        while self.in_flight >= max(1, int(self.limit)):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except BaseException:
+                # 已被唤醒却在恢复前取消时，把名额转交给下一个排队者，否则名额丢失、其余排队者永远等待
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+
+        try:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+        except BaseException:
+            self.release()
+            raise
+
+        waited = time.monotonic() - start
+        self.acquired += 1
+        self.queue_wait_total += waited
+        self.queue_wait_max = max(self.queue_wait_max, waited)
+        return waited
+
+    def release(self):
+        """归还并发名额并唤醒排队者"""
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        available = max(1, int(self.limit)) - self.in_flight
+        while available > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                available -= 1
+
+    @property
+    def headroom(self) -> float:
+        """空闲并发名额占上限的比例，已满或有请求在排队时为0"""
+        if self._waiters:
+            return 0.0
+        limit = max(1, int(self.limit))
+        return max(0, limit - self.in_flight) / limit
+
+    @asynccontextmanager
+    async def slot(self):
+        """占用一个请求名额"""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def on_success(self):
+        """加性增：逐步恢复到配额"""
+        self.rate = min(self.max_rate, self.rate + self.max_rate * self.increase)
+        previous = int(self.limit)
+        self.limit = min(float(self.max_concurrency), self.limit + 1.0 / max(1.0, self.limit))
+        if int(self.limit) > previous:
+            self._wake()
+
+    def on_throttle(self):
+        """乘性减：被服务端限流时降低速率和并发上限"""
+        self.throttles += 1
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.limit = max(1.0, self.limit * self.decrease)
+        self._refill()
+        self._tokens = min(self._tokens, 0.0)
+        logger.warning(f"请求被限流，降低到 {self.rate:.2f} 次/秒、并发 {int(self.limit)}")
+
+    async def run(self, factory: Callable[[], Awaitable[T]], on_wait: Optional[Callable[[float], None]] = None) -> T:
+        """
+        在限流名额内执行一次请求，并根据结果调整速率
+
+        Args:
+            factory: 发起请求的协程工厂
+            on_wait: 拿到名额后以排队秒数调用的回调，用于记录指标
+        """
+        waited = await self.acquire()
+        try:
+            if on_wait is not None:
+                on_wait(waited)
+            try:
+                result = await factory()
+            except ThrottledError:
+                self.on_throttle()
+                raise
+        finally:
+            self.release()
+        self.on_success()
+        return result
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "rate": self.rate,
+            "max_rate": self.max_rate,
+            "concurrency_limit": int(self.limit),
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "acquired": self.acquired,
+            "throttles": self.throttles,
+            "queue_wait_total": self.queue_wait_total,
+            "queue_wait_max": self.queue_wait_max,
+            "queue_wait_avg": self.queue_wait_total / self.acquired if self.acquired else 0.0,
+        }
+
+
+class RateLimiterRegistry:
+    """按 (appid, cluster) 共享限流器，同一账号同一集群的所有请求共用配额"""
+
+    def __init__(self):
+        self._limiters: Dict[Tuple[str, str], AdaptiveLimiter] = {}
+
+    def get(
+        self,
+        appid: str,
+        cluster: str,
+        rate: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> AdaptiveLimiter:
+        """
+        获取限流器，首次获取时按集群默认配额创建
+
+        Args:
+            appid: 应用ID
+            cluster: 集群或资源ID
+            rate: 覆盖默认的每秒请求数
+            max_concurrency: 覆盖默认的最大并发数
+        """
+        key = (appid, cluster)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            default_rate, default_concurrency = CLUSTER_QUOTAS.get(cluster, DEFAULT_QUOTA)
+            limiter = AdaptiveLimiter(rate or default_rate, max_concurrency or default_concurrency)
+            self._limiters[key] = limiter
+        return limiter
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {f"{appid}/{cluster}": limiter.stats() for (appid, cluster), limiter in self._limiters.items()}
@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from .errors import CircuitOpenError, ThrottledError, classify, is_retryable
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class RetryPolicy:
+    """重试策略：指数退避加全抖动"""
+    max_attempts: int = 3  # 包含首次请求在内的最大尝试次数
+    base_delay: float = 0.2  # 首次重试的退避基数（秒）
+    max_delay: float = 5.0  # 单次退避上限（秒）
+    throttle_multiplier: float = 2.0  # 被限流时额外放大退避时间
+
+    def delay(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """第 attempt 次（从0开始）失败后的等待时间"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        if isinstance(error, ThrottledError):
+            ceiling = min(self.max_delay, ceiling * self.throttle_multiplier)
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续出现 failure_threshold 次可重试错误后打开，打开期间直接失败；
+    recovery_timeout 秒后进入半开状态，放行一个探测请求，成功则关闭。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self._state = self.CLOSED
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def allow(self, host: str = ""):
+        """检查是否允许发起请求，不允许时抛出 CircuitOpenError"""
+        state = self.state
+        if state == self.OPEN:
+            raise CircuitOpenError(f"熔断中，暂停请求 {host}")
+        if state == self.HALF_OPEN:
+            if self._probing:
+                raise CircuitOpenError(f"熔断恢复探测中，暂停请求 {host}")
+            self._probing = True
+
+    def record_success(self):
+        self.failures = 0
+        self._state = self.CLOSED
+        self._probing = False
+
+    def release_probe(self):
+        """探测请求被取消或没有结论（如被限流、不可重试的请求错误）时放弃探测，允许下一个请求重新探测"""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                logger.warning(f"连续失败 {self.failures} 次，熔断器打开")
+            self._state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class LatencyTracker:
+    """记录最近若干次请求的耗时，用于计算分位数"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, latency: float):
+        self._samples.append(latency)
+
+    def percentile(self, quantile: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(quantile * len(ordered)))
+        return ordered[index]
+
+
+class Resilience:
+    """
+    请求弹性策略：错误重试、按主机熔断、可选的对冲请求
+
+    对冲请求：请求耗时超过历史 p95 仍未返回时，再并行发送一个相同请求，
+    采用先返回的结果并取消另一个，用少量额外请求换取更低的尾延迟。
+    只应对幂等请求开启。
+    """
+
+    def __init__(
+        self,
+        retry: Optional[RetryPolicy] = None,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        hedge_min_delay: float = 0.05,
+    ):
+        """
+        Args:
+            retry: 重试策略，默认最多尝试3次
+            failure_threshold: 熔断器打开前允许的连续失败次数
+            recovery_timeout: 熔断器打开后的恢复等待时间（秒）
+            hedge: 是否对合成请求开启对冲
+            hedge_quantile: 触发对冲的延迟分位数
+            hedge_min_samples: 样本数达到多少后才开始对冲
+            hedge_min_delay: 对冲等待时间下限（秒）
+        """
+        self.retry = retry or RetryPolicy()
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latency: Dict[str, LatencyTracker] = {}
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(self.failure_threshold, self.recovery_timeout)
+        return self._breakers[host]
+
+    def latency(self, host: str) -> LatencyTracker:
+        if host not in self._latency:
+            self._latency[host] = LatencyTracker()
+        return self._latency[host]
+
+    def hedge_delay(self, host: str) -> Optional[float]:
+        """触发对冲前的等待时间，样本不足时返回None"""
+        tracker = self.latency(host)
+        if len(tracker) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, tracker.percentile(self.hedge_quantile))
+
+    async def call(self, host: str, factory: Callable[[], Awaitable[T]], hedge: Optional[bool] = None) -> T:
+        """
+        按弹性策略执行请求
+
+        Args:
+            host: 目标主机，熔断和延迟统计按主机区分
+            factory: 每次调用发起一次新请求的协程工厂
+            hedge: 是否对冲，None 表示使用实例默认值
+
+        Raises:
+            CircuitOpenError: 熔断器打开
+            APIError: 不可重试的错误，或重试次数用尽后的最后一次错误
+        """
+        hedge = self.hedge if hedge is None else hedge
+        breaker = self.breaker(host)
+        attempt = 0
+        while True:
+            breaker.allow(host)
+            try:
+                if hedge:
+                    result = await self._hedged(host, factory)
+                else:
+                    result = await self._timed(host, factory)
+            except Exception as e:
+                error = classify(e)
+                if not is_retryable(error):
+                    # 请求本身的问题，不能说明主机是否恢复，既不计入失败也不清零失败次数
+                    breaker.release_probe()
+                    if error is e:
+                        raise
+                    raise error from e
+                if isinstance(error, ThrottledError):
+                    breaker.release_probe()
+                else:
+                    breaker.record_failure()
+                attempt += 1
+                if attempt >= self.retry.max_attempts:
+                    if error is e:
+                        raise
+                    raise error from e
+                delay = self.retry.delay(attempt - 1, error)
+                self.retries += 1
+                logger.warning(f"请求失败，{delay:.2f}秒后第{attempt}次重试: {str(error)}")
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # 取消等不是 Exception 的异常，半开状态下必须放弃探测，否则熔断器永远停在探测中
+                breaker.release_probe()
+                raise
+            breaker.record_success()
+            return result
+
+    async def _timed(self, host: str, factory: Callable[[], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        result = await factory()
+        self.latency(host).record(time.perf_counter() - start)
+        return result
+
+    async def _hedged(self, host: str, factory: Callable[[], Awaitable[T]]) -> T:
+        delay = self.hedge_delay(host)
+        primary = asyncio.ensure_future(self._timed(host, factory))
+        if delay is None:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedges += 1
+                tasks.add(asyncio.ensure_future(self._timed(host, factory)))
+
+            first_error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    if first_error is None:
+                        first_error = task.exception()
+            raise first_error
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "breakers": {host: breaker.state for host, breaker in self._breakers.items()},
+        }
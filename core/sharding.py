@@ -0,0 +1,336 @@
+"""
+多进程分片执行
+
+吞吐很高时，单个事件循环会被 JSON 解析、base64 解码和写文件占满。ShardedRunner 启动多个工作进程，
+每个进程有自己的事件循环、连接池和限流器；任务按音色或文本的一致性哈希固定分配到某个进程，
+结果和耗时指标汇总回主进程。账号的限流配额在工作进程之间平分，总请求速率不会超过单进程时的配额。
+"""
+
+import asyncio
+import bisect
+import builtins
+import dataclasses
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from . import errors
+from .batch import SynthesisJob, SynthesisResult, run_jobs
+from .cache import DiskCache
+from .config import Config
+from .http import HttpClient
+from .metrics import NULL_METRICS, Metrics
+from .ratelimit import CLUSTER_QUOTAS, DEFAULT_QUOTA
+from .sinks import DirectorySink
+from .text import MAX_TEXT_BYTES, byte_length
+from .tts import TTSService
+
+logger = logging.getLogger(__name__)
+
+SHARD_KEYS = ("text", "speaker")
+
+# 主进程检查工作进程是否异常退出的间隔（秒）
+_POLL_INTERVAL = 0.5
+
+
+class HashRing:
+    """
+    一致性哈希环
+
+    每个节点在环上放置 replicas 个虚拟节点；增删节点时只有约 1/N 的键会改变归属。
+    """
+
+    def __init__(self, nodes: Sequence[int], replicas: int = 64):
+        if not nodes:
+            raise ValueError("至少需要一个节点")
+        self._ring: List[Tuple[int, int]] = sorted(
+            (self._hash(f"{node}#{replica}"), node) for node in nodes for replica in range(replicas)
+        )
+        self._keys = [point for point, _ in self._ring]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def node_for(self, key: str) -> int:
+        """键所属的节点"""
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+
+def _quota(config: Config) -> Tuple[float, int]:
+    """账号在该集群的 (每秒请求数, 最大并发数)"""
+    default_rate, default_concurrency = CLUSTER_QUOTAS.get(config.tts_cluster, DEFAULT_QUOTA)
+    return config.rate_limit or default_rate, config.max_concurrency or default_concurrency
+
+
+def max_workers(config: Config) -> int:
+    """工作进程数上限：每个进程至少需要一个并发名额，进程数不能超过并发配额"""
+    return _quota(config)[1]
+
+
+def shard_config(config: Config, workers: int) -> Config:
+    """
+    把账号的限流配额平分给每个工作进程，各进程的配额之和不超过单进程时的配额
+
+    Raises:
+        ValueError: 工作进程数超过并发配额
+    """
+    rate, concurrency = _quota(config)
+    if workers > concurrency:
+        raise ValueError(f"工作进程数 {workers} 超过并发配额 {concurrency}")
+    return dataclasses.replace(
+        config,
+        rate_limit=rate / workers,
+        max_concurrency=concurrency // workers,
+        connection_limit=max(1, config.connection_limit // workers),
+    )
+
+
+def _error_info(error: Exception) -> Tuple[str, str, Optional[int], Optional[int]]:
+    """异常不一定能跨进程序列化，只传类名、消息和错误码"""
+    return type(error).__name__, str(error), getattr(error, "status", None), getattr(error, "code", None)
+
+
+def _error_from(info: Tuple[str, str, Optional[int], Optional[int]]) -> Exception:
+    name, message, status, code = info
+    cls = getattr(errors, name, None)
+    if isinstance(cls, type) and issubclass(cls, errors.APIError):
+        return cls(message, status=status, code=code)
+    if isinstance(cls, type) and issubclass(cls, Exception):
+        return cls(message)
+    cls = getattr(builtins, name, None)
+    if isinstance(cls, type) and issubclass(cls, Exception):
+        try:
+            return cls(message)
+        except TypeError:
+            pass
+    return RuntimeError(f"{name}: {message}")
+
+
+async def _serve_shard(shard: int, config: Config, jobs: "multiprocessing.Queue", results: "multiprocessing.Queue",
+                       concurrency: int, collect_metrics: bool, cache_dir: Optional[str], fsync: str):
+    loop = asyncio.get_running_loop()
+    metrics = Metrics(label_speaker=False) if collect_metrics else NULL_METRICS
+    indices: Dict[int, int] = {}  # 本进程内的任务序号 -> 全局序号
+
+    async def receive() -> AsyncIterator[SynthesisJob]:
+        local = 0
+        while True:
+            item = await loop.run_in_executor(None, jobs.get)
+            if item is None:
+                return
+            indices[local], job = item
+            local += 1
+            yield job
+
+    async with HttpClient(config, metrics=metrics) as client:
+        tts = TTSService(config, client=client, cache=DiskCache(cache_dir) if cache_dir else None,
+                         sink=DirectorySink(fsync=fsync))
+
+        async def handle(job: SynthesisJob) -> Optional[bytes]:
+            long_text = byte_length(job.text) > MAX_TEXT_BYTES
+            params = dict(text=job.text, speaker_id=job.speaker_id, text_type=job.text_type,
+                          encoding=job.encoding, speed_ratio=job.speed_ratio)
+            if job.output_path:
+                await tts.synthesize_to_file(output_path=job.output_path, long_text=long_text, **params)
+                return None
+            if long_text:
+                return await tts.synthesize_long(**params)
+            return await tts.synthesize(**params)
+
+        try:
+            async for result in run_jobs(handle, receive(), concurrency=concurrency):
+                error = _error_info(result.error) if result.error is not None else None
+                results.put(("result", indices.pop(result.index), result.job, result.audio, result.output_path,
+                             error, result.elapsed))
+        finally:
+            await tts.sink.close()
+    results.put(("done", shard, metrics.snapshot() if collect_metrics else None))
+
+
+def _worker_main(shard: int, config: Config, jobs: "multiprocessing.Queue", results: "multiprocessing.Queue",
+                 concurrency: int, collect_metrics: bool, cache_dir: Optional[str], fsync: str):
+    """工作进程入口"""
+    try:
+        asyncio.run(_serve_shard(shard, config, jobs, results, concurrency, collect_metrics, cache_dir, fsync))
+    except BaseException as e:
+        results.put(("failed", shard, f"{type(e).__name__}: {str(e)}"))
+        raise
+
+
+class ShardedRunner:
+    """
+    多进程批量合成
+
+    用法:
+        runner = ShardedRunner(config, workers=4, concurrency=8)
+        async for result in runner.run(jobs):
+            ...
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        workers: Optional[int] = None,
+        shard_by: str = "text",
+        concurrency: int = 8,
+        metrics: Optional[Metrics] = None,
+        cache_dir: Optional[str] = None,
+        queue_size: int = 256,
+        fsync: str = "none",
+    ):
+        """
+        Args:
+            config: API配置，限流配额会平分给各工作进程
+            workers: 工作进程数，默认为CPU核数；超过账号的并发配额时减少到配额数
+            shard_by: 分片依据，text（负载更均衡）或 speaker（同一音色固定在一个进程，缓存命中率更高）
+            concurrency: 每个工作进程的最大并发任务数
+            metrics: 汇总各进程耗时指标的注册表，不传则不收集
+            cache_dir: 各进程共享的磁盘缓存目录
+            queue_size: 每个工作进程待处理任务队列的长度，输入按需读取，不会一次性展开
+            fsync: 输出文件的 fsync 策略，见 core.sinks
+        """
+        if shard_by not in SHARD_KEYS:
+            raise ValueError(f"shard_by 必须是 {'/'.join(SHARD_KEYS)} 之一")
+        if concurrency < 1:
+            raise ValueError("concurrency 必须大于等于1")
+        self.workers = workers or os.cpu_count() or 1
+        if self.workers > max_workers(config):
+            # 每个进程至少占一个并发名额，进程再多总并发也会超出配额
+            logger.warning(f"工作进程数 {self.workers} 超过并发配额，减少到 {max_workers(config)}")
+            self.workers = max_workers(config)
+        self.config = shard_config(config, self.workers)
+        self.shard_by = shard_by
+        self.concurrency = concurrency
+        self.metrics = metrics
+        self.cache_dir = cache_dir
+        self.queue_size = queue_size
+        self.fsync = fsync
+        self.ring = HashRing(range(self.workers))
+        self.dispatched = [0] * self.workers  # 每个工作进程分到的任务数
+
+    def shard_of(self, job: SynthesisJob) -> int:
+        return self.ring.node_for(job.speaker_id if self.shard_by == "speaker" else job.text)
+
+    def results(self, jobs: Iterable[Any]) -> Iterator[SynthesisResult]:
+        """
+        同步执行，按完成顺序产出结果
+
+        Args:
+            jobs: SynthesisJob 或等价字典的可迭代对象
+
+        Yields:
+            SynthesisResult: index 为任务在输入中的序号
+        """
+        context = multiprocessing.get_context("spawn")
+        job_queues = [context.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+        result_queue = context.Queue()
+        processes = [
+            context.Process(
+                target=_worker_main,
+                args=(shard, self.config, job_queues[shard], result_queue, self.concurrency,
+                      self.metrics is not None and self.metrics.enabled, self.cache_dir, self.fsync),
+                name=f"voice-clone-shard-{shard}",
+                daemon=True,
+            )
+            for shard in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+
+        stopping = threading.Event()
+        feeder_errors: List[BaseException] = []
+
+        def put(target: "multiprocessing.Queue", item: Any) -> bool:
+            # 工作进程异常退出时队列可能一直是满的，定期检查是否需要停止
+            while not stopping.is_set():
+                try:
+                    target.put(item, timeout=_POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def feed():
+            try:
+                for index, raw_job in enumerate(jobs):
+                    try:
+                        job = SynthesisJob.from_any(raw_job)
+                    except Exception as e:
+                        result_queue.put(("result", index, None, None, None, _error_info(e), 0.0))
+                        continue
+                    shard = self.shard_of(job)
+                    self.dispatched[shard] += 1
+                    if not put(job_queues[shard], (index, job)):
+                        return
+            except BaseException as e:
+                feeder_errors.append(e)
+            finally:
+                for job_queue in job_queues:
+                    put(job_queue, None)
+
+        feeder = threading.Thread(target=feed, name="voice-clone-shard-feeder", daemon=True)
+        feeder.start()
+        finished = set()
+        try:
+            while len(finished) < self.workers:
+                try:
+                    message = result_queue.get(timeout=_POLL_INTERVAL)
+                except queue.Empty:
+                    for shard, process in enumerate(processes):
+                        if shard not in finished and process.exitcode is not None:
+                            raise RuntimeError(f"工作进程 {shard} 异常退出，退出码 {process.exitcode}")
+                    continue
+                kind = message[0]
+                if kind == "result":
+                    _, index, job, audio, output_path, error, elapsed = message
+                    yield SynthesisResult(index=index, job=job, audio=audio, output_path=output_path,
+                                          error=_error_from(error) if error is not None else None, elapsed=elapsed)
+                elif kind == "done":
+                    finished.add(message[1])
+                    if message[2] is not None:
+                        self.metrics.merge(message[2])
+                else:
+                    raise RuntimeError(f"工作进程 {message[1]} 失败: {message[2]}")
+            feeder.join()
+            if feeder_errors:
+                raise feeder_errors[0]
+        finally:
+            stopping.set()
+            for process in processes:
+                if len(finished) == self.workers:
+                    # 正常结束时等待进程退出，提前中断时直接终止
+                    process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+            for q in job_queues + [result_queue]:
+                q.cancel_join_thread()
+                q.close()
+            feeder.join(timeout=_POLL_INTERVAL * 2)
+
+    async def run(self, jobs: Iterable[Any]) -> AsyncIterator[SynthesisResult]:
+        """
+        在事件循环中执行，按完成顺序产出结果
+
+        工作进程和分发线程不占用当前事件循环，结果通过线程池读取。
+        """
+        results = self.results(jobs)
+        done = object()
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                result = await loop.run_in_executor(None, next, results, done)
+                if result is done:
+                    return
+                yield result
+        finally:
+            await loop.run_in_executor(None, results.close)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "shard_by": self.shard_by, "dispatched": list(self.dispatched)}
@@ -0,0 +1,387 @@
+"""
+合成结果的输出目标
+
+写文件在有限大小的线程池中进行，不阻塞事件循环；等待写入的任务数有上限，磁盘跟不上时合成任务在 write 处等待，
+内存不会无限增长。目录输出先写临时文件再原子重命名，不会留下写了一半的文件。
+
+fsync 策略:
+    none    不调用 fsync，由操作系统决定何时落盘（最快）
+    batch   每写入 fsync_every 个文件统一 fsync 一次文件和所在目录，flush/close 时同步剩余的文件
+    always  每个文件重命名前 fsync 文件，重命名后 fsync 目录（最慢，写完即持久）
+
+用法:
+    async with DirectorySink("output", fsync="batch") as sink:
+        async with TTSService(config, sink=sink) as tts:
+            async for result in tts.synthesize_many(jobs, concurrency=32):
+                ...
+"""
+
+import asyncio
+import io
+import os
+import shutil
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Set, TypeVar, Union
+
+from .audio import Buffers
+
+T = TypeVar("T")
+
+FSYNC_POLICIES = ("none", "batch", "always")
+ARCHIVE_FORMATS = ("tar", "zip")
+
+
+def _fsync_path(path: str):
+    """fsync 文件（Windows 上 fsync 需要写权限）"""
+    fd = os.open(path, os.O_RDWR if os.name == "nt" else os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(path: str):
+    """fsync 目录，使其中的重命名持久化；Windows 不能打开目录，跳过"""
+    if os.name == "nt":
+        return
+    _fsync_path(path)
+
+
+def _check_policy(fsync: str):
+    if fsync not in FSYNC_POLICIES:
+        raise ValueError(f"fsync 必须是 {'/'.join(FSYNC_POLICIES)} 之一")
+
+
+class OutputSink:
+    """输出目标基类，write 返回写入的位置（文件路径或归档内的名称）"""
+
+    def __init__(self):
+        self.writes = 0
+        self.bytes_written = 0
+
+    async def write(self, name: str, buffers: Buffers) -> str:
+        """
+        写入一段音频
+
+        Args:
+            name: 输出名称（相对路径）
+            buffers: 按顺序拼接的音频数据
+        """
+        raise NotImplementedError
+
+    async def write_file(self, name: str, source_path: str) -> str:
+        """写入已有文件（如磁盘缓存中的音频）的内容"""
+        data = await asyncio.get_running_loop().run_in_executor(None, self._read, source_path)
+        return await self.write(name, [data])
+
+    @staticmethod
+    def _read(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    async def flush(self):
+        """按 fsync 策略同步尚未持久化的数据"""
+
+    async def close(self):
+        await self.flush()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _count(self, buffers: Buffers) -> int:
+        size = sum(len(buffer) for buffer in buffers)
+        self.writes += 1
+        self.bytes_written += size
+        return size
+
+    def stats(self) -> Dict[str, int]:
+        return {"writes": self.writes, "bytes": self.bytes_written}
+
+
+class _ThreadedSink(OutputSink):
+    """
+    在有限大小的线程池中执行阻塞写入
+
+    线程池在第一次写入时创建，close 后再写入会重新创建，服务关闭后仍可继续使用；
+    限制等待数的信号量按事件循环创建，同一个输出目标可以先后在多个 asyncio.run 中使用。
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        """
+        Args:
+            max_workers: 写入线程数
+            max_pending: 同时等待写入的最大任务数，超出时 write 等待
+        """
+        super().__init__()
+        if max_workers < 1 or max_pending < 1:
+            raise ValueError("max_workers 和 max_pending 必须大于等于1")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Optional[asyncio.Semaphore] = None
+        self._pending_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        loop = asyncio.get_running_loop()
+        if self._pending is None or self._pending_loop is not loop:
+            self._pending = asyncio.Semaphore(self.max_pending)
+            self._pending_loop = loop
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="voice-clone-sink")
+        async with self._pending:
+            return await loop.run_in_executor(self._executor, func, *args)
+
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def close(self):
+        try:
+            await super().close()
+        finally:
+            self._shutdown()
+
+
+class DirectorySink(_ThreadedSink):
+    """写入目录，每个文件先写临时文件再原子重命名"""
+
+    def __init__(self, root: Optional[str] = None, fsync: str = "batch", fsync_every: int = 256,
+                 max_workers: int = 4, max_pending: int = 64):
+        """
+        Args:
+            root: 输出目录，名称不能超出该目录；None 表示名称即文件路径
+            fsync: fsync 策略，none/batch/always
+            fsync_every: batch 策略下每批同步的文件数
+            max_workers: 写入线程数
+            max_pending: 同时等待写入的最大任务数
+        """
+        _check_policy(fsync)
+        super().__init__(max_workers, max_pending)
+        self.root = root
+        self.fsync = fsync
+        self.fsync_every = fsync_every
+        self.fsyncs = 0
+        self._created: Set[str] = set()  # 已确认存在的目录，避免重复 makedirs
+        self._unsynced: List[str] = []
+        self._lock = threading.Lock()
+
+    def path_for(self, name: str) -> str:
+        if self.root is None:
+            return name
+        path = os.path.normpath(os.path.join(self.root, name))
+        root = os.path.normpath(self.root)
+        if os.path.isabs(name) or os.path.commonpath([root, path]) != root:
+            raise ValueError(f"输出名称超出输出目录: {name}")
+        return path
+
+    async def write(self, name: str, buffers: Buffers) -> str:
+        path = self.path_for(name)
+        self._count(buffers)
+        await self._run(self._write_sync, path, buffers)
+        return path
+
+    async def write_file(self, name: str, source_path: str) -> str:
+        path = self.path_for(name)
+        self.writes += 1
+        await self._run(self._link_sync, path, source_path)
+        return path
+
+    async def flush(self):
+        if self._unsynced:
+            await self._run(self._sync_batch, True)
+
+    def _directory(self, path: str) -> str:
+        directory = os.path.dirname(path) or "."
+        if directory not in self._created:
+            os.makedirs(directory, exist_ok=True)
+            self._created.add(directory)
+        return directory
+
+    def _tmp_path(self, directory: str, path: str) -> str:
+        return os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    def _write_sync(self, path: str, buffers: Buffers):
+        directory = self._directory(path)
+        tmp_path = self._tmp_path(directory, path)
+        try:
+            with open(tmp_path, "wb") as f:
+                f.writelines(buffers)
+                if self.fsync == "always":
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self._written(path, directory)
+
+    def _link_sync(self, path: str, source_path: str):
+        """硬链接已有文件，跨文件系统等无法链接时退化为复制"""
+        directory = self._directory(path)
+        tmp_path = self._tmp_path(directory, path)
+        try:
+            os.link(source_path, tmp_path)
+        except OSError:
+            shutil.copyfile(source_path, tmp_path)
+        if self.fsync == "always":
+            _fsync_path(tmp_path)
+        os.replace(tmp_path, path)
+        self._written(path, directory)
+
+    def _written(self, path: str, directory: str):
+        if self.fsync == "always":
+            _fsync_dir(directory)
+            self.fsyncs += 1
+        elif self.fsync == "batch":
+            with self._lock:
+                self._unsynced.append(path)
+                full = len(self._unsynced) >= self.fsync_every
+            if full:
+                self._sync_batch()
+
+    def _sync_batch(self, force: bool = False):
+        with self._lock:
+            if not force and len(self._unsynced) < self.fsync_every:
+                return
+            paths, self._unsynced = self._unsynced, []
+        for path in paths:
+            try:
+                _fsync_path(path)
+            except FileNotFoundError:
+                continue  # 已被后续写入替换或删除
+        for directory in {os.path.dirname(path) or "." for path in paths}:
+            _fsync_dir(directory)
+        self.fsyncs += 1
+
+
+class _BuffersReader(io.RawIOBase):
+    """把多段缓冲区当作一个只读文件，供 tarfile 逐块复制，不拼接成完整的 bytes"""
+
+    def __init__(self, buffers: Sequence[Union[bytes, memoryview]]):
+        self._buffers = [memoryview(buffer).cast("B") for buffer in buffers]
+        self._index = 0
+        self._offset = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        written = 0
+        target = memoryview(target).cast("B")
+        while written < len(target) and self._index < len(self._buffers):
+            buffer = self._buffers[self._index]
+            size = min(len(target) - written, len(buffer) - self._offset)
+            target[written:written + size] = buffer[self._offset:self._offset + size]
+            written += size
+            self._offset += size
+            if self._offset == len(buffer):
+                self._index += 1
+                self._offset = 0
+        return written
+
+
+class ArchiveSink(_ThreadedSink):
+    """
+    流式写入 tar 或 zip 归档
+
+    所有音频顺序追加到同一个临时文件（单个写入线程），close 时按 fsync 策略同步并原子重命名为最终路径。
+    zip 以存储方式写入，音频本身已压缩。
+    """
+
+    def __init__(self, path: str, format: Optional[str] = None, fsync: str = "batch", max_pending: int = 64):
+        """
+        Args:
+            path: 归档文件路径
+            format: tar 或 zip，默认按扩展名判断
+            fsync: none 表示不同步，其余策略在 close 时同步一次
+            max_pending: 同时等待写入的最大任务数
+        """
+        _check_policy(fsync)
+        super().__init__(1, max_pending)
+        self.path = path
+        self.format = format or ("zip" if path.lower().endswith(".zip") else "tar")
+        if self.format not in ARCHIVE_FORMATS:
+            raise ValueError(f"format 必须是 {'/'.join(ARCHIVE_FORMATS)} 之一")
+        self.fsync = fsync
+        self._tmp_path = f"{path}.{os.getpid()}.tmp"
+        self._archive: Optional[Union[tarfile.TarFile, zipfile.ZipFile]] = None
+        self._closed = False
+
+    @staticmethod
+    def _member_name(name: str) -> str:
+        member = os.path.normpath(name).replace(os.sep, "/").lstrip("/")
+        if member.startswith("../") or member in ("..", "."):
+            raise ValueError(f"无效的归档成员名称: {name}")
+        return member
+
+    async def write(self, name: str, buffers: Buffers) -> str:
+        if self._closed:
+            raise RuntimeError("归档已关闭")
+        member = self._member_name(name)
+        size = self._count(buffers)
+        await self._run(self._write_sync, member, buffers, size)
+        return member
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if self.format == "zip":
+            self._archive = zipfile.ZipFile(self._tmp_path, "w", compression=zipfile.ZIP_STORED)
+        else:
+            self._archive = tarfile.open(self._tmp_path, "w", format=tarfile.PAX_FORMAT)
+
+    def _write_sync(self, member: str, buffers: Buffers, size: int):
+        if self._archive is None:
+            self._open()
+        if self.format == "zip":
+            info = zipfile.ZipInfo(member, date_time=time.localtime()[:6])
+            info.file_size = size
+            with self._archive.open(info, "w") as f:
+                for buffer in buffers:
+                    f.write(buffer)
+        else:
+            info = tarfile.TarInfo(member)
+            info.size = size
+            info.mtime = int(time.time())
+            self._archive.addfile(info, _BuffersReader(buffers))
+
+    def _finish_sync(self):
+        if self._archive is None:
+            self._open()
+        self._archive.close()
+        if self.fsync != "none":
+            _fsync_path(self._tmp_path)
+        os.replace(self._tmp_path, self.path)
+        if self.fsync != "none":
+            _fsync_dir(os.path.dirname(os.path.abspath(self.path)))
+
+    async def close(self):
+        """写完归档目录并重命名为最终路径"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            await self._run(self._finish_sync)
+        finally:
+            self._shutdown()
+
+
+class MemorySink(OutputSink):
+    """收集到内存中，用于测试或需要在进程内继续处理的场景"""
+
+    def __init__(self):
+        super().__init__()
+        self.clips: Dict[str, bytes] = {}
+
+    async def write(self, name: str, buffers: Buffers) -> str:
+        self._count(buffers)
+        self.clips[name] = b"".join(buffers)
+        return name
@@ -0,0 +1,352 @@
+"""
+SSML 本地校验、规范化与切分
+
+按 doces/ssml.md 中支持的标签在本地校验 SSML，避免无效文本占用一次网络往返；
+规范化空白与实体后得到紧凑的SSML，并可在 <break> 或句末处切分为多段，
+每段都是标签配对完整、以 <speak> 为根的独立SSML，可以并发合成。
+"""
+
+import html.entities
+import re
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .errors import SsmlError
+from .text import CLAUSE_BREAK, MAX_TEXT_BYTES, SENTENCE_BREAK, byte_length, split_after
+
+# 使用 SSML 时建议的单次合成字符数（包含标签本身），超出后出现 badcase 的概率明显增加
+SSML_RECOMMENDED_CHARS = 150
+
+_XML_NAMESPACE = "{http://www.w3.org/XML/1998/namespace}"
+
+# 标签 -> 允许的属性；speak 之外的标签都是根元素的直接子元素
+SSML_TAGS: Dict[str, Tuple[str, ...]] = {
+    "speak": ("version", "xml:lang"),
+    "break": ("time", "strength"),
+    "phoneme": ("alphabet", "ph"),
+    "say-as": ("interpret-as", "format", "detail"),
+    "sub": ("alias",),
+}
+
+_REQUIRED_ATTRIBUTES = {
+    "phoneme": ("alphabet", "ph"),
+    "say-as": ("interpret-as",),
+    "sub": ("alias",),
+}
+
+PHONEME_ALPHABETS = ("py", "cmu", "ipa")
+
+# say-as 的 interpret-as 取值（中英文前端，不区分大小写）
+INTERPRET_AS = frozenset(value.lower() for value in (
+    "address", "cardinal", "date", "decimal", "digit", "electronic", "fraction", "letters", "letterss",
+    "math", "measure", "money", "ordinal", "plain", "score", "telephone", "time", "verbatim",
+    "Cardinal-Liang", "Abbr", "Spell", "Spell-Yao", "Time-Duration", "Date-Y", "Date-M", "Date-D",
+    "Date-YMD", "Date-MDY", "Date-DMY", "Percent", "Currency", "Range",
+))
+
+BREAK_STRENGTHS = ("none", "x-weak", "weak", "medium", "strong", "x-strong")
+
+_BREAK_TIME = re.compile(r"^\d+(?:\.\d+)?(?:ms|s)$")
+# XML 之外的命名实体（如 &nbsp;）与未转义的 &
+_NAMED_ENTITY = re.compile(r"&([A-Za-z][A-Za-z0-9]*);")
+_BARE_AMPERSAND = re.compile(r"&(?!#\d+;|#x[0-9A-Fa-f]+;|[A-Za-z][A-Za-z0-9]*;)")
+_XML_ENTITIES = ("amp", "lt", "gt", "quot", "apos")
+# 音素标签内的文本只能是字词，不能有标点
+_PUNCTUATION = re.compile(r"[^\w\s'’-]")
+_WHITESPACE = re.compile(r"\s+")
+# 与中日文字符或全角标点相邻的空白没有发音意义，直接去掉
+_CJK_SPACE = re.compile(r"(?<=[\u2e80-\u9fff\uff00-\uffef])\s+|\s+(?=[\u2e80-\u9fff\uff00-\uffef])")
+
+
+@dataclass(frozen=True)
+class CompiledSSML:
+    """
+    校验并规范化后的SSML
+
+    Attributes:
+        ssml: 规范化后的完整SSML
+        root: 根元素的开始标签（含属性）
+        units: 根元素下的内容，依次为 ("text", 原文) / ("element", 序列化后的标签) / ("break", 序列化后的标签)
+    """
+    ssml: str
+    root: str
+    units: Tuple[Tuple[str, str], ...]
+
+    @property
+    def byte_cost(self) -> int:
+        """计入单次请求上限的UTF-8字节数"""
+        return byte_length(self.ssml)
+
+    @property
+    def char_cost(self) -> int:
+        """包含标签在内的字符数"""
+        return len(self.ssml)
+
+
+def _escape_text(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _escape_attribute(value: str) -> str:
+    return _escape_text(value).replace('"', "&quot;")
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _attributes(element: ET.Element, tag: str) -> Dict[str, str]:
+    """校验属性名，返回 属性名 -> 值（xml:lang 等保留前缀）"""
+    attributes = {}
+    for name, value in element.attrib.items():
+        if name.startswith(_XML_NAMESPACE):
+            name = "xml:" + name[len(_XML_NAMESPACE):]
+        if name not in SSML_TAGS[tag]:
+            raise SsmlError(f"<{tag}> 不支持属性 {name}")
+        attributes[name] = value
+    for name in _REQUIRED_ATTRIBUTES.get(tag, ()):
+        if not attributes.get(name, "").strip():
+            raise SsmlError(f"<{tag}> 缺少属性 {name}")
+    return attributes
+
+
+def _start_tag(tag: str, attributes: Dict[str, str], empty: bool = False) -> str:
+    attrs = "".join(f' {name}="{_escape_attribute(value)}"' for name, value in attributes.items())
+    return f"<{tag}{attrs}{'/' if empty else ''}>"
+
+
+def _normalize_space(text: str) -> str:
+    return _CJK_SPACE.sub("", _WHITESPACE.sub(" ", text))
+
+
+def _normalize_entities(text: str) -> str:
+    """把 HTML 命名实体替换为对应字符，未转义的 & 按普通字符处理"""
+    def replace(match: re.Match) -> str:
+        name = match.group(1)
+        if name in _XML_ENTITIES:
+            return match.group(0)
+        char = html.entities.html5.get(name + ";")
+        # 无法识别的实体交给解析器报错
+        return _escape_text(char) if char is not None else match.group(0)
+
+    return _NAMED_ENTITY.sub(replace, _BARE_AMPERSAND.sub("&amp;", text))
+
+
+def _inline_element(element: ET.Element, tag: str) -> str:
+    """校验只能包含纯文本的标签，返回序列化结果"""
+    attributes = _attributes(element, tag)
+    if len(element):
+        raise SsmlError(f"<{tag}> 只能包含纯文本，不能嵌套 <{_local_name(element[0].tag)}>")
+    text = _normalize_space(element.text or "").strip()
+    if not text:
+        raise SsmlError(f"<{tag}> 内容为空")
+    if tag == "phoneme":
+        alphabet = attributes["alphabet"].strip().lower()
+        if alphabet not in PHONEME_ALPHABETS:
+            raise SsmlError(f"<phoneme> 的 alphabet 必须是 {'/'.join(PHONEME_ALPHABETS)} 之一，实际为 {alphabet}")
+        if _PUNCTUATION.search(text):
+            raise SsmlError(f"<phoneme> 的内容不能包含标点符号: {text}")
+    elif tag == "say-as":
+        interpret_as = attributes["interpret-as"].strip().lower()
+        if interpret_as not in INTERPRET_AS:
+            raise SsmlError(f"<say-as> 不支持 interpret-as=\"{attributes['interpret-as']}\"")
+    return f"{_start_tag(tag, attributes)}{_escape_text(text)}</{tag}>"
+
+
+def _break_element(element: ET.Element) -> str:
+    attributes = _attributes(element, "break")
+    if len(element) or (element.text or "").strip():
+        raise SsmlError("<break> 不能包含内容")
+    time = attributes.get("time")
+    if time is not None and not _BREAK_TIME.match(time.strip()):
+        raise SsmlError(f"<break> 的 time 格式无效: {time}，应为 500ms 或 1.5s 这样的时长")
+    strength = attributes.get("strength")
+    if strength is not None and strength not in BREAK_STRENGTHS:
+        raise SsmlError(f"<break> 的 strength 必须是 {'/'.join(BREAK_STRENGTHS)} 之一，实际为 {strength}")
+    return _start_tag("break", attributes, empty=True)
+
+
+@lru_cache(maxsize=1024)
+def compile_ssml(ssml: str) -> CompiledSSML:
+    """
+    校验并规范化SSML，结果按原文缓存
+
+    只接受 doces/ssml.md 中列出的标签：<speak> 必须是唯一的根元素且不能嵌套，
+    <phoneme>、<say-as>、<sub> 只能包含纯文本，另外支持 <break> 停顿。
+    规范化会合并连续空白、去掉中文字符旁的空白和注释，并把实体统一为最少的转义形式。
+
+    Args:
+        ssml: 以 <speak> 为根元素的SSML文本
+
+    Returns:
+        CompiledSSML: 规范化后的SSML及其内容单元
+
+    Raises:
+        SsmlError: 无法解析或包含不支持的标签、属性
+    """
+    ssml = ssml.strip()
+    if not ssml.startswith("<"):
+        raise SsmlError("SSML 的全部内容必须放在 <speak></speak> 标签之内")
+    try:
+        root = ET.fromstring(_normalize_entities(ssml))
+    except ET.ParseError as e:
+        line, column = e.position
+        message = str(e).split(":")[0]
+        if message.startswith("junk after document element"):
+            message = "<speak> 根元素之外还有内容，根元素只能出现一次"
+        raise SsmlError(f"SSML 解析失败（第{line}行第{column + 1}列）: {message}") from None
+
+    if _local_name(root.tag) != "speak":
+        raise SsmlError(f"SSML 的根元素必须是 <speak>，实际为 <{_local_name(root.tag)}>")
+    root_attributes = _attributes(root, "speak")
+    if root.tag.startswith("{"):
+        root_attributes = {"xmlns": root.tag[1:].split("}")[0], **root_attributes}
+
+    units: List[Tuple[str, str]] = []
+
+    def add_text(text: Optional[str]):
+        text = _normalize_space(text or "")
+        if not text:
+            return
+        if units and units[-1][0] == "text":
+            units[-1] = ("text", units[-1][1] + text)
+        else:
+            units.append(("text", text))
+
+    add_text(root.text)
+    for child in root:
+        tag = _local_name(child.tag)
+        if tag == "speak":
+            raise SsmlError("<speak> 只能作为根元素出现一次，不能嵌套")
+        if tag not in SSML_TAGS:
+            raise SsmlError(f"不支持的SSML标签 <{tag}>，支持的标签: {', '.join(SSML_TAGS)}")
+        if tag == "break":
+            units.append(("break", _break_element(child)))
+        else:
+            units.append(("element", _inline_element(child, tag)))
+        add_text(child.tail)
+
+    # 去掉根元素内首尾的空白
+    if units and units[0][0] == "text":
+        units[0] = ("text", units[0][1].lstrip())
+    if units and units[-1][0] == "text":
+        units[-1] = ("text", units[-1][1].rstrip())
+    units = [unit for unit in units if unit[1]]
+    if not units:
+        raise SsmlError("SSML 没有可合成的内容")
+
+    start = _start_tag("speak", root_attributes)
+    body = "".join(_escape_text(value) if kind == "text" else value for kind, value in units)
+    return CompiledSSML(ssml=f"{start}{body}</speak>", root=start, units=tuple(units))
+
+
+def validate_ssml(ssml: str) -> str:
+    """校验SSML，返回规范化后的文本"""
+    return compile_ssml(ssml).ssml
+
+
+def _cost(text: str, max_chars: Optional[int]) -> Tuple[int, int]:
+    return byte_length(text), len(text) if max_chars is not None else 0
+
+
+def _fits(used: Tuple[int, int], cost: Tuple[int, int], limits: Tuple[int, int]) -> bool:
+    return used[0] + cost[0] <= limits[0] and used[1] + cost[1] <= limits[1]
+
+
+def _fit_text(text: str, limits: Tuple[int, int], max_chars: Optional[int]) -> Iterator[str]:
+    """把超长的一句纯文本拆成转义后不超过上限的片段"""
+    for clause in split_after(text, CLAUSE_BREAK):
+        if _fits((0, 0), _cost(_escape_text(clause), max_chars), limits):
+            yield clause
+            continue
+        current = ""
+        for char in clause:
+            if current and not _fits((0, 0), _cost(_escape_text(current + char), max_chars), limits):
+                yield current
+                current = ""
+            current += char
+        if current:
+            yield current
+
+
+def _sentences(units: Tuple[Tuple[str, str], ...]) -> Iterator[List[Tuple[str, str]]]:
+    """按安全切分点分组：每组以句末标点或 <break> 结束，组内的标签保持完整"""
+    group: List[Tuple[str, str]] = []
+    for kind, value in units:
+        if kind != "text":
+            group.append((kind, value))
+            if kind == "break":
+                yield group
+                group = []
+            continue
+        for sentence in split_after(value, SENTENCE_BREAK):
+            group.append(("text", sentence))
+            if SENTENCE_BREAK.search(sentence):
+                yield group
+                group = []
+    if group:
+        yield group
+
+
+def split_ssml(ssml: str, max_bytes: int = MAX_TEXT_BYTES, max_chars: Optional[int] = None) -> List[str]:
+    """
+    将SSML切分为多个不超过上限、可以独立合成的SSML
+
+    只在根元素下的句末标点或 <break> 之后切分，每段都用与原文相同的 <speak> 根元素包裹，
+    <phoneme>、<say-as>、<sub> 不会被拆开；单句超长时退化到逗号等句内停顿，仍然超长时按字符切分。
+
+    Args:
+        ssml: 以 <speak> 为根元素的SSML文本
+        max_bytes: 每段（含标签）的UTF-8字节上限
+        max_chars: 每段（含标签）的字符上限，如 SSML_RECOMMENDED_CHARS；None 表示不限制
+
+    Returns:
+        List[str]: 按原文顺序排列的SSML片段
+
+    Raises:
+        SsmlError: SSML无效，或单个标签本身就超过上限
+    """
+    compiled = compile_ssml(ssml)
+    limits = (max_bytes, max_chars if max_chars is not None else 0)
+    if _fits((0, 0), _cost(compiled.ssml, max_chars), limits):
+        return [compiled.ssml]
+
+    end = "</speak>"
+    overhead = _cost(compiled.root + end, max_chars)
+    limits = (limits[0] - overhead[0], limits[1] - overhead[1])
+    if limits[0] <= 0 or (max_chars is not None and limits[1] <= 0):
+        raise SsmlError("切分上限小于 <speak> 标签本身的长度")
+
+    chunks: List[str] = []
+    current: List[str] = []
+    used = (0, 0)
+
+    def add(piece: str):
+        nonlocal current, used
+        cost = _cost(piece, max_chars)
+        if current and not _fits(used, cost, limits):
+            chunks.append("".join(current))
+            current, used = [], (0, 0)
+        current.append(piece)
+        used = (used[0] + cost[0], used[1] + cost[1])
+
+    for group in _sentences(compiled.units):
+        pieces = [_escape_text(value) if kind == "text" else value for kind, value in group]
+        if _fits((0, 0), _cost("".join(pieces), max_chars), limits):
+            add("".join(pieces))
+            continue
+        # 单句超长，退化到句内的标签边界和停顿
+        for kind, value in group:
+            if kind != "text":
+                if not _fits((0, 0), _cost(value, max_chars), limits):
+                    raise SsmlError(f"标签 {value[:40]}... 超过单段上限，无法切分")
+                add(value)
+                continue
+            for piece in _fit_text(value, limits, max_chars):
+                add(_escape_text(piece))
+    if current:
+        chunks.append("".join(current))
+
+    return [f"{compiled.root}{body}{end}" for body in (chunk.strip() for chunk in chunks) if body]
@@ -0,0 +1,134 @@
+"""流式语音合成的二进制WebSocket协议编解码"""
+
+import gzip
+import json
+import struct
+from dataclasses import dataclass
+from typing import Optional
+
+PROTOCOL_VERSION = 0b0001
+HEADER_SIZE = 0b0001  # 以4字节为单位
+
+# 消息类型
+FULL_CLIENT_REQUEST = 0b0001
+AUDIO_ONLY_RESPONSE = 0b1011
+FRONTEND_RESPONSE = 0b1100
+ERROR_MESSAGE = 0b1111
+
+# 音频消息标志位
+NO_SEQUENCE = 0b0000
+POSITIVE_SEQUENCE = 0b0001
+LAST_NO_SEQUENCE = 0b0010
+NEGATIVE_SEQUENCE = 0b0011
+
+# 序列化与压缩方式
+NO_SERIALIZATION = 0b0000
+JSON_SERIALIZATION = 0b0001
+NO_COMPRESSION = 0b0000
+GZIP_COMPRESSION = 0b0001
+
+
+@dataclass
+class Frame:
+    """解析后的协议帧"""
+    message_type: int
+    flags: int
+    serialization: int
+    compression: int
+    payload: bytes
+    sequence: Optional[int] = None
+    error_code: Optional[int] = None
+
+    @property
+    def is_last(self) -> bool:
+        """是否为最后一个音频帧"""
+        if self.flags in (LAST_NO_SEQUENCE, NEGATIVE_SEQUENCE):
+            return True
+        return self.sequence is not None and self.sequence < 0
+
+    def json(self) -> dict:
+        return json.loads(self.payload.decode("utf-8"))
+
+
+def _header(message_type: int, flags: int, serialization: int, compression: int) -> bytes:
+    return bytes([
+        (PROTOCOL_VERSION << 4) | HEADER_SIZE,
+        (message_type << 4) | flags,
+        (serialization << 4) | compression,
+        0x00,
+    ])
+
+
+def encode_request(payload: dict, compress: bool = True) -> bytes:
+    """编码客户端的完整请求帧"""
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    compression = GZIP_COMPRESSION if compress else NO_COMPRESSION
+    if compress:
+        body = gzip.compress(body)
+    return (_header(FULL_CLIENT_REQUEST, NO_SEQUENCE, JSON_SERIALIZATION, compression)
+            + struct.pack(">I", len(body)) + body)
+
+
+def encode_audio(audio: bytes, sequence: int) -> bytes:
+    """编码服务端的音频帧，sequence 为负数表示最后一帧"""
+    flags = NEGATIVE_SEQUENCE if sequence < 0 else POSITIVE_SEQUENCE
+    return (_header(AUDIO_ONLY_RESPONSE, flags, NO_SERIALIZATION, NO_COMPRESSION)
+            + struct.pack(">iI", sequence, len(audio)) + audio)
+
+
+def encode_error(code: int, message: str, compress: bool = False) -> bytes:
+    """编码服务端的错误帧"""
+    body = message.encode("utf-8")
+    compression = GZIP_COMPRESSION if compress else NO_COMPRESSION
+    if compress:
+        body = gzip.compress(body)
+    return (_header(ERROR_MESSAGE, NO_SEQUENCE, JSON_SERIALIZATION, compression)
+            + struct.pack(">II", code, len(body)) + body)
+
+
+def parse_frame(data: bytes) -> Frame:
+    """
+    解析一个协议帧
+
+    Args:
+        data: WebSocket二进制消息的完整内容
+
+    Returns:
+        Frame: 解析结果，payload 已解压
+    """
+    if len(data) < 4:
+        raise ValueError("协议帧长度不足")
+    header_size = (data[0] & 0x0F) * 4
+    message_type = data[1] >> 4
+    flags = data[1] & 0x0F
+    serialization = data[2] >> 4
+    compression = data[2] & 0x0F
+    view = memoryview(data)[header_size:]
+
+    sequence = None
+    error_code = None
+    if message_type == AUDIO_ONLY_RESPONSE and flags != NO_SEQUENCE:
+        sequence, = struct.unpack_from(">i", view)
+        view = view[4:]
+    elif message_type == ERROR_MESSAGE:
+        error_code, = struct.unpack_from(">I", view)
+        view = view[4:]
+
+    if len(view) >= 4:
+        size, = struct.unpack_from(">I", view)
+        payload = bytes(view[4:4 + size])
+    else:
+        payload = b""
+
+    if compression == GZIP_COMPRESSION and payload:
+        payload = gzip.decompress(payload)
+
+    return Frame(
+        message_type=message_type,
+        flags=flags,
+        serialization=serialization,
+        compression=compression,
+        payload=payload,
+        sequence=sequence,
+        error_code=error_code,
+    )
@@ -0,0 +1,105 @@
+"""
+提示语模板与固定短语复用
+
+"您的订单号是 {order}，预计 {time} 送达" 这类模板中，固定短语对同一音色、语速和编码只需合成一次，
+之后每次请求只合成变量部分，再按音频格式拼接成完整的音频。
+"""
+
+import re
+import string
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Tuple
+
+from .cache import MemoryCache, SingleFlight
+
+# 没有可发音字符（只有空白和标点）的片段不单独合成
+_SPEAKABLE = re.compile(r"\w")
+
+
+class PromptTemplate:
+    """
+    带变量的提示语模板，变量使用 str.format 的 {name} 语法
+
+    用法:
+        template = PromptTemplate("您的订单号是 {order}，预计 {time} 送达")
+        template.segments({"order": "12345", "time": "明天"})
+        # [(True, "您的订单号是"), (False, "12345"), (True, "，预计"), (False, "明天"), (True, "送达")]
+    """
+
+    def __init__(self, template: str):
+        self.template = template
+        pieces: List[Tuple[bool, str]] = []  # (是否为固定短语, 文本或变量名)
+        try:
+            parsed = list(string.Formatter().parse(template))
+        except ValueError as e:
+            raise ValueError(f"模板格式无效: {str(e)}") from None
+        for literal, field, spec, conversion in parsed:
+            if literal:
+                pieces.append((True, literal))
+            if field is None:
+                continue
+            if not field or spec or conversion:
+                raise ValueError(f"模板变量必须是 {{name}} 形式: {template}")
+            pieces.append((False, field))
+        self.pieces = tuple(pieces)
+        self.fields = tuple(dict.fromkeys(name for static, name in pieces if not static))
+
+    def __repr__(self) -> str:
+        return f"PromptTemplate({self.template!r})"
+
+    @property
+    def static_phrases(self) -> List[str]:
+        """需要合成的固定短语"""
+        return [text for static, text in self.segments({name: "" for name in self.fields}) if static]
+
+    def segments(self, values: Mapping[str, Any]) -> List[Tuple[bool, str]]:
+        """
+        按顺序返回 (是否为固定短语, 待合成文本)，去掉首尾空白和没有可发音字符的片段
+
+        Raises:
+            ValueError: 缺少模板变量
+        """
+        segments = []
+        for static, text in self.pieces:
+            if not static:
+                if text not in values:
+                    raise ValueError(f"缺少模板变量 {text}")
+                text = str(values[text])
+            text = text.strip()
+            if _SPEAKABLE.search(text):
+                segments.append((static, text))
+        return segments
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        """填入变量后的完整文本"""
+        return "".join(text if static else str(values[text]) for static, text in self.pieces)
+
+
+class PhraseCache:
+    """
+    固定短语的音频缓存
+
+    以音频总字节数为上限按LRU淘汰；同一短语的并发请求只合成一次。
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 ** 2):
+        self.cache = MemoryCache(max_bytes=max_bytes)
+        self.flights = SingleFlight()
+
+    async def get(self, key: str, factory: Callable[[], Awaitable[bytes]]) -> bytes:
+        """读取短语音频，未命中时调用 factory() 合成并缓存"""
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        async def load() -> bytes:
+            audio_data = await factory()
+            self.cache.put(key, audio_data)
+            return audio_data
+
+        return await self.flights.do(key, load)
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.cache.stats(), shared=self.flights.shared)
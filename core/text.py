@@ -0,0 +1,87 @@
+import re
+from typing import Iterator, List
+
+# 单次合成请求的文本上限（UTF-8字节）
+MAX_TEXT_BYTES = 1024
+
+# 句末标点（中英文），后面可跟引号/括号等闭合符号
+SENTENCE_BREAK = re.compile(r"(?:[。！？!?；;…]+|\.(?=\s)|\n+)[”’\"'」』）)\]]*\s*")
+# 句内停顿：逗号、顿号、冒号、破折号，以及英文单词间的空白
+CLAUSE_BREAK = re.compile(r"(?:[，,、：:]+|—+)\s*|\s+")
+
+
+def byte_length(text: str) -> int:
+    """文本的UTF-8字节长度"""
+    return len(text.encode("utf-8"))
+
+
+def split_after(text: str, pattern: re.Pattern) -> List[str]:
+    """在匹配位置之后切分，分隔符保留在前一段末尾"""
+    pieces = []
+    start = 0
+    for match in pattern.finditer(text):
+        if match.end() > start:
+            pieces.append(text[start:match.end()])
+            start = match.end()
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
+
+
+def _hard_split(text: str, max_bytes: int) -> Iterator[str]:
+    """按字符强制切分，保证不会截断多字节字符"""
+    current = []
+    size = 0
+    for char in text:
+        char_size = byte_length(char)
+        if size + char_size > max_bytes and current:
+            yield "".join(current)
+            current, size = [], 0
+        current.append(char)
+        size += char_size
+    if current:
+        yield "".join(current)
+
+
+def _fit(sentence: str, max_bytes: int) -> Iterator[str]:
+    """把超长句子拆成不超过上限的片段"""
+    if byte_length(sentence) <= max_bytes:
+        yield sentence
+        return
+    for clause in split_after(sentence, CLAUSE_BREAK):
+        if byte_length(clause) <= max_bytes:
+            yield clause
+        else:
+            yield from _hard_split(clause, max_bytes)
+
+
+def split_text(text: str, max_bytes: int = MAX_TEXT_BYTES) -> List[str]:
+    """
+    将长文本切分为多个不超过字节上限的片段
+
+    优先在句末标点处切分，单句超长时退化到逗号等句内停顿，
+    仍然超长时按字符强制切分。相邻的短句会合并，以减少请求次数。
+
+    Args:
+        text: 要切分的文本（中文、英文或混合）
+        max_bytes: 每段的UTF-8字节上限
+
+    Returns:
+        List[str]: 按原文顺序排列的文本片段
+    """
+    if max_bytes <= 0:
+        raise ValueError("max_bytes 必须大于0")
+
+    chunks = []
+    current = ""
+    for sentence in split_after(text, SENTENCE_BREAK):
+        for piece in _fit(sentence, max_bytes):
+            if current and byte_length(current + piece) > max_bytes:
+                chunks.append(current)
+                current = ""
+            current += piece
+    if current:
+        chunks.append(current)
+
+    # 去掉首尾空白后可能出现空段
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
@@ -1,23 +1,118 @@
-import base64
-import json
+import asyncio
+import os
+import time
 import uuid
-from typing import Dict, Any, Optional
+from collections import deque
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, Iterable, List, Mapping, Optional, Union
 import aiohttp
 import logging
-import ssl
+from . import codec, errors, metrics, streaming
+from .audio import AUDIO_ENCODINGS, Buffers, concat_buffers
+from .batch import Jobs, SynthesisJob, SynthesisResult, run_jobs
+from .cache import DiskCache, MemoryCache, SingleFlight, cache_key
 from .config import Config
+from .credentials import CredentialPool
+from .http import HttpClient
+from .sinks import DirectorySink, OutputSink
+from .ssml import compile_ssml, split_ssml
+from .template import PhraseCache, PromptTemplate
+from .text import MAX_TEXT_BYTES, byte_length, split_text
+from .voice_cloning import VoiceCloningService, check_speaker_ready
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _discard(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
 class TTSService:
-    def __init__(self, config: Config):
+    def __init__(
+        self,
+        config: Union[Config, CredentialPool],
+        client: Optional[HttpClient] = None,
+        cache: Optional[DiskCache] = None,
+        memory_cache: Optional[MemoryCache] = None,
+        dedup: bool = False,
+        speaker_gate: Optional[VoiceCloningService] = None,
+        gate_lookup: bool = False,
+        sink: Optional[OutputSink] = None,
+    ):
+        """
+        Args:
+            config: API配置，或按音色和剩余配额在多组凭据间路由的凭据池
+            client: 共享的HTTP客户端，不传则由服务自行创建并负责关闭
+            cache: 可选的磁盘缓存，命中时不发起网络请求
+            memory_cache: 可选的进程内缓存，优先于磁盘缓存查询
+            dedup: 是否合并相同参数的并发请求
+            speaker_gate: 合成前按它的训练状态缓存预检音色，未训练完成或训练失败的音色在本地拒绝
+            gate_lookup: 缓存中没有该音色时是否先查询一次训练状态，否则直接放行
+            sink: synthesize_to_file 的输出目标，不传则在线程池中直接写入 output_path 指定的文件
+        """
+        self.pool = config if isinstance(config, CredentialPool) else None
+        if self.pool is not None:
+            config = self.pool.config
         self.config = config
-        # 创建自定义 SSL 上下文
-        self.ssl_context = ssl.create_default_context()
-        self.ssl_context.check_hostname = False
-        self.ssl_context.verify_mode = ssl.CERT_NONE
-        
+        self._owns_client = client is None
+        self.client = client or HttpClient(config)
+        self.ssl_context = self.client.ssl_context
+        self.cache = cache
+        self.memory_cache = memory_cache
+        self.single_flight = SingleFlight() if dedup else None
+        self.phrase_cache = PhraseCache()
+        self.speaker_gate = speaker_gate
+        self.gate_lookup = gate_lookup
+        self._owns_sink = sink is None
+        self.sink = sink or DirectorySink(fsync="none")
+
+    def enable_memory_cache(self, max_bytes: int = 64 * 1024 ** 2, ttl: Optional[float] = None, dedup: bool = True):
+        """
+        开启进程内缓存和并发请求合并
+
+        Args:
+            max_bytes: 缓存总大小上限（字节）
+            ttl: 过期时间（秒），None 表示不过期
+            dedup: 是否同时开启并发请求合并
+        """
+        self.memory_cache = MemoryCache(max_bytes=max_bytes, ttl=ttl)
+        if dedup and self.single_flight is None:
+            self.single_flight = SingleFlight()
+
+    def disable_memory_cache(self):
+        """关闭进程内缓存和并发请求合并"""
+        self.memory_cache = None
+        self.single_flight = None
+
+    def cache_stats(self) -> Dict[str, Optional[Dict[str, int]]]:
+        """各级缓存的统计信息，未启用的为None"""
+        return {
+            "memory": self.memory_cache.stats() if self.memory_cache is not None else None,
+            "disk": self.cache.stats() if self.cache is not None else None,
+            "single_flight": self.single_flight.stats() if self.single_flight is not None else None,
+        }
+
+    async def close(self):
+        """关闭服务自行创建的HTTP客户端和输出目标"""
+        if self._owns_sink:
+            await self.sink.close()
+        if self._owns_client:
+            await self.client.close()
+
+    async def __aenter__(self) -> "TTSService":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
     async def synthesize(
         self,
         text: str,
@@ -39,13 +134,84 @@ class TTSService:
         Returns:
             bytes: 音频数据
         """
-        url = f"{self.config.host}/api/v1/tts"
-        
-        request_data = {
+        if self.cache is None and self.memory_cache is None and self.single_flight is None:
+            return await self._request(text, speaker_id, text_type, encoding, speed_ratio)
+
+        key = self._cache_key(text, speaker_id, text_type, encoding, speed_ratio)
+        if self.memory_cache is not None:
+            cached = self.memory_cache.get(key)
+            if cached is not None:
+                return cached
+
+        return await self._shared(key, lambda: self._load(key, text, speaker_id, text_type, encoding, speed_ratio))
+
+    def _cache_key(self, text: str, speaker_id: str, text_type: str, encoding: str, speed_ratio: float) -> str:
+        return cache_key(speaker_id, text, text_type, encoding, speed_ratio, self.config.tts_cluster)
+
+    async def _shared(self, key: str, factory: Callable[[], Awaitable[bytes]]) -> bytes:
+        """开启请求合并时，相同键的并发调用共享一次执行"""
+        if self.single_flight is None:
+            return await factory()
+        return await self.single_flight.do(key, factory)
+
+    async def _load(
+        self,
+        key: str,
+        text: str,
+        speaker_id: str,
+        text_type: str,
+        encoding: str,
+        speed_ratio: float,
+    ) -> bytes:
+        """依次查询磁盘缓存和合成接口"""
+        if self.cache is not None:
+            cached = await self._run_cache(self.cache.get, key)
+            if cached is not None:
+                if self.memory_cache is not None:
+                    self.memory_cache.put(key, cached)
+                return cached
+        return await self._fetch(key, text, speaker_id, text_type, encoding, speed_ratio)
+
+    async def _fetch(
+        self,
+        key: Optional[str],
+        text: str,
+        speaker_id: str,
+        text_type: str,
+        encoding: str,
+        speed_ratio: float,
+    ) -> bytes:
+        """请求合成接口，并写入已启用的缓存"""
+        audio_data = await self._request(text, speaker_id, text_type, encoding, speed_ratio)
+        if self.cache is not None:
+            await self._run_cache(self.cache.put, key, audio_data)
+        if self.memory_cache is not None:
+            self.memory_cache.put(key, audio_data)
+        return audio_data
+
+    @staticmethod
+    async def _run_cache(func: Callable[..., Any], *args) -> Any:
+        """在线程池中执行磁盘缓存的文件操作，不阻塞事件循环"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def _build_request(
+        self,
+        text: str,
+        speaker_id: str,
+        text_type: str,
+        encoding: str,
+        speed_ratio: float,
+        operation: str = "query",
+        config: Optional[Config] = None,
+    ) -> Dict[str, Any]:
+        """构造合成请求体，operation 为 query（一次性返回）或 submit（流式返回）"""
+        config = config or self.config
+        text = self._prepare_text(text, text_type)
+        return {
             "app": {
-                "appid": self.config.appid,
-                "token": self.config.token,
-                "cluster": self.config.tts_cluster
+                "appid": config.appid,
+                "token": config.token,
+                "cluster": config.tts_cluster
             },
             "user": {
                 "uid": str(uuid.uuid4())
@@ -59,30 +225,204 @@ class TTSService:
                 "reqid": str(uuid.uuid4()),
                 "text": text,
                 "text_type": text_type,
-                "operation": "query"
+                "operation": operation
             }
         }
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, 
-                                  json=request_data, 
-                                  headers=self.config.get_headers(),
-                                  ssl=self.ssl_context) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"语音合成失败: {error_text}")
-                
-                result = await response.json()
-                
-                if result.get("code") != 3000:
-                    raise Exception(f"语音合成错误: {result.get('message')}")
-                
-                if "data" not in result:
-                    raise Exception("响应中没有音频数据")
-                
-                return base64.b64decode(result["data"])
-    
-    async def synthesize_to_file(
+
+    def _encode_request(
+        self,
+        text: str,
+        speaker_id: str,
+        text_type: str,
+        encoding: str,
+        speed_ratio: float,
+        config: Config,
+    ) -> bytes:
+        """序列化一次性合成的请求体，与 _build_request 的结果等价，只把每次变化的字段拼入预编译的模板"""
+        text = self._prepare_text(text, text_type)
+        template = codec.request_template(config.appid, config.token, config.tts_cluster, speaker_id, encoding,
+                                          speed_ratio, text_type, "query")
+        return template.render(str(uuid.uuid4()), str(uuid.uuid4()), text)
+
+    @staticmethod
+    def _prepare_text(text: str, text_type: str) -> str:
+        """校验文本长度，SSML 在本地校验并规范化"""
+        if text_type == "ssml":
+            # 本地校验，无效的SSML不占用请求；规范化结果有缓存
+            text = compile_ssml(text).ssml
+        text_bytes = byte_length(text)
+        if text_bytes > MAX_TEXT_BYTES:
+            raise ValueError(
+                f"文本长度 {text_bytes} 字节，超过单次请求上限 {MAX_TEXT_BYTES} 字节（字符超限），"
+                "请使用 synthesize_long"
+            )
+        return text
+
+    async def _request(
+        self,
+        text: str,
+        speaker_id: str,
+        text_type: str,
+        encoding: str,
+        speed_ratio: float,
+    ) -> bytes:
+        """调用合成接口，使用凭据池时由凭据池选择凭据并在凭据出错时切换"""
+        await self._check_speaker(speaker_id)
+        try:
+            if self.pool is None:
+                return await self._request_with(self.config, text, speaker_id, text_type, encoding, speed_ratio)
+            return await self.pool.call(
+                self.client, speaker_id,
+                lambda config: self._request_with(config, text, speaker_id, text_type, encoding, speed_ratio),
+            )
+        except errors.SpeakerNotFoundError:
+            if self.speaker_gate is not None:
+                # 之后对该音色的请求在本地拒绝
+                self.speaker_gate.status_cache.put(speaker_id, {"speaker_id": speaker_id, "status": 0})
+            raise
+
+    async def _check_speaker(self, speaker_id: str):
+        """按训练状态缓存预检音色，不可用时抛出 SpeakerNotFoundError 或 SpeakerNotReadyError"""
+        if self.speaker_gate is None:
+            return
+        status = self.speaker_gate.status_cache.get(speaker_id)
+        if status is None:
+            if not self.gate_lookup:
+                return
+            status = await self.speaker_gate.get_status(speaker_id, cached=True)
+        check_speaker_ready(speaker_id, status)
+
+    async def _request_with(
+        self,
+        config: Config,
+        text: str,
+        speaker_id: str,
+        text_type: str,
+        encoding: str,
+        speed_ratio: float,
+    ) -> bytes:
+        """用一组凭据调用合成接口，受 (appid, cluster) 限流，并按客户端的弹性策略重试、熔断和对冲"""
+        url = f"{config.host}/api/v1/tts"
+
+        cluster = config.tts_cluster
+        limiter = self.client.limiter_for(config, cluster)
+
+        async def attempt() -> bytes:
+            # 每次尝试使用新的 reqid，并单独计时
+            with self.client.metrics.timer("tts", speaker_id, cluster) as timer:
+                payload = self._encode_request(text, speaker_id, text_type, encoding, speed_ratio, config)
+                return await limiter.run(lambda: self._post_tts(url, payload, timer, config),
+                                         on_wait=lambda waited: timer.record("queue", waited))
+
+        return await self.client.resilience.call(config.host, attempt)
+
+    async def _post_tts(self, url: str, payload: bytes, timer=None, config: Optional[Config] = None) -> bytes:
+        timer = timer or metrics.NULL_TIMER
+        async with self.client.post(url,
+                                    timer=timer,
+                                    data=payload,
+                                    headers=(config or self.config).get_headers()) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise errors.from_http_status(response.status, f"语音合成失败: {error_text}")
+
+            with timer.phase("download"):
+                body = await response.read()
+
+        with timer.phase("json_parse"):
+            # 音频部分不经过JSON解析，只取出 base64 字节切片
+            result, data = codec.parse_response(body)
+
+        if result.get("code") != 3000:
+            raise errors.from_tts_code(result.get("code"), f"语音合成错误: {result.get('message')}")
+
+        if data is None:
+            raise errors.ServerError("响应中没有音频数据")
+
+        with timer.phase("b64_decode"):
+            return codec.decode_audio(data)
+
+    @staticmethod
+    def _stream_url(config: Config) -> str:
+        host = config.host
+        if host.startswith("https://"):
+            host = "wss://" + host[len("https://"):]
+        elif host.startswith("http://"):
+            host = "ws://" + host[len("http://"):]
+        return f"{host}/api/v1/tts/ws_binary"
+
+    async def synthesize_stream(
+        self,
+        text: str,
+        speaker_id: str,
+        text_type: str = "plain",
+        encoding: str = "mp3",
+        speed_ratio: float = 1.0,
+    ) -> AsyncIterator[bytes]:
+        """
+        流式合成语音，通过二进制WebSocket协议边合成边返回音频
+
+        Args:
+            text: 要转换的文本
+            speaker_id: 声音ID（S_开头）
+            text_type: 文本类型 (plain/ssml)
+            encoding: 音频编码格式 (wav/pcm/ogg_opus/mp3)
+            speed_ratio: 语速 [0.2-3.0]
+
+        Yields:
+            bytes: 按顺序到达的音频片段
+
+        用法:
+            async for chunk in tts.synthesize_stream("你好", speaker_id="S_xxx"):
+                player.feed(chunk)
+        """
+        await self._check_speaker(speaker_id)
+        if self.pool is None:
+            async for chunk in self._stream_with(self.config, text, speaker_id, text_type, encoding, speed_ratio):
+                yield chunk
+            return
+        # 已经输出的音频无法撤回，流式合成不在凭据之间切换
+        async with self.pool.lease(self.client, speaker_id) as credential:
+            async for chunk in self._stream_with(credential.config, text, speaker_id, text_type, encoding,
+                                                 speed_ratio):
+                yield chunk
+
+    async def _stream_with(
+        self,
+        config: Config,
+        text: str,
+        speaker_id: str,
+        text_type: str,
+        encoding: str,
+        speed_ratio: float,
+    ) -> AsyncIterator[bytes]:
+        request_data = self._build_request(text, speaker_id, text_type, encoding, speed_ratio, operation="submit",
+                                           config=config)
+        headers = {"Authorization": f"Bearer;{config.token}"}
+
+        async with self.client.session.ws_connect(self._stream_url(config), headers=headers) as ws:
+            await ws.send_bytes(streaming.encode_request(request_data))
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.BINARY:
+                    if message.type == aiohttp.WSMsgType.ERROR:
+                        raise errors.NetworkError(f"流式合成连接错误: {ws.exception()}")
+                    continue
+
+                frame = streaming.parse_frame(message.data)
+                if frame.message_type == streaming.ERROR_MESSAGE:
+                    error = frame.payload.decode("utf-8", errors="replace")
+                    raise errors.from_tts_code(frame.error_code, f"语音合成错误: {frame.error_code} {error}")
+                if frame.message_type != streaming.AUDIO_ONLY_RESPONSE:
+                    continue
+
+                if frame.payload:
+                    yield frame.payload
+                if frame.is_last:
+                    return
+
+        raise errors.NetworkError("流式合成连接在音频结束前关闭")
+
+    async def synthesize_stream_to_file(
         self,
         text: str,
         output_path: str,
@@ -90,11 +430,12 @@ class TTSService:
         text_type: str = "plain",
         encoding: str = "mp3",
         speed_ratio: float = 1.0,
-        _return_response: bool = False
-    ) -> Optional[Dict]:
+    ) -> int:
         """
-        将文本合成为语音并保存到文件
-        
+        流式合成并在音频到达时逐段写入文件
+
+        直接写入 output_path，不经过服务的输出目标；文件操作在线程池中执行，不阻塞事件循环。
+
         Args:
             text: 要转换的文本
             output_path: 输出文件路径
@@ -102,26 +443,361 @@ class TTSService:
             text_type: 文本类型 (plain/ssml)
             encoding: 音频编码格式
             speed_ratio: 语速
-            _return_response: 是否返回响应数据
+
+        Returns:
+            int: 写入的字节数
         """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True))
+        tmp_path = f"{output_path}.part"
+        written = 0
         try:
-            audio_data = await self.synthesize(
-                text=text, 
-                speaker_id=speaker_id, 
+            f = await loop.run_in_executor(None, open, tmp_path, "wb")
+            try:
+                async for chunk in self.synthesize_stream(
+                    text=text,
+                    speaker_id=speaker_id,
+                    text_type=text_type,
+                    encoding=encoding,
+                    speed_ratio=speed_ratio
+                ):
+                    await loop.run_in_executor(None, f.write, chunk)
+                    written += len(chunk)
+            finally:
+                await loop.run_in_executor(None, f.close)
+            await loop.run_in_executor(None, os.replace, tmp_path, output_path)
+        except BaseException as e:
+            await loop.run_in_executor(None, _discard, tmp_path)
+            if isinstance(e, Exception):
+                logger.error(f"流式合成失败: {str(e)}")
+            raise
+
+        logger.info(f"语音已保存到: {output_path}")
+        return written
+
+    def split_long_text(self, text: str, text_type: str = "plain", max_bytes: int = MAX_TEXT_BYTES) -> List[str]:
+        """按单次请求的字节上限切分文本"""
+        if text_type == "ssml":
+            return split_ssml(text, max_bytes)
+        return split_text(text, max_bytes)
+
+    async def iter_synthesize_long(
+        self,
+        text: str,
+        speaker_id: str,
+        text_type: str = "plain",
+        encoding: str = "mp3",
+        speed_ratio: float = 1.0,
+        max_bytes: int = MAX_TEXT_BYTES,
+        concurrency: int = 4,
+    ) -> AsyncIterator[bytes]:
+        """
+        分段合成长文本，按原文顺序逐段产出音频
+
+        最多同时进行 concurrency 个请求，第一段完成后即可产出，
+        无需等待后续片段，适合边合成边播放。
+
+        Args:
+            text: 要转换的长文本
+            speaker_id: 声音ID
+            text_type: 文本类型 (plain/ssml)
+            encoding: 音频编码格式
+            speed_ratio: 语速
+            max_bytes: 每段的字节上限
+            concurrency: 最大并发请求数
+
+        Yields:
+            bytes: 每个片段的音频数据
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency 必须大于等于1")
+
+        chunks = iter(self.split_long_text(text, text_type, max_bytes))
+        pending = deque()
+
+        def schedule() -> bool:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return False
+            pending.append(asyncio.ensure_future(self.synthesize(
+                text=chunk,
+                speaker_id=speaker_id,
                 text_type=text_type,
                 encoding=encoding,
                 speed_ratio=speed_ratio
+            )))
+            return True
+
+        try:
+            while len(pending) < concurrency and schedule():
+                pass
+            while pending:
+                audio_data = await pending.popleft()
+                schedule()
+                yield audio_data
+        finally:
+            # 出错或调用方提前退出时取消尚未完成的请求
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def synthesize_long(
+        self,
+        text: str,
+        speaker_id: str,
+        text_type: str = "plain",
+        encoding: str = "mp3",
+        speed_ratio: float = 1.0,
+        max_bytes: int = MAX_TEXT_BYTES,
+        concurrency: int = 4,
+        gap: float = 0.0,
+    ) -> bytes:
+        """
+        合成任意长度的文本，分段并发请求后按音频格式拼接
+
+        Args:
+            gap: 相邻两段之间插入的静音时长（秒）
+            其余参数参见 iter_synthesize_long
+
+        Returns:
+            bytes: 拼接后的音频数据
+        """
+        buffers = await self._synthesize_long_buffers(
+            text, speaker_id, text_type, encoding, speed_ratio, max_bytes, concurrency, gap)
+        return b"".join(buffers)
+
+    async def _synthesize_long_buffers(
+        self,
+        text: str,
+        speaker_id: str,
+        text_type: str,
+        encoding: str,
+        speed_ratio: float,
+        max_bytes: int,
+        concurrency: int,
+        gap: float,
+    ) -> Buffers:
+        """分段合成并拼接，返回可直接 writelines 的缓冲区列表"""
+        parts = []
+        async for audio_data in self.iter_synthesize_long(
+            text=text,
+            speaker_id=speaker_id,
+            text_type=text_type,
+            encoding=encoding,
+            speed_ratio=speed_ratio,
+            max_bytes=max_bytes,
+            concurrency=concurrency
+        ):
+            parts.append(audio_data)
+        return self._concat(parts, encoding, gap)
+
+    def _concat(self, parts: List[bytes], encoding: str, gap: float) -> Buffers:
+        """按音频格式拼接片段，无法识别格式时退化为直接拼接字节"""
+        if len(parts) < 2 and not gap:
+            return parts
+        if encoding not in AUDIO_ENCODINGS:
+            return parts
+        try:
+            # 去掉片段中间的文件头和元数据，避免时长错误或文件损坏
+            return concat_buffers(parts, encoding, gap)
+        except ValueError as e:
+            logger.warning(f"无法按 {encoding} 格式拼接，直接拼接字节: {str(e)}")
+            return parts
+
+    async def synthesize_template(
+        self,
+        template: Union[str, PromptTemplate],
+        values: Mapping[str, Any],
+        speaker_id: str,
+        encoding: str = "mp3",
+        speed_ratio: float = 1.0,
+        gap: float = 0.0,
+    ) -> bytes:
+        """
+        按模板合成语音，固定短语复用缓存的音频，只合成变量部分
+
+        Args:
+            template: 模板或模板字符串，如 "您的订单号是 {order}，预计 {time} 送达"
+            values: 变量名 -> 值
+            speaker_id: 声音ID
+            encoding: 音频编码格式
+            speed_ratio: 语速
+            gap: 相邻片段之间插入的静音时长（秒）
+
+        Returns:
+            bytes: 拼接后的音频数据
+        """
+        clips = await self.synthesize_template_many(template, [values], speaker_id, encoding, speed_ratio, gap)
+        return clips[0]
+
+    async def synthesize_template_many(
+        self,
+        template: Union[str, PromptTemplate],
+        values_list: Iterable[Mapping[str, Any]],
+        speaker_id: str,
+        encoding: str = "mp3",
+        speed_ratio: float = 1.0,
+        gap: float = 0.0,
+        concurrency: int = 8,
+    ) -> List[bytes]:
+        """
+        按同一模板批量合成
+
+        固定短语按 (音色, 语速, 编码) 缓存在 phrase_cache 中，只在第一次使用时合成；
+        同一批次中相同的变量值只合成一次。
+
+        Args:
+            values_list: 每条音频的变量
+            concurrency: 最大并发请求数
+            其余参数参见 synthesize_template
+
+        Returns:
+            List[bytes]: 与 values_list 顺序一致的音频数据
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency 必须大于等于1")
+        if isinstance(template, str):
+            template = PromptTemplate(template)
+        clips = [template.segments(values) for values in values_list]
+
+        # 文本 -> 是否为固定短语；与固定短语相同的变量值也从短语缓存读取
+        texts: Dict[str, bool] = {}
+        for segments in clips:
+            for static, text in segments:
+                texts[text] = texts.get(text, False) or static
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(text: str, static: bool) -> bytes:
+            async with semaphore:
+                if not static:
+                    return await self.synthesize(text, speaker_id, encoding=encoding, speed_ratio=speed_ratio)
+                key = self._cache_key(text, speaker_id, "plain", encoding, speed_ratio)
+                return await self.phrase_cache.get(
+                    key, lambda: self.synthesize(text, speaker_id, encoding=encoding, speed_ratio=speed_ratio))
+
+        results = await asyncio.gather(*(fetch(text, static) for text, static in texts.items()))
+        audio = dict(zip(texts, results))
+        return [
+            b"".join(self._concat([audio[text] for _, text in segments], encoding, gap))
+            for segments in clips
+        ]
+
+    async def synthesize_many(self, jobs: Jobs, concurrency: int = 8) -> AsyncIterator[SynthesisResult]:
+        """
+        批量合成，以有限并发执行并按完成顺序产出结果
+
+        所有任务共享服务的连接池。失败的任务以带 error 的结果返回，
+        不会中断其余任务。
+
+        Args:
+            jobs: SynthesisJob 或等价字典的同步/异步可迭代对象，
+                  字段: text, speaker_id, text_type, encoding, speed_ratio, output_path
+            concurrency: 最大并发请求数
+
+        Yields:
+            SynthesisResult: 含任务序号 index；设置了 output_path 的任务不保留音频数据
+
+        用法:
+            async for result in tts.synthesize_many(jobs, concurrency=16):
+                if not result.ok:
+                    logger.error(f"任务 {result.index} 失败: {result.error}")
+        """
+        async def handle(job: SynthesisJob) -> Optional[bytes]:
+            if job.output_path:
+                await self.synthesize_to_file(
+                    text=job.text,
+                    output_path=job.output_path,
+                    speaker_id=job.speaker_id,
+                    text_type=job.text_type,
+                    encoding=job.encoding,
+                    speed_ratio=job.speed_ratio
+                )
+                return None
+            return await self.synthesize(
+                text=job.text,
+                speaker_id=job.speaker_id,
+                text_type=job.text_type,
+                encoding=job.encoding,
+                speed_ratio=job.speed_ratio
             )
+
+        async for result in run_jobs(handle, jobs, concurrency=concurrency):
+            yield result
+
+    async def synthesize_to_file(
+        self,
+        text: str,
+        output_path: str,
+        speaker_id: str,
+        text_type: str = "plain",
+        encoding: str = "mp3",
+        speed_ratio: float = 1.0,
+        _return_response: bool = False,
+        long_text: bool = False,
+        concurrency: int = 4,
+        gap: float = 0.0,
+    ) -> Optional[Dict]:
+        """
+        将文本合成为语音并保存到文件
+
+        写入由服务的输出目标在线程池中完成，不阻塞事件循环。
+
+        Args:
+            text: 要转换的文本
+            output_path: 输出文件路径，使用自定义输出目标时为目标内的名称
+            speaker_id: 声音ID
+            text_type: 文本类型 (plain/ssml)
+            encoding: 音频编码格式
+            speed_ratio: 语速
+            _return_response: 是否返回响应数据
+            long_text: 是否按长文本分段并发合成
+            concurrency: 长文本模式下的最大并发请求数
+            gap: 长文本模式下相邻两段之间插入的静音时长（秒）
+        """
+        try:
+            if self.cache is not None and not long_text:
+                key = self._cache_key(text, speaker_id, text_type, encoding, speed_ratio)
+                cached_path = await self._run_cache(self.cache.get_path, key)
+                if cached_path is not None:
+                    # 命中缓存：直接链接缓存文件，不再解码或写入音频数据
+                    await self.sink.write_file(output_path, cached_path)
+                    logger.info(f"语音已保存到: {output_path}（缓存）")
+                    if _return_response:
+                        # output_path 是输出目标内的名称，不一定是本地文件，从缓存文件读取
+                        audio = await asyncio.get_running_loop().run_in_executor(None, _read_file, cached_path)
+                        return {"code": 0, "message": "success", "data": {"audio": audio}}
+                    return None
+                audio_data = self.memory_cache.get(key) if self.memory_cache is not None else None
+                if audio_data is None:
+                    audio_data = await self._shared(
+                        key, lambda: self._fetch(key, text, speaker_id, text_type, encoding, speed_ratio))
+            elif long_text:
+                # 拼接结果直接写入文件，不在内存中组装完整音频
+                buffers = await self._synthesize_long_buffers(
+                    text, speaker_id, text_type, encoding, speed_ratio, MAX_TEXT_BYTES, concurrency, gap)
+                audio_data = None
+            else:
+                audio_data = await self.synthesize(
+                    text=text,
+                    speaker_id=speaker_id,
+                    text_type=text_type,
+                    encoding=encoding,
+                    speed_ratio=speed_ratio
+                )
+            if audio_data is not None:
+                buffers = [audio_data]
             
-            import os
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            with open(output_path, "wb") as f:
-                f.write(audio_data)
+            start = time.perf_counter()
+            await self.sink.write(output_path, buffers)
+            self.client.metrics.record_phase("tts", "file_write", time.perf_counter() - start,
+                                             speaker_id, self.config.tts_cluster)
             
             logger.info(f"语音已保存到: {output_path}")
             
             if _return_response:
-                return {"code": 0, "message": "success", "data": {"audio": audio_data}}
+                return {"code": 0, "message": "success", "data": {"audio": b"".join(buffers)}}
                 
         except Exception as e:
             logger.error(f"合成失败: {str(e)}")
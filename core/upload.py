@@ -0,0 +1,179 @@
+"""训练音频的流式上传：分块读取文件并边编码边发送"""
+
+import asyncio
+import base64
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+from .audio import HEADER_BYTES, detect_file_format, detect_format
+
+# 每次读取的字节数，必须是3的倍数，保证分块编码的base64可以直接拼接
+UPLOAD_CHUNK_SIZE = 3 * 64 * 1024
+
+# 训练接口支持的音频格式
+SUPPORTED_TRAINING_FORMATS = ("wav", "mp3", "ogg", "m4a", "aac", "pcm")
+
+
+def encoded_length(size: int) -> int:
+    """size 字节数据经base64编码后的长度"""
+    return 4 * ((size + 2) // 3)
+
+
+@dataclass
+class AudioSample:
+    """待上传的训练音频"""
+    path: str
+    audio_format: str
+    size: int
+
+    @classmethod
+    def from_path(cls, path: str) -> "AudioSample":
+        """按文件头识别格式，无法识别时使用文件扩展名"""
+        return cls(path=path, audio_format=detect_file_format(path) or "", size=os.path.getsize(path))
+
+    @property
+    def encoded_size(self) -> int:
+        return encoded_length(self.size)
+
+
+def prepare_sample(path: str) -> AudioSample:
+    """
+    读取并校验单个训练音频，按文件头识别格式
+
+    Raises:
+        ValueError: 文件为空、无法识别或格式不受支持
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        header = f.read(HEADER_BYTES)
+    if size == 0:
+        raise ValueError(f"音频文件为空: {path}")
+
+    audio_format = detect_format(header)
+    if audio_format is None:
+        # 裸PCM没有文件头，只能依据扩展名
+        if os.path.splitext(path)[1].lower() != ".pcm":
+            raise ValueError(f"无法识别音频格式: {path}")
+        audio_format = "pcm"
+    if audio_format not in SUPPORTED_TRAINING_FORMATS:
+        raise ValueError(f"不支持的音频格式 {audio_format}: {path}")
+    return AudioSample(path=path, audio_format=audio_format, size=size)
+
+
+async def prepare_samples(paths: Sequence[str], max_workers: Optional[int] = None) -> List[AudioSample]:
+    """
+    在线程池中并行读取和校验多个训练音频，总耗时取决于最慢的文件
+
+    Args:
+        paths: 音频文件路径
+        max_workers: 线程数，默认与文件数相同（最多32）
+
+    Returns:
+        List[AudioSample]: 与 paths 顺序一致的音频信息
+    """
+    if not paths:
+        raise ValueError("至少需要一个音频文件")
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=max_workers or min(32, len(paths))) as executor:
+        return list(await asyncio.gather(*[
+            loop.run_in_executor(executor, prepare_sample, path) for path in paths
+        ]))
+
+
+def batch_samples(samples: Sequence[AudioSample], max_batch_bytes: Optional[int] = None) -> List[List[AudioSample]]:
+    """
+    按编码后的大小把音频分成若干批，每批不超过 max_batch_bytes（单个超限的音频独占一批）
+
+    Args:
+        samples: 音频列表
+        max_batch_bytes: 每批编码后的字节上限，None 表示全部放在一批
+    """
+    if max_batch_bytes is None:
+        return [list(samples)]
+    batches: List[List[AudioSample]] = []
+    current: List[AudioSample] = []
+    size = 0
+    for sample in samples:
+        if current and size + sample.encoded_size > max_batch_bytes:
+            batches.append(current)
+            current, size = [], 0
+        current.append(sample)
+        size += sample.encoded_size
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def iter_base64_file(path: str, chunk_size: int = UPLOAD_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    分块读取文件并逐块base64编码，文件读取在线程池中执行，不阻塞事件循环
+
+    Args:
+        path: 文件路径
+        chunk_size: 每次读取的字节数（3的倍数）
+
+    Yields:
+        bytes: base64编码后的数据块
+    """
+    if chunk_size % 3:
+        raise ValueError("chunk_size 必须是3的倍数")
+    loop = asyncio.get_running_loop()
+    f = await loop.run_in_executor(None, open, path, "rb")
+    try:
+        while True:
+            chunk = await loop.run_in_executor(None, f.read, chunk_size)
+            if not chunk:
+                break
+            yield base64.b64encode(chunk)
+    finally:
+        await loop.run_in_executor(None, f.close)
+
+
+class UploadBody:
+    """
+    流式生成的上传请求体
+
+    生成与一次性 json.dumps 等价的JSON，但音频内容按块读取、编码和发送，
+    内存占用与文件大小无关。请求体长度可以预先计算，无需分块传输编码。
+    """
+
+    def __init__(self, fields: Dict[str, Any], samples: List[AudioSample], chunk_size: int = UPLOAD_CHUNK_SIZE):
+        """
+        Args:
+            fields: 除 audios 之外的请求字段
+            samples: 要上传的音频
+            chunk_size: 每次读取的字节数（3的倍数）
+        """
+        self.fields = fields
+        self.samples = samples
+        self.chunk_size = chunk_size
+
+    def _parts(self) -> List[Any]:
+        """请求体的组成部分：bytes 为固定JSON片段，AudioSample 为需要流式编码的音频"""
+        head = json.dumps(self.fields, ensure_ascii=False)[:-1]
+        parts: List[Any] = [(head + (', ' if self.fields else '') + '"audios": [').encode("utf-8")]
+        for i, sample in enumerate(self.samples):
+            prefix = ", " if i else ""
+            parts.append(f'{prefix}{{"audio_format": {json.dumps(sample.audio_format)}, "audio_bytes": "'.encode("utf-8"))
+            parts.append(sample)
+            parts.append(b'"}')
+        parts.append(b"]}")
+        return parts
+
+    @property
+    def content_length(self) -> int:
+        return sum(
+            encoded_length(part.size) if isinstance(part, AudioSample) else len(part)
+            for part in self._parts()
+        )
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for part in self._parts():
+            if isinstance(part, AudioSample):
+                async for chunk in iter_base64_file(part.path, self.chunk_size):
+                    yield chunk
+            else:
+                yield part
@@ -1,126 +1,344 @@
 import asyncio
 import base64
+import json
 import os
-import ssl
-from typing import Dict, Any
-import aiohttp
+import time
+from typing import Awaitable, Callable, Dict, Any, Iterable, Optional, Sequence, Tuple, Union
 import logging
+from . import errors
+from .cache import SingleFlight
 from .config import Config
+from .credentials import CredentialPool
+from .http import HttpClient
+from .upload import UploadBody, batch_samples, prepare_samples
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 训练状态：0=未找到, 1=训练中, 2=成功, 3=失败, 4=激活
+NOT_FOUND_STATUS = 0
+TRAINING_STATUS = 1
+READY_STATUSES = (2, 4)
+FAILED_STATUS = 3
+
+
+class SpeakerStatusCache:
+    """
+    音色训练状态缓存
+
+    训练中的状态随时会变化，使用较短的过期时间；其余状态只会在重新训练时改变，而训练和等待完成时会直接更新缓存。
+    """
+
+    def __init__(self, ttl: float = 300.0, pending_ttl: float = 10.0):
+        """
+        Args:
+            ttl: 未找到、成功、失败、激活状态的过期时间（秒）
+            pending_ttl: 训练中状态的过期时间（秒）
+        """
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, tuple] = {}  # speaker_id -> (status, expires_at)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, speaker_id: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的状态，未缓存或已过期返回None"""
+        entry = self._entries.get(speaker_id)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._entries[speaker_id]
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def put(self, speaker_id: str, status: Dict[str, Any]):
+        ttl = self.pending_ttl if status.get("status") == TRAINING_STATUS else self.ttl
+        self._entries[speaker_id] = (status, time.monotonic() + ttl)
+
+    def invalidate(self, speaker_id: Optional[str] = None):
+        """删除一个音色的缓存，不传则全部清空"""
+        if speaker_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(speaker_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def check_speaker_ready(speaker_id: str, status: Dict[str, Any]):
+    """
+    确认音色已可用于合成
+
+    Raises:
+        SpeakerNotFoundError: 音色不存在
+        SpeakerNotReadyError: 音色训练中或训练失败
+    """
+    code = status.get("status")
+    if code == NOT_FOUND_STATUS:
+        raise errors.SpeakerNotFoundError(f"音色 {speaker_id} 不存在或尚未上传训练音频")
+    if code == TRAINING_STATUS:
+        raise errors.SpeakerNotReadyError(f"音色 {speaker_id} 正在训练中")
+    if code == FAILED_STATUS:
+        raise errors.SpeakerNotReadyError(f"音色 {speaker_id} 训练失败")
+
+
 class VoiceCloningService:
-    def __init__(self, config: Config):
+    def __init__(self, config: Union[Config, CredentialPool], client: Optional[HttpClient] = None,
+                 status_cache: Optional[SpeakerStatusCache] = None):
+        """
+        Args:
+            config: API配置，或凭据池（按音色选择所属的 appid）
+            client: 共享的HTTP客户端，不传则由服务自行创建并负责关闭
+            status_cache: 训练状态缓存，不传则使用默认过期时间创建
+        """
+        self.pool = config if isinstance(config, CredentialPool) else None
+        if self.pool is not None:
+            config = self.pool.config
         self.config = config
-        
-    async def encode_audio_file(self, file_path: str) -> tuple[str, str]:
-        """将音频文件编码为base64格式"""
+        self._owns_client = client is None
+        self.client = client or HttpClient(config)
+        self.status_cache = status_cache or SpeakerStatusCache()
+        self._status_flight = SingleFlight()
+
+    async def close(self):
+        """关闭服务自行创建的HTTP客户端"""
+        if self._owns_client:
+            await self.client.close()
+
+    async def __aenter__(self) -> "VoiceCloningService":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def encode_audio_file(self, file_path: str) -> Tuple[str, str]:
+        """将音频文件编码为base64格式（一次性读入内存，大文件上传请使用 train）"""
         with open(file_path, 'rb') as audio_file:
             audio_data = audio_file.read()
             encoded_data = base64.b64encode(audio_data).decode('utf-8')
             audio_format = os.path.splitext(file_path)[1][1:]  # 获取文件扩展名
             return encoded_data, audio_format
     
-    async def train(self, audio_path: str, speaker_id: str) -> Dict[str, Any]:
+    async def train(
+        self,
+        audio_path: Union[str, Sequence[str]],
+        speaker_id: str,
+        max_batch_bytes: Optional[int] = None,
+    ) -> Dict[str, Any]:
         """
         上传音频并开始训练
         
         Args:
-            audio_path: 音频文件路径
+            audio_path: 音频文件路径，或同一音色的多个音频文件路径
             speaker_id: 声音ID
+            max_batch_bytes: 每个请求中音频编码后的字节上限，超过时分多个请求依次上传，
+                             None 表示所有音频放在同一个请求中
+
+        Returns:
+            Dict[str, Any]: 最后一个上传请求的响应
         """
-        url = f"{self.config.host}/api/v1/mega_tts/audio/upload"
-        
-        # 准备请求头
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer;{self.config.token}",
-            "Resource-Id": "volc.megatts.voiceclone"
-        }
-        
-        # 编码音频文件
-        encoded_data, audio_format = await self.encode_audio_file(audio_path)
-        
-        # 准备请求数据
-        data = {
-            "appid": self.config.appid,
-            "speaker_id": speaker_id,
-            "audios": [{
-                "audio_bytes": encoded_data,
-                "audio_format": audio_format
-            }],
-            "source": 2,
-            "language": 0,  # 默认中文
-            "model_type": 1  # 使用2.0效果
-        }
-        
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        
-        connector = aiohttp.TCPConnector(ssl=ssl_context)
-        async with aiohttp.ClientSession(connector=connector) as session:
-            async with session.post(url, json=data, headers=headers) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"训练请求错误: {error_text}")
-                
-                return await response.json()
-    
-    async def get_status(self, speaker_id: str) -> Dict[str, Any]:
-        """获取训练状态"""
-        url = f"{self.config.host}/api/v1/mega_tts/status"
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer;{self.config.token}",
-            "Resource-Id": "volc.megatts.voiceclone"
-        }
-        
-        data = {
-            "appid": self.config.appid,
-            "speaker_id": speaker_id
-        }
-        
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        
-        connector = aiohttp.TCPConnector(ssl=ssl_context)
-        async with aiohttp.ClientSession(connector=connector) as session:
-            async with session.post(url, json=data, headers=headers) as response:
+        # 并行读取和校验所有音频
+        paths = [audio_path] if isinstance(audio_path, str) else list(audio_path)
+        samples = await prepare_samples(paths)
+        batches = batch_samples(samples, max_batch_bytes)
+
+        async def send(config: Config) -> Dict[str, Any]:
+            url = f"{config.host}/api/v1/mega_tts/audio/upload"
+
+            # 准备请求头
+            headers = {
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer;{config.token}",
+                "Resource-Id": "volc.megatts.voiceclone"
+            }
+
+            # 准备请求数据，音频在发送时分块读取并编码
+            fields = {
+                "appid": config.appid,
+                "speaker_id": speaker_id,
+                "source": 2,
+                "language": 0,  # 默认中文
+                "model_type": 1  # 使用2.0效果
+            }
+
+            def upload(batch) -> Dict[str, Any]:
+                # 每次尝试重新生成请求体，文件从头读取
+                body = UploadBody(fields, batch)
+                batch_headers = dict(headers, **{"Content-Length": str(body.content_length)})
+                return {"data": body.__aiter__(), "headers": batch_headers}
+
+            result = None
+            for i, batch in enumerate(batches, 1):
+                result = await self._post(config, "upload", url, speaker_id, "训练请求错误", lambda: upload(batch))
+                if len(batches) > 1:
+                    logger.info(f"已上传第 {i}/{len(batches)} 批训练音频（{len(batch)} 个文件）")
+            return result
+
+        result = await self._with_config(speaker_id, send)
+        # 上传完成后音色进入训练中，不等过期就更新缓存
+        self.status_cache.put(speaker_id, {"speaker_id": speaker_id, "status": TRAINING_STATUS})
+        return result
+
+    async def get_status(self, speaker_id: str, cached: bool = False) -> Dict[str, Any]:
+        """
+        获取训练状态，查询结果写入状态缓存
+
+        Args:
+            speaker_id: 声音ID
+            cached: 是否优先使用未过期的缓存；相同音色的并发查询只发起一次请求
+        """
+        if cached:
+            status = self.status_cache.get(speaker_id)
+            if status is not None:
+                return status
+            return await self._status_flight.do(speaker_id, lambda: self._fetch_status(speaker_id))
+        return await self._fetch_status(speaker_id)
+
+    async def get_statuses(self, speaker_ids: Iterable[str], cached: bool = True,
+                           concurrency: int = 8) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取训练状态
+
+        接口每次只能查询一个音色，缓存未命中的音色去重后并发查询，受限流器约束。
+
+        Args:
+            speaker_ids: 声音ID列表
+            cached: 是否优先使用未过期的缓存
+            concurrency: 最大并发查询数
+
+        Returns:
+            Dict[str, Dict[str, Any]]: speaker_id -> 状态信息
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def lookup(speaker_id: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.get_status(speaker_id, cached=cached)
+
+        unique = list(dict.fromkeys(speaker_ids))
+        statuses = await asyncio.gather(*(lookup(speaker_id) for speaker_id in unique))
+        return dict(zip(unique, statuses))
+
+    async def _fetch_status(self, speaker_id: str) -> Dict[str, Any]:
+        async def send(config: Config) -> Dict[str, Any]:
+            url = f"{config.host}/api/v1/mega_tts/status"
+
+            headers = {
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer;{config.token}",
+                "Resource-Id": "volc.megatts.voiceclone"
+            }
+
+            data = {
+                "appid": config.appid,
+                "speaker_id": speaker_id
+            }
+
+            return await self._post(config, "status", url, speaker_id, "状态查询失败",
+                                    lambda: {"json": data, "headers": headers})
+
+        status = await self._with_config(speaker_id, send)
+        self.status_cache.put(speaker_id, status)
+        return status
+
+    async def _with_config(self, speaker_id: str,
+                           send: Callable[[Config], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        用音色所属的凭据发送请求
+
+        音色只属于一个 appid，训练和状态查询不在凭据之间切换，也不使用溢出集群。
+        合成返回过音色不存在的 appid 仍然可以训练和查询（音色可能刚刚上传），
+        训练成功或查询到已上传的状态后恢复该 appid 的合成路由。
+        """
+        if self.pool is None:
+            return await send(self.config)
+
+        async def send_and_confirm(config: Config) -> Dict[str, Any]:
+            result = await send(config)
+            if result.get("status") != NOT_FOUND_STATUS:
+                self.pool.mark_valid(config.appid, speaker_id)
+            return result
+
+        return await self.pool.call(self.client, speaker_id, send_and_confirm, failover=False, overflow=False,
+                                    check_invalid=False)
+
+    async def _post(
+        self,
+        config: Config,
+        endpoint: str,
+        url: str,
+        speaker_id: str,
+        error_message: str,
+        request_kwargs: Callable[[], Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        发送请求并解析JSON响应，受限流器和弹性策略保护，不做对冲
+
+        Args:
+            config: 发送请求使用的凭据
+            endpoint: 指标中的接口名
+            url: 请求地址
+            speaker_id: 声音ID
+            error_message: HTTP错误时的提示前缀
+            request_kwargs: 每次尝试生成新的请求参数（data/json、headers）
+        """
+        cluster = config.resource_id
+        limiter = self.client.limiter_for(config, cluster)
+
+        async def send(timer) -> Dict[str, Any]:
+            async with self.client.post(url, timer=timer, **request_kwargs()) as response:
                 if response.status != 200:
                     error_text = await response.text()
-                    raise Exception(f"状态查询失败: {error_text}")
-                
-                return await response.json()
+                    raise errors.from_http_status(response.status, f"{error_message}: {error_text}")
+
+                with timer.phase("download"):
+                    body = await response.read()
+
+            with timer.phase("json_parse"):
+                return json.loads(body)
+
+        async def attempt() -> Dict[str, Any]:
+            with self.client.metrics.timer(endpoint, speaker_id, cluster) as timer:
+                return await limiter.run(lambda: send(timer), on_wait=lambda waited: timer.record("queue", waited))
+
+        return await self.client.resilience.call(config.host, attempt, hedge=False)
     
-    async def wait_for_completion(self, speaker_id: str, timeout: int = 3600) -> Dict[str, Any]:
+    async def wait_for_completion(self, speaker_id: str, timeout: int = 3600, poller=None) -> Dict[str, Any]:
         """
         等待训练完成
         
         Args:
             speaker_id: 声音ID
             timeout: 超时时间（秒）
+            poller: 可选的共享 StatusPoller，等待大量音色时统一调度状态查询
         """
+        if poller is not None:
+            status = await poller.wait(speaker_id, timeout=timeout)
+            self.status_cache.put(speaker_id, status)
+            return status
+
         start_time = asyncio.get_event_loop().time()
         
         while True:
             status = await self.get_status(speaker_id)
             
             # 状态：0=未找到, 1=训练中, 2=成功, 3=失败, 4=激活
-            if status["status"] in (2, 4):  # Success or Active
+            if status["status"] in READY_STATUSES:  # Success or Active
                 return status
-            elif status["status"] == 3:  # Failed
-                raise Exception(f"训练失败: {status}")
+            elif status["status"] == FAILED_STATUS:  # Failed
+                raise errors.TrainingFailedError(f"训练失败: {status}")
             
             if asyncio.get_event_loop().time() - start_time > timeout:
                 raise TimeoutError("训练超时")
             
             await asyncio.sleep(10)  # 每10秒检查一次
 
-    async def train_and_wait(self, audio_path: str, speaker_id: str) -> Dict[str, Any]:
+    async def train_and_wait(self, audio_path: Union[str, Sequence[str]], speaker_id: str) -> Dict[str, Any]:
         """上传音频、开始训练并等待完成"""
         await self.train(audio_path, speaker_id)
         return await self.wait_for_completion(speaker_id)
\ No newline at end of file
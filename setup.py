@@ -10,5 +10,17 @@ setup(
         "pytest-asyncio>=0.25.0",
         "python-dotenv>=1.0.0",
     ],
+    extras_require={
+        "fast": ["orjson>=3.0"],
+    },
+    entry_points={
+        "console_scripts": [
+            "voice-clone-batch=core.cli:main",
+            "voice-clone-client=core.daemon_client:main",
+            "voice-clone-daemon=core.daemon:main",
+            "voice-clone-gateway=core.gateway:main",
+            "voice-clone-pack=core.pack:main",
+        ],
+    },
     python_requires=">=3.7",
 )
@@ -0,0 +1,90 @@
+import asyncio
+import base64
+import json
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from core.config import Config
+
+
+class FakeAPI:
+    """本地模拟的TTS/声音复刻接口，用于离线测试"""
+
+    def __init__(self):
+        self.requests = []  # (path, body) 列表
+        self.peers = set()  # 客户端连接的 (ip, port)
+        self.statuses = {}  # speaker_id -> status
+        self.delay = 0.0  # 每个合成请求的模拟耗时（秒）
+        self.delays = []  # 依次使用的单次请求耗时，用完后使用 delay
+        self.failures = []  # 依次注入的故障：("http", 状态码) 或 ("code", 业务错误码)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.server = None
+
+    @property
+    def host(self) -> str:
+        return str(self.server.make_url("")).rstrip("/")
+
+    def config(self, **kwargs) -> Config:
+        # 本地服务不需要客户端限流，默认放宽配额
+        kwargs.setdefault("rate_limit", 10000.0)
+        kwargs.setdefault("max_concurrency", 1000)
+        return Config(appid="test_appid", token="test_token", host=self.host, **kwargs)
+
+    def _record(self, request: web.Request, body: dict):
+        self.peers.add(request.transport.get_extra_info("peername"))
+        self.requests.append((request.path, body))
+
+    async def tts(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self._record(request, body)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.pop(0) if self.delays else self.delay)
+        finally:
+            self.in_flight -= 1
+        if self.failures:
+            kind, value = self.failures.pop(0)
+            if kind == "http":
+                return web.Response(status=value, text="injected failure")
+            return web.json_response({"reqid": body["request"]["reqid"], "code": value, "message": "injected"})
+        text = body["request"]["text"]
+        if "[fail]" in text:
+            return web.json_response({"reqid": body["request"]["reqid"], "code": 3011, "message": "无效文本"})
+        audio = f"AUDIO[{text}]".encode("utf-8")
+        return web.json_response({
+            "reqid": body["request"]["reqid"],
+            "code": 3000,
+            "message": "Success",
+            "data": base64.b64encode(audio).decode("ascii"),
+        })
+
+    async def upload(self, request: web.Request) -> web.Response:
+        body = json.loads(await request.read())
+        self._record(request, body)
+        self.statuses[body["speaker_id"]] = 1
+        return web.json_response({"BaseResp": {"StatusCode": 0}, "speaker_id": body["speaker_id"]})
+
+    async def status(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self._record(request, body)
+        speaker_id = body["speaker_id"]
+        return web.json_response({"speaker_id": speaker_id, "status": self.statuses.get(speaker_id, 0)})
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=1024 ** 3)
+        app.router.add_post("/api/v1/tts", self.tts)
+        app.router.add_post("/api/v1/mega_tts/audio/upload", self.upload)
+        app.router.add_post("/api/v1/mega_tts/status", self.status)
+        return app
+
+
+@pytest_asyncio.fixture
+async def fake_api():
+    """启动本地模拟接口服务"""
+    api = FakeAPI()
+    api.server = TestServer(api.app())
+    await api.server.start_server()
+    yield api
+    await api.server.close()
@@ -0,0 +1,145 @@
+import io
+import wave
+import pytest
+from core.audio import (
+    OGG_BOS, OGG_EOS, concat_audio, concat_buffers, ogg_crc, ogg_page, parse_mp3_frame, parse_ogg_pages,
+    write_audio,
+)
+
+# MPEG1 Layer III、128kbps、44.1kHz、立体声、无CRC，帧长417字节
+MP3_HEADER = b"\xff\xfb\x90\x00"
+MP3_FRAME_LENGTH = 417
+
+
+def mp3_frame(fill: int) -> bytes:
+    return MP3_HEADER + bytes([fill]) * (MP3_FRAME_LENGTH - 4)
+
+
+def mp3_part(frames: int, fill: int) -> bytes:
+    id3v2 = b"ID3\x03\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10
+    xing = bytearray(mp3_frame(0))
+    xing[36:40] = b"Xing"
+    id3v1 = b"TAG" + b"\x00" * 125
+    return id3v2 + bytes(xing) + b"".join(mp3_frame(fill) for _ in range(frames)) + id3v1
+
+
+def wav_part(frames: int, value: int, extra_chunk: bool = False) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(value.to_bytes(2, "little") * frames)
+    data = buffer.getvalue()
+    if extra_chunk:
+        # 在 fmt 和 data 之间插入 LIST 块
+        data_at = data.index(b"data")
+        chunk = b"LIST" + (4).to_bytes(4, "little") + b"INFO"
+        data = data[:4] + (int.from_bytes(data[4:8], "little") + len(chunk)).to_bytes(4, "little") \
+            + data[8:data_at] + chunk + data[data_at:]
+    return data
+
+
+def opus_part(serial: int, packets: int, channels: int = 1) -> bytes:
+    head = b"OpusHead\x01" + bytes([channels]) + (312).to_bytes(2, "little") + (48000).to_bytes(4, "little") + b"\x00\x00\x00"
+    tags = b"OpusTags" + (4).to_bytes(4, "little") + b"test" + (0).to_bytes(4, "little")
+    pages = [(OGG_BOS, 0, head), (0, 0, tags)]
+    for i in range(packets):
+        pages.append((OGG_EOS if i == packets - 1 else 0, 960 * (i + 1), bytes([0x78, i])))
+    return b"".join(
+        ogg_page(flags, granule, serial, sequence, bytes([len(body)]), body) + body
+        for sequence, (flags, granule, body) in enumerate(pages)
+    )
+
+
+def test_mp3_strips_tags_and_rewrites_info():
+    data = concat_audio([mp3_part(3, 0x11), mp3_part(2, 0x22)], "mp3", gap=0.1)
+    assert not data.startswith(b"ID3")
+    assert b"TAG" not in data
+
+    info = parse_mp3_frame(data)
+    assert data[36:40] == b"Info"
+    silence_frames = round(0.1 * 44100 / 1152)
+    assert int.from_bytes(data[44:48], "big") == 3 + 2 + silence_frames
+    assert int.from_bytes(data[48:52], "big") == len(data)
+
+    fills = []
+    pos = info.length
+    while pos < len(data):
+        frame = parse_mp3_frame(data, pos)
+        assert frame is not None
+        fills.append(data[pos + 4])
+        pos += frame.length
+    assert pos == len(data)
+    assert fills == [0x11] * 3 + [0x00] * silence_frames + [0x22] * 2
+
+
+def test_mp3_without_info_header_is_plain_frames():
+    plain = b"".join(mp3_frame(0x33) for _ in range(2))
+    assert concat_audio([plain, plain], "mp3") == plain * 2
+
+
+def test_wav_merges_riff_headers():
+    first, second = wav_part(100, 1), wav_part(50, 2, extra_chunk=True)
+    data = concat_audio([first, second], "wav", gap=0.01)
+    with wave.open(io.BytesIO(data)) as w:
+        assert w.getframerate() == 8000
+        frames = w.readframes(w.getnframes())
+    assert frames == b"\x01\x00" * 100 + b"\x00\x00" * 80 + b"\x02\x00" * 50
+    assert data.count(b"RIFF") == 1
+
+
+def test_wav_format_mismatch():
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(b"\x00" * 8)
+    with pytest.raises(ValueError):
+        concat_audio([wav_part(10, 1), buffer.getvalue()], "wav")
+
+
+def test_pcm_is_zero_copy_with_silence():
+    first, second = b"\x01\x00" * 4, b"\x02\x00" * 4
+    buffers = concat_buffers([first, second], "pcm", gap=0.001, sample_rate=8000)
+    assert buffers[0].obj is first and buffers[2].obj is second
+    assert b"".join(buffers) == first + b"\x00" * 16 + second
+
+
+def test_ogg_opus_single_logical_stream():
+    data = concat_audio([opus_part(1, 3), opus_part(2, 2)], "ogg_opus", gap=0.04)
+    pages = parse_ogg_pages(data)
+    assert bytes(pages[0].body[:8]) == b"OpusHead"
+    assert sum(bytes(p.body[:8]) == b"OpusHead" for p in pages) == 1
+    assert {p.serial for p in pages} == {1}
+    assert [p.flags & OGG_BOS for p in pages] == [OGG_BOS] + [0] * (len(pages) - 1)
+    assert [p.flags & OGG_EOS for p in pages] == [0] * (len(pages) - 1) + [OGG_EOS]
+    granules = [p.granule for p in pages[2:]]
+    assert granules == sorted(granules)
+    assert granules[-1] == 960 * 3 + 960 * 2 + 960 * 2
+
+    # 校验和与页序号
+    pos = 0
+    for sequence, page in enumerate(pages):
+        length = 27 + len(page.segments) + len(page.body)
+        raw = bytearray(data[pos:pos + length])
+        assert int.from_bytes(raw[18:22], "little") == sequence
+        crc = int.from_bytes(raw[22:26], "little")
+        raw[22:26] = b"\x00" * 4
+        assert ogg_crc(raw) == crc
+        pos += length
+
+
+def test_write_audio_uses_writelines(tmp_path):
+    path = tmp_path / "out.wav"
+    with open(path, "wb") as f:
+        written = write_audio(f, [wav_part(10, 1), wav_part(10, 2)], "wav")
+    assert written == path.stat().st_size
+    with wave.open(str(path)) as w:
+        assert w.getnframes() == 20
+
+
+def test_unsupported_encoding():
+    with pytest.raises(ValueError):
+        concat_audio([b"a", b"b"], "aac")
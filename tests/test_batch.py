@@ -0,0 +1,55 @@
+import pytest
+from core import SynthesisJob, TTSService
+
+
+@pytest.mark.asyncio
+async def test_synthesize_many_isolates_failures(fake_api):
+    jobs = [
+        {"text": "第一条", "speaker_id": "S_test"},
+        SynthesisJob(text="[fail]第二条", speaker_id="S_test"),
+        {"text": "第三条", "speaker_id": "S_test", "encoding": "wav"},
+    ]
+    async with TTSService(fake_api.config()) as tts:
+        results = {r.index: r async for r in tts.synthesize_many(jobs, concurrency=2)}
+
+    assert sorted(results) == [0, 1, 2]
+    assert results[0].ok and results[0].audio == "AUDIO[第一条]".encode("utf-8")
+    assert not results[1].ok and "无效文本" in str(results[1].error)
+    assert results[2].ok and results[2].job.encoding == "wav"
+
+
+@pytest.mark.asyncio
+async def test_synthesize_many_bounded_concurrency(fake_api):
+    fake_api.delay = 0.02
+
+    async def jobs():
+        for i in range(20):
+            yield SynthesisJob(text=f"句子{i}", speaker_id="S_test")
+
+    async with TTSService(fake_api.config()) as tts:
+        results = [r async for r in tts.synthesize_many(jobs(), concurrency=5)]
+
+    assert len(results) == 20 and all(r.ok for r in results)
+    assert fake_api.peak_in_flight == 5
+    # 共享连接池：连接数不超过并发数
+    assert len(fake_api.peers) <= 5
+
+
+@pytest.mark.asyncio
+async def test_synthesize_many_writes_files(fake_api, tmp_path):
+    jobs = [{"text": f"文件{i}", "speaker_id": "S_test", "output_path": str(tmp_path / f"{i}.mp3")}
+            for i in range(3)]
+    async with TTSService(fake_api.config()) as tts:
+        results = [r async for r in tts.synthesize_many(jobs)]
+
+    for result in results:
+        assert result.audio is None
+        with open(result.output_path, "rb") as f:
+            assert f.read() == f"AUDIO[文件{result.index}]".encode("utf-8")
+
+
+@pytest.mark.asyncio
+async def test_synthesize_many_invalid_job(fake_api):
+    async with TTSService(fake_api.config()) as tts:
+        results = [r async for r in tts.synthesize_many([{"speaker_id": "S_test"}])]
+    assert isinstance(results[0].error, TypeError)
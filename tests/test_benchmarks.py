@@ -0,0 +1,83 @@
+import pytest
+import pytest_asyncio
+from aiohttp.test_utils import TestServer
+from benchmarks import upload_memory
+from benchmarks.mock_server import MockAPI, MockSettings
+from benchmarks.suite import SCENARIOS, SuiteParams, compare, run_suite
+from core import Config, HttpClient, Resilience, RetryPolicy, ThrottledError, TTSService, VoiceCloningService
+
+
+async def start(settings: MockSettings):
+    api = MockAPI(settings)
+    api.server = TestServer(api.app())
+    await api.server.start_server()
+    return api
+
+
+@pytest_asyncio.fixture
+async def mock_api():
+    api = await start(MockSettings(latency="fixed", latency_ms=1, training_seconds=0, seed=1))
+    yield api
+    await api.server.close()
+
+
+def config_for(api: MockAPI) -> Config:
+    host = str(api.server.make_url("")).rstrip("/")
+    return Config(appid="bench", token="bench", host=host, rate_limit=1e6, max_concurrency=10000)
+
+
+@pytest.mark.asyncio
+async def test_mock_payload_and_training(mock_api):
+    config = config_for(mock_api)
+    async with TTSService(config) as tts:
+        audio = await tts.synthesize("你好", "S_1")
+    assert len(audio) == mock_api.settings.min_audio_bytes
+
+    async with VoiceCloningService(config) as cloning:
+        assert (await cloning.get_status("S_bench"))["status"] == 0
+
+
+@pytest.mark.asyncio
+async def test_mock_throttling():
+    api = await start(MockSettings(latency="fixed", latency_ms=1, throttle_rps=1))
+    try:
+        config = config_for(api)
+        resilience = Resilience(retry=RetryPolicy(max_attempts=1))
+        async with HttpClient(config, resilience=resilience) as client:
+            tts = TTSService(config, client=client)
+            await tts.synthesize("一", "S_1")
+            with pytest.raises(ThrottledError):
+                await tts.synthesize("二", "S_1")
+        assert api.counts["throttled"] == 1
+    finally:
+        await api.server.close()
+
+
+@pytest.mark.asyncio
+async def test_run_suite(mock_api):
+    params = SuiteParams(single_calls=3, batch_jobs=10, batch_concurrency=4, long_text_runs=1,
+                         long_text_chars=1500, upload_runs=1, upload_mb=1)
+    results = await run_suite(config_for(mock_api).host, params)
+    assert set(results) == set(SCENARIOS)
+    assert results["batch"]["ops"] == 10
+    assert results["batch"]["requests"] == 10
+    assert results["long_text"]["requests"] > 1
+    assert results["upload"]["errors"] == 0
+    for result in results.values():
+        assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+        assert result["peak_memory_mb"] is not None
+
+
+@pytest.mark.asyncio
+async def test_upload_memory_benchmark(capsys):
+    await upload_memory.run([1])
+    assert capsys.readouterr().out.splitlines()[-1].split()[0] == "1"
+
+
+def test_compare_flags_regression():
+    baseline = {"results": {"batch": {"req_per_s": 100.0, "p95_ms": 50.0}}}
+    current = {"results": {"batch": {"req_per_s": 80.0, "p95_ms": 51.0}}}
+    lines, regressed = compare(current, baseline, threshold=0.1)
+    assert regressed
+    assert any("req_per_s" in line and "退化" in line for line in lines)
+    assert not any("p95_ms" in line and "退化" in line for line in lines)
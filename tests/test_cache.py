@@ -0,0 +1,177 @@
+import asyncio
+import os
+import threading
+import time
+import pytest
+from core import DiskCache, MemoryCache, SingleFlight, TTSService
+from core.cache import cache_key
+
+
+def test_cache_key_normalizes_text():
+    base = cache_key("S_test", "你好  世界", "plain", "mp3", 1.0, "volcano_icl")
+    assert base == cache_key("S_test", " 你好 世界\n", "plain", "mp3", 1, "volcano_icl")
+    assert base != cache_key("S_test", "你好 世界", "plain", "wav", 1.0, "volcano_icl")
+    assert base != cache_key("S_test", "你好 世界", "plain", "mp3", 1.0, "volcano_icl_concurr")
+    assert base != cache_key("S_other", "你好 世界", "plain", "mp3", 1.0, "volcano_icl")
+
+
+def test_disk_cache_lru_eviction(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=250)
+    for i, key in enumerate(["a" * 64, "b" * 64, "c" * 64]):
+        cache.put(key, bytes(100))
+        # 保证修改时间可区分
+        os.utime(cache.get_path(key), (time.time() + i, time.time() + i))
+    assert cache.evictions == 1
+    assert cache.get("a" * 64) is None
+    assert cache.get("c" * 64) == bytes(100)
+    assert cache.size <= 250
+    assert cache.stats()["misses"] == 1
+    # 不会留下临时文件
+    assert not [name for _, _, files in os.walk(tmp_path) for name in files if name.startswith(".")]
+
+
+def test_disk_cache_evicts_to_low_water(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), max_bytes=1000, low_water=0.5)
+    cache.put("a" * 64, bytes(100))
+    cache.put("a" * 64, bytes(100))  # 覆盖已有的键
+    assert cache.size == 100
+    scans = []
+    original = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: scans.append(1) or original())
+    for i in range(20):
+        cache.put(f"{i:064d}", bytes(100))
+    # 超出上限后淘汰到一半，之后写满余量才再次扫描目录
+    assert len(scans) == 2
+    assert cache.size <= 1000
+
+
+def test_disk_cache_persists_across_instances(tmp_path):
+    DiskCache(str(tmp_path)).put("d" * 64, b"audio")
+    cache = DiskCache(str(tmp_path))
+    assert cache.size == 5
+    assert cache.get("d" * 64) == b"audio"
+
+
+@pytest.mark.asyncio
+async def test_synthesize_served_from_cache(fake_api, tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"))
+    async with TTSService(fake_api.config(), cache=cache) as tts:
+        first = await tts.synthesize("缓存测试", speaker_id="S_test")
+        second = await tts.synthesize(" 缓存测试 ", speaker_id="S_test")
+    assert first == second
+    assert len(fake_api.requests) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_synthesize_to_file_links_cached_file(fake_api, tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"))
+    async with TTSService(fake_api.config(), cache=cache) as tts:
+        await tts.synthesize_to_file("链接测试", str(tmp_path / "a.mp3"), speaker_id="S_test")
+        await tts.synthesize_to_file("链接测试", str(tmp_path / "b.mp3"), speaker_id="S_test")
+    assert len(fake_api.requests) == 1
+    assert (tmp_path / "b.mp3").read_bytes() == "AUDIO[链接测试]".encode("utf-8")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_synthesize_to_file_checks_memory_cache(fake_api, tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"))
+    async with TTSService(fake_api.config(), cache=cache, memory_cache=MemoryCache()) as tts:
+        await tts.synthesize("内存测试", speaker_id="S_test")
+        # 磁盘缓存被淘汰后仍由进程内缓存提供，不再请求接口
+        cache.clear()
+        await tts.synthesize_to_file("内存测试", str(tmp_path / "a.mp3"), speaker_id="S_test")
+    assert len(fake_api.requests) == 1
+    assert (tmp_path / "a.mp3").read_bytes() == "AUDIO[内存测试]".encode("utf-8")
+
+
+@pytest.mark.asyncio
+async def test_disk_cache_runs_off_event_loop(fake_api, tmp_path):
+    class RecordingCache(DiskCache):
+        def __init__(self, directory):
+            super().__init__(directory)
+            self.threads = []
+
+        def get(self, key):
+            self.threads.append(threading.get_ident())
+            return super().get(key)
+
+        def get_path(self, key):
+            self.threads.append(threading.get_ident())
+            return super().get_path(key)
+
+        def put(self, key, data):
+            self.threads.append(threading.get_ident())
+            return super().put(key, data)
+
+    cache = RecordingCache(str(tmp_path / "cache"))
+    async with TTSService(fake_api.config(), cache=cache) as tts:
+        await tts.synthesize("线程测试", speaker_id="S_test")
+        await tts.synthesize_to_file("线程测试", str(tmp_path / "a.mp3"), speaker_id="S_test")
+        await tts.synthesize_to_file("另一句", str(tmp_path / "b.mp3"), speaker_id="S_test")
+    assert len(cache.threads) == 5
+    assert threading.get_ident() not in cache.threads
+
+
+def test_memory_cache_lru_and_ttl(monkeypatch):
+    cache = MemoryCache(max_bytes=10)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    assert cache.get("a") == b"12345"  # a 变为最近使用
+    cache.put("c", b"12345")
+    assert cache.get("b") is None
+    assert cache.size == 10 and cache.evictions == 1
+    cache.put("huge", bytes(11))  # 超过上限的条目不缓存
+    assert cache.get("huge") is None
+
+    now = [100.0]
+    monkeypatch.setattr("core.cache.time.monotonic", lambda: now[0])
+    ttl_cache = MemoryCache(ttl=5)
+    ttl_cache.put("k", b"v")
+    now[0] += 6
+    assert ttl_cache.get("k") is None
+    assert ttl_cache.stats()["expirations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_requests(fake_api):
+    fake_api.delay = 0.05
+    async with TTSService(fake_api.config(), dedup=True) as tts:
+        results = await asyncio.gather(*[tts.synthesize("同一句话", speaker_id="S_test") for _ in range(10)])
+    assert len(set(results)) == 1
+    assert len(fake_api.requests) == 1
+    assert tts.single_flight.stats() == {"calls": 1, "shared": 9, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_cancelled_caller():
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(0.02)
+        return b"audio"
+
+    leader = asyncio.ensure_future(flight.do("k", slow))
+    await started.wait()
+    follower = asyncio.ensure_future(flight.do("k", slow))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await follower == b"audio"
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_switch(fake_api):
+    async with TTSService(fake_api.config()) as tts:
+        tts.enable_memory_cache(ttl=60)
+        await tts.synthesize("开关", speaker_id="S_test")
+        await tts.synthesize("开关", speaker_id="S_test")
+        assert len(fake_api.requests) == 1
+        assert tts.cache_stats()["memory"]["hits"] == 1
+
+        tts.disable_memory_cache()
+        await tts.synthesize("开关", speaker_id="S_test")
+        assert len(fake_api.requests) == 2
+        assert tts.cache_stats() == {"memory": None, "disk": None, "single_flight": None}
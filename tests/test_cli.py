@@ -0,0 +1,79 @@
+import csv
+import json
+import pytest
+from core.cli import Checkpoint, build_parser, load_config, read_manifest, run_batch
+
+
+def write_jsonl(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def test_read_manifest_formats(tmp_path):
+    jsonl = tmp_path / "m.jsonl"
+    jsonl.write_text('{"id": "a", "text": "你好"}\n\n{"text": "无ID"}\nnot json\n[1]\n"x"\n', encoding="utf-8")
+    rows = list(read_manifest(str(jsonl)))
+    assert [row_id for row_id, _ in rows] == ["a", "3", "4", "5", "6"]
+    # 无效的行作为单行失败，不中断整个清单
+    assert all("_error" in row for _, row in rows[2:])
+
+    path = tmp_path / "m.csv"
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["id", "text", "speaker", "speed"])
+        writer.writeheader()
+        writer.writerow({"id": "x1", "text": "你好，世界", "speaker": "S_1", "speed": "1.2"})
+    assert list(read_manifest(str(path))) == [("x1", {"id": "x1", "text": "你好，世界", "speaker": "S_1", "speed": "1.2"})]
+
+
+def test_load_config_env_overrides_file(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"appid": "file_app", "token": "file_token", "rate_limit": 5}), encoding="utf-8")
+    monkeypatch.setenv("BYTEDANCE_TOKEN", "env_token")
+    monkeypatch.setenv("BYTEDANCE_MAX_CONCURRENCY", "3")
+    config = load_config(str(path))
+    assert (config.appid, config.token, config.rate_limit, config.max_concurrency) == ("file_app", "env_token", 5, 3)
+
+    monkeypatch.delenv("BYTEDANCE_TOKEN")
+    monkeypatch.delenv("BYTEDANCE_APPID", raising=False)
+    with pytest.raises(ValueError):
+        load_config()
+
+
+def test_checkpoint_reload(tmp_path):
+    path = str(tmp_path / "done")
+    checkpoint = Checkpoint(path)
+    checkpoint.add("a")
+    checkpoint.add("b")
+    checkpoint.close()
+    assert Checkpoint(path).completed == {"a", "b"}
+
+
+@pytest.mark.asyncio
+async def test_run_batch_resumes(fake_api, tmp_path):
+    manifest = tmp_path / "jobs.jsonl"
+    write_jsonl(manifest, [
+        {"id": "r1", "text": "第一句"},
+        {"id": "r2", "text": "[fail]"},
+        {"id": "r3", "text": "第三句", "speaker": "S_2", "output": "sub/third.mp3"},
+        {"id": "r4"},
+    ])
+    out = tmp_path / "out"
+    args = build_parser().parse_args([
+        str(manifest), "--speaker", "S_1", "--output-dir", str(out), "--quiet",
+        "--failures", str(tmp_path / "failed.jsonl"), "--metrics-file", str(tmp_path / "metrics.prom"),
+    ])
+
+    progress = await run_batch(args, fake_api.config())
+    assert (progress.done, progress.failed, progress.skipped) == (2, 2, 0)
+    assert (out / "r1.mp3").read_bytes() == "AUDIO[第一句]".encode("utf-8")
+    assert (out / "sub" / "third.mp3").exists()
+    assert Checkpoint(f"{manifest}.done").completed == {"r1", "r3"}
+    failed = [json.loads(line)["id"] for line in open(tmp_path / "failed.jsonl", encoding="utf-8")]
+    assert sorted(failed) == ["r2", "r4"]
+    assert "voice_clone_requests_total" in (tmp_path / "metrics.prom").read_text()
+
+    requests = len(fake_api.requests)
+    progress = await run_batch(args, fake_api.config())
+    assert (progress.done, progress.failed, progress.skipped) == (0, 2, 2)
+    assert len(fake_api.requests) == requests + 1  # 只重试失败的合成任务
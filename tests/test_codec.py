@@ -0,0 +1,62 @@
+import base64
+import json
+import pytest
+from core import codec
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "orjson" and codec.orjson is None:
+        pytest.skip("未安装 orjson")
+    if request.param == "json":
+        monkeypatch.setattr(codec, "orjson", None)
+    codec.request_template.cache_clear()
+    yield request.param
+    codec.request_template.cache_clear()
+
+
+@pytest.mark.parametrize("text", ["你好", 'He said "hi"\n\t\\', "<speak>a &amp; b</speak>", " emoji 😀"])
+def test_template_matches_dict(backend, text):
+    template = codec.request_template("app", "tok", "volcano_icl", "S_1", "mp3", 1.25, "plain", "query")
+    body = template.render("uid-1", "req-1", text)
+    assert json.loads(body) == {
+        "app": {"appid": "app", "token": "tok", "cluster": "volcano_icl"},
+        "user": {"uid": "uid-1"},
+        "audio": {"voice_type": "S_1", "encoding": "mp3", "speed_ratio": 1.25},
+        "request": {"reqid": "req-1", "text": text, "text_type": "plain", "operation": "query"},
+    }
+
+
+@pytest.mark.parametrize("body", [
+    b'{"code": 3000, "message": "ok", "data": "%s"}',
+    b'{"data":"%s","code":3000,"message":"ok"}',
+    b'{"code":3000, "data" : "%s" , "message":"ok", "addition":{"duration":"1"}}',
+])
+def test_parse_response_extracts_data(backend, body):
+    audio = bytes(range(256)) * 10
+    encoded = base64.b64encode(audio)
+    result, data = codec.parse_response(body % encoded)
+    assert result["code"] == 3000 and result["message"] == "ok" and "data" not in result
+    assert codec.decode_audio(data) == audio
+
+
+def test_parse_response_fallbacks(backend):
+    audio = b"\xff\xfe\xfd" * 50
+    escaped = json.dumps({"code": 3000, "data": base64.b64encode(audio).decode()}).replace("/", "\\/")
+    result, data = codec.parse_response(escaped.encode())
+    assert codec.decode_audio(data) == audio
+    assert codec.parse_response(b'{"code": 3011, "message": "\\"data\\": \\"x\\""}') == \
+        ({"code": 3011, "message": '"data": "x"'}, None)
+    assert codec.parse_response(b'{"code": 3000, "data": null}') == ({"code": 3000}, None)
+
+
+@pytest.mark.parametrize("body, expected", [
+    (b'{"addition":{"data":"eA=="},"data":"QVVESU8="}', b"AUDIO"),
+    (b'{"code":3000,"addition":{"data":"eA=="}}', None),
+    (b'{"code":3000,"items":["{",{"data":"eA=="}],"data":"QVVESU8="}', b"AUDIO"),
+    (b'{"data":"eA==","data":"QVVESU8="}', b"AUDIO"),
+])
+def test_parse_response_uses_top_level_data(backend, body, expected):
+    result, data = codec.parse_response(body)
+    assert (codec.decode_audio(data) if data is not None else None) == expected
+    assert "data" not in result
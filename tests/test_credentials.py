@@ -0,0 +1,121 @@
+import asyncio
+import dataclasses
+import pytest
+from core.credentials import Credential, CredentialPool
+from core.errors import AuthError, SpeakerNotFoundError
+from core.http import HttpClient
+from core.tts import TTSService
+from core.voice_cloning import VoiceCloningService
+
+
+def credential(fake_api, appid, **kwargs):
+    speakers = kwargs.pop("speakers", None)
+    weight = kwargs.pop("weight", 1.0)
+    return Credential(dataclasses.replace(fake_api.config(**kwargs), appid=appid), weight=weight, speakers=speakers)
+
+
+def appids(fake_api):
+    return [body["app"]["appid"] for path, body in fake_api.requests if path == "/api/v1/tts"]
+
+
+@pytest.mark.asyncio
+async def test_routes_by_speaker(fake_api):
+    pool = CredentialPool([credential(fake_api, "a", speakers={"S_a"}), credential(fake_api, "b", speakers={"S_b"})])
+    async with TTSService(pool) as tts:
+        assert await tts.synthesize("你好", speaker_id="S_b") == "AUDIO[你好]".encode("utf-8")
+        await tts.synthesize("再见", speaker_id="S_a")
+        with pytest.raises(SpeakerNotFoundError):
+            await tts.synthesize("你好", speaker_id="S_other")
+    assert appids(fake_api) == ["b", "a"]
+    stats = pool.stats()
+    assert stats["a/volcano_icl"]["requests"] == 1 and stats["b/volcano_icl"]["requests"] == 1
+
+
+@pytest.mark.asyncio
+async def test_weighted_routing(fake_api):
+    pool = CredentialPool([credential(fake_api, "a", weight=3), credential(fake_api, "b")])
+    async with TTSService(pool) as tts:
+        for i in range(8):
+            await tts.synthesize(f"第{i}句", speaker_id="S_test")
+    assert appids(fake_api).count("a") == 6
+
+
+@pytest.mark.asyncio
+async def test_failover_and_cooldown(fake_api):
+    pool = CredentialPool([credential(fake_api, "a"), credential(fake_api, "b")], failure_threshold=1)
+    fake_api.failures = [("http", 401)]
+    async with TTSService(pool) as tts:
+        assert await tts.synthesize("你好", speaker_id="S_test") == "AUDIO[你好]".encode("utf-8")
+        # 出错的凭据在冷却期内不再被选中
+        await tts.synthesize("再见", speaker_id="S_test")
+        fake_api.failures = [("http", 401)]
+        with pytest.raises(AuthError):
+            await tts.synthesize("三", speaker_id="S_test")
+    assert appids(fake_api) == ["a", "b", "b", "b"]
+    stats = pool.stats()
+    assert stats["a/volcano_icl"]["errors"] == 1 and stats["a/volcano_icl"]["disabled"]
+    assert stats["a/volcano_icl"]["failovers"] == 1
+
+
+@pytest.mark.asyncio
+async def test_speaker_not_found_is_remembered(fake_api):
+    pool = CredentialPool([credential(fake_api, "a"), credential(fake_api, "b")])
+    fake_api.failures = [("code", 3050)]
+    async with TTSService(pool) as tts:
+        await tts.synthesize("你好", speaker_id="S_test")
+        await tts.synthesize("再见", speaker_id="S_test")
+    assert appids(fake_api) == ["a", "b", "b"]
+    # 音色不存在不算凭据本身出错
+    assert pool.stats()["a/volcano_icl"]["errors"] == 0
+
+
+@pytest.mark.asyncio
+async def test_speaker_not_found_expires_and_training_restores(fake_api, tmp_path, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("core.credentials.time.monotonic", lambda: now[0])
+    sample = tmp_path / "sample.wav"
+    sample.write_bytes(b"RIFF\x00\x00\x00\x00WAVEfmt " + bytes(64))
+    pool = CredentialPool([credential(fake_api, "a")], invalid_ttl=60)
+    async with HttpClient(pool.config) as client:
+        tts = TTSService(pool, client=client)
+        cloning = VoiceCloningService(pool, client=client)
+        fake_api.failures = [("code", 3050)]
+        for _ in range(2):
+            with pytest.raises(SpeakerNotFoundError):
+                await tts.synthesize("你好", speaker_id="S_new")
+        # 过期后重新尝试合成
+        now[0] = 61
+        fake_api.failures = [("code", 3050)]
+        with pytest.raises(SpeakerNotFoundError):
+            await tts.synthesize("你好", speaker_id="S_new")
+        # 合成失败后仍然可以查询状态和上传训练，训练成功后立即恢复合成
+        assert (await cloning.get_status("S_new"))["status"] == 0
+        assert pool.is_invalid("a", "S_new")
+        await cloning.train(str(sample), speaker_id="S_new")
+        assert not pool.is_invalid("a", "S_new")
+        await tts.synthesize("你好", speaker_id="S_new")
+    paths = [path.rsplit("/", 1)[-1] for path, _ in fake_api.requests]
+    assert paths == ["tts", "tts", "status", "upload", "tts"]
+
+
+@pytest.mark.asyncio
+async def test_overflow_to_concurrent_cluster(fake_api):
+    pool = CredentialPool([credential(fake_api, "a", max_concurrency=1)])
+    fake_api.delay = 0.1
+    async with TTSService(pool) as tts:
+        await asyncio.gather(*(tts.synthesize(f"第{i}句", speaker_id="S_test") for i in range(2)))
+    clusters = sorted(body["app"]["cluster"] for _, body in fake_api.requests)
+    assert clusters == ["volcano_icl", "volcano_icl_concurr"]
+    assert pool.stats()["a/volcano_icl_concurr"]["requests"] == 1
+
+
+@pytest.mark.asyncio
+async def test_voice_cloning_uses_owner_credential(fake_api, tmp_path):
+    sample = tmp_path / "sample.wav"
+    sample.write_bytes(b"RIFF\x00\x00\x00\x00WAVEfmt " + bytes(64))
+    pool = CredentialPool([credential(fake_api, "a", speakers={"S_a"}), credential(fake_api, "b", speakers={"S_b"})])
+    async with HttpClient(pool.config) as client:
+        cloning = VoiceCloningService(pool, client=client)
+        await cloning.train(str(sample), speaker_id="S_b")
+        assert (await cloning.get_status("S_b"))["status"] == 1
+    assert [body["appid"] for _, body in fake_api.requests] == ["b", "b"]
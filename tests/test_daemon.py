@@ -0,0 +1,115 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import pytest
+import pytest_asyncio
+from core.daemon import Daemon
+from core.daemon_client import DaemonClient, DaemonError, main
+
+unix_only = pytest.mark.skipif(sys.platform == "win32", reason="Windows 不支持 Unix 套接字")
+
+
+@pytest.fixture
+def socket_path():
+    # Unix 套接字路径长度有限，不使用 pytest 的 tmp_path
+    with tempfile.TemporaryDirectory(prefix="vc-") as directory:
+        yield os.path.join(directory, "daemon.sock")
+
+
+@pytest_asyncio.fixture
+async def daemon(fake_api, socket_path):
+    daemon = Daemon(fake_api.config(), socket_path)
+    await daemon.start(warm=False)
+    yield daemon
+    await daemon.close()
+
+
+def client_calls(socket_path, output_path):
+    with DaemonClient(socket_path) as client:
+        assert client.ping() == {"ok": True}
+        audio = client.synthesize("你好", speaker_id="S_test")
+        path = client.synthesize("再见", speaker_id="S_test", output_path=output_path)
+        with pytest.raises(DaemonError) as error:
+            client.synthesize("[fail]", speaker_id="S_test")
+        # 出错后连接仍可继续使用
+        stats = client.stats()
+    return audio, path, error.value, stats
+
+
+@unix_only
+@pytest.mark.asyncio
+async def test_daemon_round_trip(daemon, fake_api, tmp_path):
+    output = str(tmp_path / "out" / "bye.mp3")
+    audio, path, error, stats = await asyncio.get_running_loop().run_in_executor(
+        None, client_calls, daemon.socket_path, output)
+    assert audio == "AUDIO[你好]".encode("utf-8")
+    assert path == output
+    with open(output, "rb") as f:
+        assert f.read() == "AUDIO[再见]".encode("utf-8")
+    assert error.error_type == "InvalidRequestError"
+    assert stats["requests"] == 5 and stats["errors"] == 1
+    assert os.stat(daemon.socket_path).st_mode & 0o077 == 0
+
+
+@unix_only
+@pytest.mark.asyncio
+async def test_daemon_replaces_stale_socket(fake_api, socket_path):
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+    async with Daemon(fake_api.config(), socket_path) as daemon:
+        with pytest.raises(RuntimeError):
+            await Daemon(fake_api.config(), socket_path).start(warm=False)
+        assert await asyncio.get_running_loop().run_in_executor(
+            None, lambda: DaemonClient(socket_path).ping()) == {"ok": True}
+    assert not os.path.exists(daemon.socket_path)
+
+
+@unix_only
+def test_daemon_created_outside_event_loop(fake_api, socket_path):
+    # 与 main() 相同：先创建 Daemon，再由 asyncio.run 启动新的事件循环
+    daemon = Daemon(fake_api.config(), socket_path)
+
+    async def run():
+        await daemon.start(warm=False)
+        asyncio.get_running_loop().call_soon(daemon.stop)
+        await daemon.serve_forever()
+        await daemon.close()
+
+    asyncio.run(run())
+
+
+@unix_only
+@pytest.mark.asyncio
+async def test_client_main_ping(daemon, capsys):
+    assert await asyncio.get_running_loop().run_in_executor(
+        None, main, ["--socket", daemon.socket_path, "--ping"]) == 0
+    assert capsys.readouterr().out.strip() == '{"ok": true}'
+    assert daemon.stats()["requests"] == 1
+
+
+@unix_only
+def test_client_main_connection_errors(socket_path, monkeypatch, capsys):
+    assert main(["--socket", socket_path, "--ping"]) == 2
+    # 连接后通信超时同样视为常驻进程不可用
+    def timeout(self):
+        raise socket.timeout("timed out")
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(1)
+    try:
+        monkeypatch.setattr(DaemonClient, "ping", timeout)
+        assert main(["--socket", socket_path, "--ping"]) == 2
+    finally:
+        server.close()
+    assert "无法连接常驻进程" in capsys.readouterr().err
+
+
+def test_client_does_not_import_aiohttp():
+    code = "import sys, core.daemon_client; print('aiohttp' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "False"
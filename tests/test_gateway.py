@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from aiohttp.test_utils import TestClient, TestServer
+from core.gateway import Admission, Gateway, GatewayError, main
+
+
+@pytest_asyncio.fixture
+async def gateway_client(fake_api):
+    clients = []
+
+    async def make(**kwargs) -> TestClient:
+        gateway = Gateway(fake_api.config(), **kwargs)
+        client = TestClient(TestServer(gateway.app()))
+        await client.start_server()
+        client.gateway = gateway
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_synthesize_streams_audio(gateway_client):
+    client = await gateway_client()
+    response = await client.post("/v1/tts", json={"text": "你好", "speaker_id": "S_1", "encoding": "wav"})
+    assert response.status == 200
+    assert response.headers["Content-Type"] == "audio/wav"
+    assert await response.read() == "AUDIO[你好]".encode("utf-8")
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_share_one_upstream_call(fake_api, gateway_client):
+    client = await gateway_client()
+    fake_api.delay = 0.1
+    body = {"text": "相同的文本", "speaker_id": "S_1"}
+    responses = await asyncio.gather(*[client.post("/v1/tts", json=body) for _ in range(5)])
+    assert [r.status for r in responses] == [200] * 5
+    assert len(fake_api.requests) == 1
+    assert client.gateway.flights.shared == 4
+
+
+@pytest.mark.asyncio
+async def test_full_queue_returns_429(fake_api, gateway_client):
+    client = await gateway_client(max_concurrency=1, max_queue=1)
+    fake_api.delay = 0.2
+    responses = await asyncio.gather(*[
+        client.post("/v1/tts", json={"text": f"文本{i}", "speaker_id": "S_1"}) for i in range(3)
+    ])
+    statuses = sorted(r.status for r in responses)
+    assert statuses == [200, 200, 429]
+    rejected = next(r for r in responses if r.status == 429)
+    assert rejected.headers["Retry-After"] == "1"
+    assert client.gateway.admission.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout():
+    admission = Admission(max_concurrency=1, max_queue=4, queue_timeout=0.05)
+    async with admission.slot():
+        with pytest.raises(GatewayError) as info:
+            async with admission.slot():
+                pass
+    assert info.value.status == 503
+    assert admission.stats()["queued"] == 0
+
+
+def test_admission_created_outside_event_loop():
+    # 与 main() 相同：先创建，再由 web.run_app 启动新的事件循环
+    admission = Admission(max_concurrency=1, max_queue=4)
+
+    async def queued():
+        async with admission.slot():
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(queued(), queued())
+
+    asyncio.run(run())
+    assert admission.stats()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_error_mapping(gateway_client):
+    client = await gateway_client()
+    response = await client.post("/v1/tts", json={"speaker_id": "S_1"})
+    assert response.status == 400
+    response = await client.post("/v1/tts", json={"text": "[fail]", "speaker_id": "S_1"})
+    assert response.status == 400
+    assert "无效文本" in (await response.json())["error"]
+
+
+@pytest.mark.asyncio
+async def test_health_and_metrics(gateway_client):
+    client = await gateway_client()
+    await client.post("/v1/tts", json={"text": "你好", "speaker_id": "S_1"})
+    health = await (await client.get("/healthz")).json()
+    assert health["status"] == "ok"
+    assert health["admission"]["active"] == 0
+    text = await (await client.get("/metrics")).text()
+    assert "voice_clone_gateway_requests_total 1" in text
+    assert 'voice_clone_request_phase_seconds_count{cluster="volcano_icl",endpoint="tts",phase="ttfb"} 1' in text
+
+
+def test_main_reports_config_errors(tmp_path, monkeypatch, capsys):
+    monkeypatch.delenv("BYTEDANCE_APPID", raising=False)
+    monkeypatch.delenv("BYTEDANCE_TOKEN", raising=False)
+    path = tmp_path / "config.json"
+    path.write_text('{"appid": "a"}', encoding="utf-8")
+    assert main(["--config", str(path)]) == 2
+    assert main(["--config", str(tmp_path / "missing.json")]) == 2
+    assert capsys.readouterr().err.count("配置错误") == 2
@@ -0,0 +1,45 @@
+import pytest
+from core import HttpClient, TTSService, VoiceCloningService
+
+
+@pytest.mark.asyncio
+async def test_services_share_connection_pool(fake_api):
+    config = fake_api.config()
+    async with HttpClient(config) as client:
+        tts = TTSService(config, client=client)
+        cloning = VoiceCloningService(config, client=client)
+
+        for i in range(5):
+            audio = await tts.synthesize(f"第{i}句", speaker_id="S_test")
+            assert audio == f"AUDIO[第{i}句]".encode("utf-8")
+        status = await cloning.get_status("S_test")
+        assert status["status"] == 0
+
+        # 顺序请求应复用同一个长连接
+        assert len(fake_api.peers) == 1
+        assert tts.client is cloning.client
+
+        # 共享客户端由调用方负责关闭
+        await tts.close()
+        await cloning.close()
+        assert not client.closed
+    assert client.closed
+
+
+@pytest.mark.asyncio
+async def test_service_owns_default_client(fake_api):
+    async with TTSService(fake_api.config()) as tts:
+        await tts.synthesize("你好", speaker_id="S_test")
+        assert not tts.client.closed
+    assert tts.client.closed
+
+
+@pytest.mark.asyncio
+async def test_connection_limits_from_config(fake_api):
+    config = fake_api.config(connection_limit=7, connection_limit_per_host=3)
+    async with HttpClient(config) as client:
+        connector = client.session.connector
+        assert connector.limit == 7
+        assert connector.limit_per_host == 3
+        # 同一事件循环内会话保持不变
+        assert client.session is client.session
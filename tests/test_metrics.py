@@ -0,0 +1,91 @@
+import json
+import logging
+import pytest
+from core import HttpClient, LogSink, Metrics, PrometheusExporter, TTSService, VoiceCloningService
+from core.metrics import NULL_METRICS, NULL_TIMER, PHASE_METRIC, REQUEST_METRIC, Histogram
+
+
+def phases(metrics: Metrics, endpoint: str):
+    return {
+        dict(labels)["phase"]: histogram.count
+        for (name, labels), histogram in metrics.histograms.items()
+        if name == PHASE_METRIC and dict(labels)["endpoint"] == endpoint
+    }
+
+
+def test_histogram_cumulative():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    assert histogram.cumulative() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(3.65)
+
+
+def test_prometheus_render():
+    metrics = Metrics(buckets=(0.5,))
+    metrics.observe(PHASE_METRIC, 0.2, endpoint="tts", phase="ttfb", speaker='S_"1"', cluster="")
+    metrics.inc(REQUEST_METRIC, endpoint="tts", cluster="volcano_icl", status="ok")
+    text = PrometheusExporter(metrics).render()
+    assert "# TYPE voice_clone_request_phase_seconds histogram" in text
+    assert 'voice_clone_request_phase_seconds_bucket{endpoint="tts",phase="ttfb",speaker="S_\\"1\\"",le="0.5"} 1' in text
+    assert 'voice_clone_request_phase_seconds_count{endpoint="tts",phase="ttfb",speaker="S_\\"1\\""} 1' in text
+    assert 'voice_clone_requests_total{cluster="volcano_icl",endpoint="tts",status="ok"} 1' in text
+
+
+def test_disabled_metrics_are_noop():
+    assert not NULL_METRICS.enabled
+    timer = NULL_METRICS.timer("tts", "S_1")
+    assert timer is NULL_TIMER
+    with timer, timer.phase("download"):
+        timer.record("queue", 1.0)
+    assert NULL_METRICS.histograms == {}
+    assert NULL_METRICS.counters == {}
+
+
+@pytest.mark.asyncio
+async def test_tts_request_phases(fake_api, tmp_path):
+    metrics = Metrics()
+    config = fake_api.config()
+    async with HttpClient(config, metrics=metrics) as client:
+        tts = TTSService(config, client=client)
+        await tts.synthesize_to_file("你好", str(tmp_path / "a.mp3"), "S_1")
+        await tts.synthesize("再见", "S_1")
+
+    recorded = phases(metrics, "tts")
+    for phase in ("queue", "ttfb", "download", "json_parse", "b64_decode", "total"):
+        assert recorded[phase] == 2
+    assert recorded["connect"] == 1  # 第二个请求复用连接
+    assert recorded["file_write"] == 1
+    assert metrics.counters[(REQUEST_METRIC, (("cluster", "volcano_icl"), ("endpoint", "tts"), ("status", "ok")))] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_request_status(fake_api):
+    metrics = Metrics(label_speaker=False)
+    config = fake_api.config()
+    async with HttpClient(config, metrics=metrics) as client:
+        with pytest.raises(Exception):
+            await TTSService(config, client=client).synthesize("[fail]", "S_1")
+
+    statuses = {dict(labels)["status"] for name, labels in metrics.counters}
+    assert statuses == {"InvalidRequestError"}
+    assert all(dict(labels)["speaker"] == "" for name, labels in metrics.histograms)
+
+
+@pytest.mark.asyncio
+async def test_status_and_log_sink(fake_api, caplog):
+    log = logging.getLogger("test.metrics")
+    metrics = Metrics(sinks=[LogSink(log)])
+    config = fake_api.config()
+    with caplog.at_level(logging.INFO, logger="test.metrics"):
+        async with HttpClient(config, metrics=metrics) as client:
+            await VoiceCloningService(config, client=client).get_status("S_1")
+
+    assert phases(metrics, "status")["json_parse"] == 1
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["endpoint"] == "status"
+    assert record["speaker"] == "S_1"
+    assert record["cluster"] == "volc.megatts.voiceclone"
+    assert record["status"] == "ok"
+    assert "ttfb" in record["phases"]
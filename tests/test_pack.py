@@ -0,0 +1,162 @@
+import hashlib
+import multiprocessing
+import os
+import sys
+import pytest
+from core import pack as pack_module
+from core.pack import AudioPack, PackSink, compact, import_directory, main
+from core.tts import TTSService
+
+
+def _append_many(path, prefix, count):
+    with AudioPack(path, fsync="none") as pack:
+        for i in range(count):
+            pack.put(f"{prefix}{i}", f"{prefix}-audio-{i}".encode(), "mp3")
+
+
+def test_put_get_delete_and_reopen(tmp_path):
+    path = str(tmp_path / "lib.pack")
+    with AudioPack(path) as pack:
+        pack.put("a", b"first", "mp3")
+        pack.put("b", [b"two ", memoryview(b"parts")], "wav")
+        pack.put("a", b"second", "mp3")
+        assert pack.delete("b") and not pack.delete("missing")
+        clip = pack.get("a", verify=True)
+        assert isinstance(clip, memoryview) and clip == b"second"
+        clip.release()
+        assert pack.get("b") is None
+    with AudioPack(path) as pack:
+        assert pack.keys() == ["a"]
+        assert pack.entry("a").encoding == "mp3"
+        assert pack.stats()["garbage_ratio"] > 0
+
+
+def test_rebuilds_index_from_data(tmp_path):
+    path = str(tmp_path / "lib.pack")
+    with AudioPack(path) as pack:
+        pack.put("a", b"audio-a", "mp3")
+        pack.put("b", b"audio-b", "mp3")
+        pack.delete("a")
+    os.unlink(path + ".idx")
+    with AudioPack(path) as pack:
+        assert pack.keys() == ["b"]
+        assert bytes(pack.get("b")) == b"audio-b"
+
+
+def test_recovers_torn_tail(tmp_path):
+    path = str(tmp_path / "lib.pack")
+    with AudioPack(path) as pack:
+        pack.put("a", b"audio-a", "mp3")
+        pack.put("b", b"audio-b", "mp3")
+    with open(path, "rb") as f:
+        data = f.read()
+    torn = data[data.index(b"VCR1", data.index(b"audio-a")):-3]
+    # 末尾是一条完整但未写入索引的记录，再加上一条写了一半的记录
+    with AudioPack(path) as pack:
+        pack.delete("b")
+    with open(path, "ab") as f:
+        f.write(torn)
+    with AudioPack(path) as pack:
+        assert pack.keys() == ["a"]
+        pack.put("c", b"audio-c", "mp3")
+    os.unlink(path + ".idx")
+    with AudioPack(path) as pack:
+        assert sorted(pack.keys()) == ["a", "c"]
+        assert bytes(pack.get("c", verify=True)) == b"audio-c"
+
+    # 记录已写入数据文件、索引项未写入就崩溃
+    with open(path, "ab") as f:
+        f.write(data[data.index(b"VCR1", data.index(b"audio-a")):])
+    with AudioPack(path) as pack:
+        assert sorted(pack.keys()) == ["a", "b", "c"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows 没有文件锁，不支持多进程写入")
+def test_concurrent_process_writers_and_reader_refresh(tmp_path):
+    path = str(tmp_path / "lib.pack")
+    reader = AudioPack(path)
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_append_many, args=(path, prefix, 50)) for prefix in ("x", "y")]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+    # 其他进程写入的音频在未命中时自动读取新的索引项
+    assert bytes(reader.get("y49", verify=True)) == b"y-audio-49"
+    assert len(reader) == 100
+    reader.close()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Windows 不能替换仍被打开的文件")
+def test_compact(tmp_path):
+    path = str(tmp_path / "lib.pack")
+    reader = AudioPack(path)
+    with AudioPack(path) as writer:
+        for i in range(10):
+            writer.put(f"k{i % 3}", bytes([i]) * 100, "mp3")
+        before, after = compact(path)
+        assert after < before
+        # 写入者发现文件被替换后重新打开
+        writer.put("new", b"fresh", "wav")
+    reader.refresh()
+    assert sorted(reader.keys()) == ["k0", "k1", "k2", "new"]
+    assert bytes(reader.get("k0", verify=True)) == bytes([9]) * 100
+    reader.close()
+    with AudioPack(path) as pack:
+        assert pack.stats()["entries"] == 4
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="需要 /proc 列出打开的文件")
+def test_compact_without_file_lock_closes_pack_before_replace(tmp_path, monkeypatch):
+    path = str(tmp_path / "lib.pack")
+    with AudioPack(path) as pack:
+        for i in range(4):
+            pack.put(f"k{i % 2}", bytes([i]) * 100, "mp3")
+    # 模拟 Windows：没有文件锁时替换前不能再打开数据文件和索引
+    monkeypatch.setattr(pack_module, "fcntl", None)
+    replace = os.replace
+
+    def checked_replace(src, dst):
+        opened = {os.path.realpath(os.path.join("/proc/self/fd", fd)) for fd in os.listdir("/proc/self/fd")}
+        assert os.path.realpath(dst) not in opened
+        replace(src, dst)
+
+    monkeypatch.setattr(pack_module.os, "replace", checked_replace)
+    before, after = compact(path)
+    assert after < before
+    with AudioPack(path) as pack:
+        assert bytes(pack.get("k1", verify=True)) == bytes([3]) * 100
+
+
+def test_import_directory_and_cli(tmp_path, capsys):
+    source = tmp_path / "output"
+    (source / "sub").mkdir(parents=True)
+    (source / "a.mp3").write_bytes(b"ID3" + b"\0" * 20)
+    (source / "sub" / "b.mp3").write_bytes(b"ID3" + b"\0" * 20)
+    (source / ".a.mp3.tmp").write_bytes(b"partial")
+    path = str(tmp_path / "lib.pack")
+    with AudioPack(path) as pack:
+        assert import_directory(pack, str(source)) == 2
+        assert sorted(pack.keys()) == ["a.mp3", "sub/b.mp3"]
+    with AudioPack(str(tmp_path / "hashed.pack")) as pack:
+        assert import_directory(pack, str(source), key="hash") == 1
+        assert pack.keys() == [hashlib.sha256(b"ID3" + b"\0" * 20).hexdigest()]
+
+    output = tmp_path / "b.mp3"
+    assert main(["extract", path, "sub/b.mp3", "-o", str(output)]) == 0
+    assert output.read_bytes() == b"ID3" + b"\0" * 20
+    assert main(["list", path]) == 0
+    assert "sub/b.mp3\tmp3\t23" in capsys.readouterr().out
+
+
+@pytest.mark.asyncio
+async def test_pack_sink(fake_api, tmp_path):
+    path = str(tmp_path / "lib.pack")
+    async with PackSink(path) as sink:
+        async with TTSService(fake_api.config(), sink=sink) as tts:
+            jobs = [{"text": f"第{i}句", "speaker_id": "S_test", "output_path": f"{i}.mp3"} for i in range(5)]
+            assert all([result.ok async for result in tts.synthesize_many(jobs)])
+    with AudioPack(path) as pack:
+        assert bytes(pack.get("3.mp3")) == "AUDIO[第3句]".encode("utf-8")
+        assert pack.entry("3.mp3").encoding == "mp3"
@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from core import StatusPoller
+
+
+class FakeStatusService:
+    """按查询次数推进训练状态的模拟服务"""
+
+    def __init__(self, schedule):
+        self.schedule = schedule  # speaker_id -> 每次查询返回的状态序列
+        self.calls = []
+
+    async def get_status(self, speaker_id):
+        self.calls.append((asyncio.get_running_loop().time(), speaker_id))
+        states = self.schedule[speaker_id]
+        index = min(len([c for c in self.calls if c[1] == speaker_id]) - 1, len(states) - 1)
+        state = states[index]
+        if isinstance(state, Exception):
+            raise state
+        return {"speaker_id": speaker_id, "status": state}
+
+
+def fast_poller(service, **kwargs):
+    options = dict(min_interval=0.01, max_interval=0.05, expected_duration=0.0, jitter=0.1, max_rate=1000)
+    options.update(kwargs)
+    return StatusPoller(service, **options)
+
+
+@pytest.mark.asyncio
+async def test_poller_coalesces_waiters_and_resolves():
+    service = FakeStatusService({"S_a": [1, 1, 2], "S_b": [1, 4]})
+    poller = fast_poller(service)
+    results = await asyncio.gather(poller.wait("S_a"), poller.wait("S_a"), poller.wait("S_b"))
+    assert [r["status"] for r in results] == [2, 2, 4]
+    # 两个等待者共享同一条轮询
+    assert len([c for c in service.calls if c[1] == "S_a"]) == 3
+    assert len(poller) == 0
+    await poller.close()
+
+
+
+def test_poller_created_outside_event_loop():
+    # 文档中的用法：先创建轮询器，再由 asyncio.run 启动事件循环；可以在多个 asyncio.run 中复用
+    service = FakeStatusService({"S_a": [1, 2], "S_b": [4]})
+    poller = fast_poller(service)
+    assert asyncio.run(poller.wait("S_a", timeout=5))["status"] == 2
+    assert asyncio.run(poller.wait("S_b", timeout=5))["status"] == 4
+
+@pytest.mark.asyncio
+async def test_poller_failed_training_raises():
+    service = FakeStatusService({"S_fail": [1, 3]})
+    poller = fast_poller(service)
+    with pytest.raises(Exception, match="训练失败"):
+        await poller.wait("S_fail")
+    await poller.close()
+
+
+@pytest.mark.asyncio
+async def test_poller_global_rate_limit():
+    speakers = {f"S_{i}": [1, 2] for i in range(10)}
+    service = FakeStatusService(speakers)
+    poller = fast_poller(service, max_rate=100)
+    await asyncio.gather(*[poller.wait(s) for s in speakers])
+    times = sorted(t for t, _ in service.calls)
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert len(times) == 20
+    assert min(gaps) >= 0.009
+    await poller.close()
+
+
+@pytest.mark.asyncio
+async def test_poller_backoff_and_errors():
+    service = FakeStatusService({"S_slow": [1, 1, 1, 1, 2], "S_err": [RuntimeError("boom")]})
+    poller = fast_poller(service, backoff=2.0, jitter=0.0, max_interval=1.0, max_errors=3)
+    await poller.wait("S_slow")
+    times = [t for t, s in service.calls if s == "S_slow"]
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert gaps[-1] > gaps[0] * 3  # 间隔按指数增长
+
+    with pytest.raises(RuntimeError):
+        await poller.wait("S_err")
+    assert len([c for c in service.calls if c[1] == "S_err"]) == 3
+    await poller.close()
+
+
+@pytest.mark.asyncio
+async def test_poller_timeout_and_expected_duration():
+    service = FakeStatusService({"S_never": [1], "S_ok": [1, 2]})
+    poller = fast_poller(service)
+    with pytest.raises(TimeoutError):
+        await poller.wait("S_never", timeout=0.05)
+    assert len(poller) == 0
+
+    poller.expected_duration = 10.0
+    await poller.wait("S_ok")
+    assert poller.expected_duration < 10.0  # 根据实际完成时间更新
+    await poller.close()
+
+
+@pytest.mark.asyncio
+async def test_wait_for_completion_uses_poller(fake_api):
+    from core import VoiceCloningService
+    fake_api.statuses["S_done"] = 2
+    async with VoiceCloningService(fake_api.config()) as service:
+        poller = fast_poller(service)
+        status = await service.wait_for_completion("S_done", poller=poller)
+        await poller.close()
+    assert status["status"] == 2
@@ -0,0 +1,103 @@
+import asyncio
+import time
+import pytest
+from core import AdaptiveLimiter, HttpClient, RateLimiterRegistry, Resilience, RetryPolicy, ThrottledError, TTSService
+from core.ratelimit import CLUSTER_QUOTAS
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_rate():
+    limiter = AdaptiveLimiter(rate=50, max_concurrency=100, burst=1)
+    start = time.monotonic()
+    for _ in range(11):
+        async with limiter.slot():
+            pass
+    assert time.monotonic() - start >= 0.18
+    assert limiter.stats()["queue_wait_total"] > 0
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit():
+    limiter = AdaptiveLimiter(rate=10000, max_concurrency=3)
+    peak = 0
+
+    async def work():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*[work() for _ in range(12)])
+    assert peak == 3
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_passes_slot_on():
+    limiter = AdaptiveLimiter(rate=10000, max_concurrency=1)
+    await limiter.acquire()
+    first = asyncio.ensure_future(limiter.acquire())
+    second = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    # 唤醒 first 后、它恢复运行前取消
+    limiter.release()
+    first.cancel()
+    await asyncio.wait_for(second, 1)
+    assert first.cancelled() and limiter.in_flight == 1
+    limiter.release()
+    assert limiter.in_flight == 0
+
+
+def test_aimd_adjustment(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("core.ratelimit.time.monotonic", lambda: now[0])
+    limiter = AdaptiveLimiter(rate=20, max_concurrency=8, cooldown=1.0)
+    limiter.on_throttle()
+    limiter.on_throttle()  # 冷却期内不重复降速
+    assert (limiter.rate, int(limiter.limit), limiter.throttles) == (10, 4, 2)
+
+    now[0] = 2.0
+    limiter.on_throttle()
+    assert (limiter.rate, int(limiter.limit)) == (5, 2)
+
+    for _ in range(100):
+        limiter.on_success()
+    assert (limiter.rate, int(limiter.limit)) == (20, 8)
+
+
+def test_registry_shares_by_appid_and_cluster():
+    registry = RateLimiterRegistry()
+    icl = registry.get("app", "volcano_icl")
+    assert registry.get("app", "volcano_icl") is icl
+    assert registry.get("app", "volcano_icl_concurr") is not icl
+    assert registry.get("other", "volcano_icl") is not icl
+    assert (icl.max_rate, icl.max_concurrency) == CLUSTER_QUOTAS["volcano_icl"]
+    assert registry.get("app", "custom", rate=3, max_concurrency=2).max_concurrency == 2
+    assert set(registry.stats()) == {"app/volcano_icl", "app/volcano_icl_concurr", "other/volcano_icl", "app/custom"}
+
+
+@pytest.mark.asyncio
+async def test_services_back_off_when_throttled(fake_api):
+    fake_api.failures = [("code", 3003)]
+    config = fake_api.config(rate_limit=100.0, max_concurrency=4)
+    resilience = Resilience(retry=RetryPolicy(base_delay=0.0))
+    async with HttpClient(config, resilience=resilience) as client:
+        tts = TTSService(config, client=client)
+        await tts.synthesize("限流", speaker_id="S_test")
+        limiter = client.limiter_for(config, config.tts_cluster)
+        assert limiter.throttles == 1
+        assert limiter.max_rate == 100.0
+        assert limiter.rate < 100.0
+        assert int(limiter.limit) == 2
+
+
+@pytest.mark.asyncio
+async def test_limiter_throttle_error_propagates():
+    limiter = AdaptiveLimiter(rate=100, max_concurrency=2)
+
+    async def throttled():
+        raise ThrottledError("限流")
+
+    with pytest.raises(ThrottledError):
+        await limiter.run(throttled)
+    assert limiter.in_flight == 0 and limiter.throttles == 1
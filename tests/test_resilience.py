@@ -0,0 +1,136 @@
+import asyncio
+import pytest
+from core import (
+    CircuitBreaker, CircuitOpenError, HttpClient, InvalidRequestError, NetworkError, Resilience,
+    RetryPolicy, ServerError, SpeakerNotFoundError, ThrottledError, TTSService,
+)
+from core import errors
+
+NO_WAIT = RetryPolicy(max_attempts=3, base_delay=0.0)
+
+
+def test_error_classification():
+    assert isinstance(errors.from_http_status(429, "x"), ThrottledError)
+    assert isinstance(errors.from_http_status(503, "x"), ServerError)
+    assert isinstance(errors.from_http_status(400, "x"), InvalidRequestError)
+    assert isinstance(errors.from_tts_code(3003, "x"), ThrottledError)
+    assert isinstance(errors.from_tts_code(3050, "x"), SpeakerNotFoundError)
+    assert not errors.from_tts_code(3011, "x").retryable
+    assert isinstance(errors.classify(asyncio.TimeoutError()), NetworkError)
+
+
+def test_circuit_breaker_states(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("core.resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10)
+    breaker.record_failure()
+    breaker.allow()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    now[0] = 11
+    breaker.allow()  # 半开状态放行一个探测请求
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    now[0] = 22
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_releases_breaker():
+    resilience = Resilience(retry=NO_WAIT, failure_threshold=1, recovery_timeout=0)
+    breaker = resilience.breaker("host")
+    breaker.record_failure()
+    probe = asyncio.ensure_future(resilience.call("host", lambda: asyncio.sleep(10)))
+    await asyncio.sleep(0)
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+    # 探测被取消后，下一个请求可以重新探测并关闭熔断器
+    assert await resilience.call("host", lambda: asyncio.sleep(0, "ok")) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_retries_retryable_errors(fake_api):
+    fake_api.failures = [("http", 503), ("code", 3003)]
+    config = fake_api.config()
+    async with HttpClient(config, resilience=Resilience(retry=NO_WAIT)) as client:
+        tts = TTSService(config, client=client)
+        audio = await tts.synthesize("重试", speaker_id="S_test")
+    assert audio == "AUDIO[重试]".encode("utf-8")
+    assert len(fake_api.requests) == 3
+    assert client.resilience.retries == 2
+    # 每次尝试使用不同的 reqid
+    assert len({body["request"]["reqid"] for _, body in fake_api.requests}) == 3
+
+
+@pytest.mark.asyncio
+async def test_fatal_errors_are_not_retried(fake_api):
+    config = fake_api.config()
+    async with HttpClient(config, resilience=Resilience(retry=NO_WAIT)) as client:
+        tts = TTSService(config, client=client)
+        with pytest.raises(InvalidRequestError, match="无效文本"):
+            await tts.synthesize("[fail]", speaker_id="S_test")
+    assert len(fake_api.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_fatal_errors_keep_failure_count():
+    async def invalid():
+        raise InvalidRequestError("无效文本")
+
+    resilience = Resilience(retry=RetryPolicy(max_attempts=1), failure_threshold=2, recovery_timeout=0)
+    breaker = resilience.breaker("host")
+    breaker.record_failure()
+    with pytest.raises(InvalidRequestError):
+        await resilience.call("host", invalid)
+    assert breaker.failures == 1
+    breaker.record_failure()
+    # 熔断后半开探测遇到不可重试的错误，放弃探测而不关闭熔断器
+    with pytest.raises(InvalidRequestError):
+        await resilience.call("host", invalid)
+    assert breaker.state != CircuitBreaker.CLOSED
+    assert await resilience.call("host", lambda: asyncio.sleep(0, "ok")) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_repeated_failures(fake_api):
+    fake_api.failures = [("http", 500)] * 10
+    config = fake_api.config()
+    resilience = Resilience(retry=RetryPolicy(max_attempts=2, base_delay=0.0), failure_threshold=3)
+    async with HttpClient(config, resilience=resilience) as client:
+        tts = TTSService(config, client=client)
+        with pytest.raises(ServerError):
+            await tts.synthesize("一", speaker_id="S_test")
+        with pytest.raises(CircuitOpenError):
+            await tts.synthesize("二", speaker_id="S_test")
+    assert len(fake_api.requests) == 3
+    assert resilience.stats()["breakers"][config.host] == "open"
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_cuts_tail_latency(fake_api):
+    config = fake_api.config()
+    resilience = Resilience(retry=NO_WAIT, hedge=True, hedge_min_samples=5, hedge_min_delay=0.01)
+    async with HttpClient(config, resilience=resilience) as client:
+        tts = TTSService(config, client=client)
+        for i in range(5):
+            await tts.synthesize(f"预热{i}", speaker_id="S_test")
+
+        fake_api.delays = [1.0, 0.0]  # 首个请求卡住，对冲请求立即返回
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        audio = await tts.synthesize("对冲", speaker_id="S_test")
+        elapsed = loop.time() - start
+
+    assert audio == "AUDIO[对冲]".encode("utf-8")
+    assert elapsed < 0.5
+    assert (resilience.hedges, resilience.hedge_wins) == (1, 1)
@@ -0,0 +1,72 @@
+import pytest
+from core.batch import SynthesisJob
+from core.config import Config
+from core.errors import InvalidRequestError
+from core.metrics import REQUEST_METRIC, Metrics
+from core.sharding import HashRing, ShardedRunner, shard_config
+
+
+def test_hash_ring_is_stable_and_balanced():
+    keys = [f"文本{i}" for i in range(2000)]
+    four = HashRing(range(4))
+    five = HashRing(range(5))
+    owners = [four.node_for(key) for key in keys]
+    assert owners == [HashRing(range(4)).node_for(key) for key in keys]
+    assert all(owners.count(node) > 300 for node in range(4))
+    # 增加一个节点时，只有新节点接手的键改变归属
+    moved = [key for key, owner in zip(keys, owners) if five.node_for(key) != owner]
+    assert all(five.node_for(key) == 4 for key in moved)
+    assert len(moved) < len(keys) * 0.35
+
+
+def test_shard_config_splits_quota():
+    config = Config(appid="a", token="t", rate_limit=100.0, max_concurrency=10)
+    sharded = shard_config(config, 4)
+    assert sharded.rate_limit == 25.0
+    assert sharded.max_concurrency == 2
+    # 未设置时按集群默认配额 (10/s, 5) 平分
+    default = shard_config(Config(appid="a", token="t"), 2)
+    assert (default.rate_limit, default.max_concurrency) == (5.0, 2)
+
+
+def test_workers_capped_at_concurrency_quota():
+    # volcano_icl 默认并发配额为5，进程数更多时总并发不能超出
+    config = Config(appid="a", token="t")
+    with pytest.raises(ValueError):
+        shard_config(config, 8)
+    runner = ShardedRunner(config, workers=16)
+    assert runner.workers == 5
+    assert runner.config.max_concurrency * runner.workers <= 5
+    assert runner.config.rate_limit * runner.workers == 10.0
+
+
+def test_metrics_merge():
+    first, second = Metrics(), Metrics()
+    first.record_phase("tts", "download", 0.02)
+    second.record_phase("tts", "download", 0.3)
+    second.inc(REQUEST_METRIC, endpoint="tts", cluster="c", status="ok")
+    first.merge(second.snapshot())
+    (histogram,) = first.histograms.values()
+    assert histogram.count == 2
+    assert histogram.sum == pytest.approx(0.32)
+    assert sum(first.counters.values()) == 1
+
+
+@pytest.mark.asyncio
+async def test_sharded_runner(fake_api, tmp_path):
+    jobs = [SynthesisJob(text=f"第{i}句", speaker_id="S_test") for i in range(12)]
+    jobs.append(SynthesisJob(text="写文件", speaker_id="S_test", output_path=str(tmp_path / "out.mp3")))
+    jobs.append(SynthesisJob(text="[fail]", speaker_id="S_test"))
+    metrics = Metrics()
+    runner = ShardedRunner(fake_api.config(), workers=2, concurrency=4, metrics=metrics)
+    results = {result.index: result async for result in runner.run(jobs)}
+
+    assert sorted(results) == list(range(len(jobs)))
+    assert results[0].audio == "AUDIO[第0句]".encode("utf-8")
+    assert results[12].audio is None
+    assert (tmp_path / "out.mp3").read_bytes() == "AUDIO[写文件]".encode("utf-8")
+    assert isinstance(results[13].error, InvalidRequestError)
+    assert all(count > 0 for count in runner.stats()["dispatched"])
+    assert len(fake_api.requests) == len(jobs)
+    requests = {labels: value for (name, labels), value in metrics.counters.items() if name == REQUEST_METRIC}
+    assert sum(requests.values()) == len(jobs)
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import tarfile
+import zipfile
+import pytest
+from core.cache import DiskCache
+from core.sinks import ArchiveSink, DirectorySink, MemorySink
+from core.tts import TTSService
+
+
+@pytest.mark.asyncio
+async def test_directory_sink(tmp_path):
+    async with DirectorySink(str(tmp_path), fsync="batch", fsync_every=3, max_workers=2, max_pending=2) as sink:
+        paths = await asyncio.gather(*(sink.write(f"a/{i}.mp3", [b"x" * i, memoryview(b"yz")]) for i in range(5)))
+        assert sink.fsyncs == 1
+        with pytest.raises(ValueError):
+            await sink.write("../escape.mp3", [b"x"])
+    assert sink.fsyncs == 2
+    assert paths[4] == str(tmp_path / "a" / "4.mp3")
+    assert (tmp_path / "a" / "4.mp3").read_bytes() == b"xxxxyz"
+    # 只留下最终文件，没有临时文件
+    assert sorted(os.listdir(tmp_path / "a")) == [f"{i}.mp3" for i in range(5)]
+    assert sink.stats() == {"writes": 5, "bytes": 20}
+
+
+def test_directory_sink_reopens_across_loops(tmp_path):
+    sink = DirectorySink(str(tmp_path), max_pending=1)
+
+    async def write(name):
+        await asyncio.gather(sink.write(name, [b"a"]), sink.write(name + ".2", [b"b"]))
+        await sink.close()
+
+    # 关闭后再写入时重新创建线程池，信号量按事件循环重新创建
+    asyncio.run(write("first.mp3"))
+    asyncio.run(write("second.mp3"))
+    assert (tmp_path / "second.mp3").read_bytes() == b"a"
+
+
+@pytest.mark.parametrize("name", ["clips.tar", "clips.zip"])
+@pytest.mark.asyncio
+async def test_archive_sink(tmp_path, name):
+    path = tmp_path / name
+    async with ArchiveSink(str(path)) as sink:
+        await asyncio.gather(*(sink.write(f"out/{i}.mp3", [b"audio", str(i).encode()]) for i in range(3)))
+        assert not path.exists()
+    if name.endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            contents = {member: archive.read(member) for member in archive.namelist()}
+    else:
+        with tarfile.open(path) as archive:
+            contents = {member.name: archive.extractfile(member).read() for member in archive.getmembers()}
+    assert contents == {f"out/{i}.mp3": f"audio{i}".encode() for i in range(3)}
+    assert os.listdir(tmp_path) == [name]
+
+
+@pytest.mark.asyncio
+async def test_tts_writes_through_sink(fake_api, tmp_path):
+    sink = MemorySink()
+    async with TTSService(fake_api.config(), sink=sink) as tts:
+        jobs = [{"text": f"第{i}句", "speaker_id": "S_test", "output_path": f"{i}.mp3"} for i in range(3)]
+        results = [result async for result in tts.synthesize_many(jobs)]
+    assert all(result.ok and result.audio is None for result in results)
+    assert sink.clips == {f"{i}.mp3": f"AUDIO[第{i}句]".encode("utf-8") for i in range(3)}
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_links_through_sink(fake_api, tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"))
+    async with TTSService(fake_api.config(), cache=cache,
+                          sink=DirectorySink(str(tmp_path / "out"), fsync="always")) as tts:
+        await tts.synthesize_to_file("你好", "first.mp3", speaker_id="S_test")
+        await tts.synthesize_to_file("你好", "second.mp3", speaker_id="S_test")
+    assert (tmp_path / "out" / "second.mp3").read_bytes() == "AUDIO[你好]".encode("utf-8")
+    assert len(fake_api.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_response_reads_cache_file(fake_api, tmp_path):
+    sink = MemorySink()
+    async with TTSService(fake_api.config(), cache=DiskCache(str(tmp_path / "cache")), sink=sink) as tts:
+        await tts.synthesize_to_file("你好", "first.mp3", speaker_id="S_test")
+        # 输出名称不是本地文件，响应数据从缓存文件读取
+        response = await tts.synthesize_to_file("你好", "second.mp3", speaker_id="S_test", _return_response=True)
+    assert response["data"]["audio"] == sink.clips["second.mp3"] == "AUDIO[你好]".encode("utf-8")
+
+
+@pytest.mark.asyncio
+async def test_service_usable_after_close(fake_api, tmp_path):
+    tts = TTSService(fake_api.config())
+    await tts.synthesize_to_file("你好", str(tmp_path / "a.mp3"), speaker_id="S_test")
+    await tts.close()
+    await tts.synthesize_to_file("再见", str(tmp_path / "b.mp3"), speaker_id="S_test")
+    await tts.close()
+    assert (tmp_path / "b.mp3").read_bytes() == "AUDIO[再见]".encode("utf-8")
@@ -0,0 +1,79 @@
+import pytest
+from core.errors import SpeakerNotFoundError, SpeakerNotReadyError
+from core.http import HttpClient
+from core.tts import TTSService
+from core.voice_cloning import SpeakerStatusCache, VoiceCloningService
+
+
+def paths(fake_api):
+    return [path.rsplit("/", 1)[-1] for path, _ in fake_api.requests]
+
+
+def test_status_cache_ttl():
+    cache = SpeakerStatusCache(ttl=60, pending_ttl=0)
+    cache.put("S_ready", {"status": 2})
+    cache.put("S_training", {"status": 1})
+    assert cache.get("S_ready") == {"status": 2}
+    assert cache.get("S_training") is None
+    cache.invalidate("S_ready")
+    assert cache.get("S_ready") is None
+    assert cache.stats() == {"entries": 0, "hits": 1, "misses": 2}
+
+
+@pytest.mark.asyncio
+async def test_bulk_status_uses_cache(fake_api):
+    fake_api.statuses.update({"S_a": 2, "S_b": 1})
+    async with VoiceCloningService(fake_api.config()) as cloning:
+        assert (await cloning.get_status("S_a"))["status"] == 2
+        statuses = await cloning.get_statuses(["S_a", "S_b", "S_c", "S_b"])
+        assert {speaker: status["status"] for speaker, status in statuses.items()} == {"S_a": 2, "S_b": 1, "S_c": 0}
+        # 带 cached 的查询命中缓存，不带时总是重新查询
+        await cloning.get_status("S_c", cached=True)
+        await cloning.get_status("S_c")
+    assert paths(fake_api) == ["status"] * 4
+
+
+@pytest.mark.asyncio
+async def test_train_and_wait_update_cache(fake_api, tmp_path):
+    sample = tmp_path / "sample.wav"
+    sample.write_bytes(b"RIFF\x00\x00\x00\x00WAVEfmt " + bytes(64))
+    async with VoiceCloningService(fake_api.config()) as cloning:
+        cloning.status_cache.put("S_new", {"status": 0})
+        await cloning.train(str(sample), "S_new")
+        assert cloning.status_cache.get("S_new")["status"] == 1
+        fake_api.statuses["S_new"] = 2
+        await cloning.wait_for_completion("S_new")
+        assert cloning.status_cache.get("S_new")["status"] == 2
+
+
+@pytest.mark.asyncio
+async def test_gate_rejects_locally(fake_api):
+    fake_api.statuses.update({"S_ready": 2, "S_training": 1, "S_failed": 3})
+    async with HttpClient(fake_api.config()) as client:
+        cloning = VoiceCloningService(fake_api.config(), client=client)
+        await cloning.get_statuses(["S_ready", "S_training", "S_failed"])
+        tts = TTSService(fake_api.config(), client=client, speaker_gate=cloning)
+        assert await tts.synthesize("你好", speaker_id="S_ready") == "AUDIO[你好]".encode("utf-8")
+        with pytest.raises(SpeakerNotReadyError):
+            await tts.synthesize("你好", speaker_id="S_training")
+        with pytest.raises(SpeakerNotReadyError):
+            await tts.synthesize("你好", speaker_id="S_failed")
+        # 缓存中没有的音色直接放行
+        await tts.synthesize("你好", speaker_id="S_unknown")
+        # 合成接口返回音色不存在后，之后的请求在本地拒绝
+        fake_api.failures = [("code", 3050)]
+        for _ in range(2):
+            with pytest.raises(SpeakerNotFoundError):
+                await tts.synthesize("再见", speaker_id="S_gone")
+    assert paths(fake_api) == ["status"] * 3 + ["tts"] * 3
+
+
+@pytest.mark.asyncio
+async def test_gate_lookup(fake_api):
+    async with HttpClient(fake_api.config()) as client:
+        cloning = VoiceCloningService(fake_api.config(), client=client)
+        tts = TTSService(fake_api.config(), client=client, speaker_gate=cloning, gate_lookup=True)
+        for _ in range(2):
+            with pytest.raises(SpeakerNotFoundError):
+                await tts.synthesize("你好", speaker_id="S_missing")
+    assert paths(fake_api) == ["status"]
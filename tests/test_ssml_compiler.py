@@ -0,0 +1,85 @@
+import pytest
+from core.errors import SsmlError
+from core.ssml import compile_ssml, split_ssml
+from core.text import byte_length
+from core.tts import TTSService
+
+
+def test_compile_normalizes_whitespace_and_entities():
+    compiled = compile_ssml("""<speak> 《
+        <phoneme alphabet="py" ph="xi1 xi1">茜茜</phoneme>
+        公主》是&#x5965;地利&nbsp;电影 A&B。<!-- 注释 -->
+        <break time="500ms" />  And   Wu Qilong.
+    </speak>""")
+    assert compiled.ssml == (
+        '<speak>《<phoneme alphabet="py" ph="xi1 xi1">茜茜</phoneme>公主》是奥地利电影A&amp;B。'
+        '<break time="500ms"/> And Wu Qilong.</speak>'
+    )
+    assert compiled.byte_cost == byte_length(compiled.ssml)
+    assert compile_ssml.cache_info().currsize >= 1
+
+
+@pytest.mark.parametrize("ssml, message", [
+    ("hello <break/> world", "speak"),
+    ("<speak>hello <speak>world</speak></speak>", "嵌套"),
+    ("<speak>hello</speak> <speak>world</speak>", "只能出现一次"),
+    ('<speak><say-as interpret-as="digit">12 <break time="100ms" /> 34</say-as></speak>', "纯文本"),
+    ('<speak><phoneme alphabet="cmu" ph="w uw1">Wu, Qilong</phoneme></speak>', "标点"),
+    ('<speak><phoneme alphabet="xx" ph="a">a</phoneme></speak>', "alphabet"),
+    ('<speak><say-as interpret-as="color">red</say-as></speak>', "interpret-as"),
+    ("<speak><sub>SSML</sub></speak>", "alias"),
+    ('<speak><break time="fast"/></speak>', "time"),
+    ("<speak><prosody>hi</prosody></speak>", "不支持的SSML标签"),
+])
+def test_compile_rejects_invalid_ssml(ssml, message):
+    with pytest.raises(SsmlError, match=message):
+        compile_ssml(ssml)
+
+
+def test_compile_accepts_documented_examples():
+    for ssml in [
+        '<speak>12:30 and <say-as interpret-as="score">12:30</say-as></speak>',
+        '<speak><say-as interpret-as="Cardinal-Liang">2</say-as>个人</speak>',
+        '<speak><sub alias="语音合成标记语言">SSML</sub></speak>',
+        '<speak><phoneme alphabet="ipa" ph="wutʃilun">Wu Qilong</phoneme> and Wu Qilong</speak>',
+    ]:
+        compile_ssml(ssml)
+
+
+def test_split_keeps_tags_balanced():
+    body = "".join(f'第{i}句<say-as interpret-as="cardinal">{i}</say-as>个。' for i in range(40))
+    ssml = f'<speak xml:lang="zh-CN">{body}<break time="1s"/>{"很长" * 200}</speak>'
+    chunks = split_ssml(ssml, max_bytes=200)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert byte_length(chunk) <= 200
+        assert chunk.startswith('<speak xml:lang="zh-CN">') and chunk.endswith("</speak>")
+        # 每段都能独立通过校验
+        compile_ssml(chunk)
+    # 只在句末或 <break> 之后切分，标签不会与所在句子分开
+    assert all(chunk.endswith(("。</speak>", '<break time="1s"/></speak>')) for chunk in chunks if "say-as" in chunk)
+    joined = "".join(chunk[len('<speak xml:lang="zh-CN">'):-len("</speak>")] for chunk in chunks)
+    assert joined == compile_ssml(ssml).ssml[len('<speak xml:lang="zh-CN">'):-len("</speak>")]
+
+
+def test_split_respects_char_limit():
+    ssml = "<speak>" + "".join(f'<sub alias="第{i}">{i}</sub>，好。' for i in range(30)) + "</speak>"
+    chunks = split_ssml(ssml, max_chars=150)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 150 for chunk in chunks)
+
+
+def test_split_rejects_oversized_tag():
+    ssml = f'<speak><sub alias="{"长" * 100}">x</sub></speak>'
+    with pytest.raises(SsmlError, match="无法切分"):
+        split_ssml(ssml, max_bytes=100)
+
+
+@pytest.mark.asyncio
+async def test_synthesize_validates_ssml_locally(fake_api):
+    async with TTSService(fake_api.config()) as tts:
+        with pytest.raises(SsmlError):
+            await tts.synthesize("<speak><foo/></speak>", speaker_id="S_test", text_type="ssml")
+        chunks = tts.split_long_text("<speak>" + "一句话。" * 200 + "</speak>", "ssml", max_bytes=200)
+    assert fake_api.requests == []
+    assert all(chunk.startswith("<speak>") and byte_length(chunk) <= 200 for chunk in chunks)
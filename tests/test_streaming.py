@@ -0,0 +1,122 @@
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from core import TTSService
+from core import streaming
+from core.config import Config
+from core.credentials import Credential, CredentialPool
+
+
+class FakeStreamServer:
+    """本地模拟的二进制WebSocket合成接口"""
+
+    def __init__(self, frames_per_request: int = 3):
+        self.frames_per_request = frames_per_request
+        self.requests = []
+        self.close_early = False
+        self.server = None
+
+    def config(self) -> Config:
+        return Config(appid="test_appid", token="test_token", host=str(self.server.make_url("")).rstrip("/"))
+
+    async def handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        message = await ws.receive()
+        frame = streaming.parse_frame(message.data)
+        assert frame.message_type == streaming.FULL_CLIENT_REQUEST
+        body = frame.json()
+        self.requests.append((request.headers.get("Authorization"), body))
+
+        text = body["request"]["text"]
+        if "[fail]" in text:
+            await ws.send_bytes(streaming.encode_error(3011, "无效文本", compress=True))
+        else:
+            count = self.frames_per_request
+            for i in range(1, count + 1):
+                if self.close_early and i == count:
+                    break
+                sequence = -i if i == count else i
+                await ws.send_bytes(streaming.encode_audio(f"<{text}:{i}>".encode("utf-8"), sequence))
+        await ws.close()
+        return ws
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/v1/tts/ws_binary", self.handle)
+        return app
+
+
+@pytest_asyncio.fixture
+async def stream_server():
+    server = FakeStreamServer()
+    server.server = TestServer(server.app())
+    await server.server.start_server()
+    yield server
+    await server.server.close()
+
+
+def test_frame_round_trip():
+    request = streaming.parse_frame(streaming.encode_request({"text": "你好"}))
+    assert request.message_type == streaming.FULL_CLIENT_REQUEST
+    assert request.compression == streaming.GZIP_COMPRESSION
+    assert request.json() == {"text": "你好"}
+
+    audio = streaming.parse_frame(streaming.encode_audio(b"abc", 2))
+    assert (audio.sequence, audio.payload, audio.is_last) == (2, b"abc", False)
+    assert streaming.parse_frame(streaming.encode_audio(b"", -3)).is_last
+
+    error = streaming.parse_frame(streaming.encode_error(3050, "音色不存在"))
+    assert (error.error_code, error.payload.decode("utf-8")) == (3050, "音色不存在")
+
+
+@pytest.mark.asyncio
+async def test_synthesize_stream_yields_frames_in_order(stream_server):
+    async with TTSService(stream_server.config()) as tts:
+        chunks = [c async for c in tts.synthesize_stream("你好", speaker_id="S_test")]
+    assert chunks == [f"<你好:{i}>".encode("utf-8") for i in (1, 2, 3)]
+    authorization, body = stream_server.requests[0]
+    assert authorization == "Bearer;test_token"
+    assert body["request"]["operation"] == "submit"
+    assert body["audio"]["voice_type"] == "S_test"
+
+
+@pytest.mark.asyncio
+async def test_synthesize_stream_error_frame(stream_server):
+    async with TTSService(stream_server.config()) as tts:
+        with pytest.raises(Exception, match="无效文本"):
+            async for _ in tts.synthesize_stream("[fail]", speaker_id="S_test"):
+                pass
+
+
+@pytest.mark.asyncio
+async def test_synthesize_stream_detects_truncated_stream(stream_server, tmp_path):
+    stream_server.close_early = True
+    output_path = tmp_path / "out.mp3"
+    async with TTSService(stream_server.config()) as tts:
+        with pytest.raises(Exception, match="音频结束前关闭"):
+            await tts.synthesize_stream_to_file("截断", str(output_path), speaker_id="S_test")
+    assert not output_path.exists()
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_synthesize_stream_to_file(stream_server, tmp_path):
+    output_path = tmp_path / "sub" / "out.mp3"
+    async with TTSService(stream_server.config()) as tts:
+        written = await tts.synthesize_stream_to_file("文件", str(output_path), speaker_id="S_test")
+    expected = "".join(f"<文件:{i}>" for i in (1, 2, 3)).encode("utf-8")
+    assert output_path.read_bytes() == expected
+    assert written == len(expected)
+
+
+@pytest.mark.asyncio
+async def test_synthesize_stream_uses_credential_host(stream_server):
+    # 主凭据指向不可达的地址且不负责该音色，流式连接应使用被选中凭据自己的 host
+    primary = Config(appid="primary", token="primary_token", host="http://127.0.0.1:9")
+    pool = CredentialPool([Credential(primary, speakers={"S_other"}), Credential(stream_server.config())])
+    async with TTSService(pool) as tts:
+        chunks = [c async for c in tts.synthesize_stream("你好", speaker_id="S_test")]
+    assert len(chunks) == 3
+    assert stream_server.requests[0][0] == "Bearer;test_token"
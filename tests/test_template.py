@@ -0,0 +1,43 @@
+import pytest
+from core.template import PromptTemplate
+from core.tts import TTSService
+
+
+def test_template_segments():
+    template = PromptTemplate("您的订单号是 {order}，预计 {time} 送达。")
+    assert template.fields == ("order", "time")
+    assert template.static_phrases == ["您的订单号是", "，预计", "送达。"]
+    assert template.segments({"order": 12345, "time": "明天"}) == [
+        (True, "您的订单号是"), (False, "12345"), (True, "，预计"), (False, "明天"), (True, "送达。"),
+    ]
+    assert template.render({"order": 1, "time": "今天"}) == "您的订单号是 1，预计 今天 送达。"
+    with pytest.raises(ValueError, match="time"):
+        template.segments({"order": 1})
+    with pytest.raises(ValueError):
+        PromptTemplate("{order:>5}")
+
+
+@pytest.mark.asyncio
+async def test_static_phrases_synthesized_once(fake_api):
+    template = "您的订单号是{order}，预计{time}送达"
+    values = [
+        {"order": "1001", "time": "明天"},
+        {"order": "1002", "time": "明天"},
+        {"order": "1001", "time": "后天"},
+    ]
+    async with TTSService(fake_api.config()) as tts:
+        clips = await tts.synthesize_template_many(template, values, "S_test", encoding="pcm")
+        assert clips[0] == "AUDIO[您的订单号是]AUDIO[1001]AUDIO[，预计]AUDIO[明天]AUDIO[送达]".encode("utf-8")
+        # 3个固定短语 + 4个不同的变量值
+        assert len(fake_api.requests) == 7
+
+        clip = await tts.synthesize_template(template, {"order": "2001", "time": "明天"}, "S_test", encoding="pcm")
+        assert clip.startswith("AUDIO[您的订单号是]AUDIO[2001]".encode("utf-8"))
+        # 固定短语已缓存，只合成新的变量值
+        assert len(fake_api.requests) == 9
+        assert tts.phrase_cache.stats()["entries"] == 3
+
+        await tts.synthesize_template(template, {"order": "2001", "time": "明天"}, "S_test", encoding="pcm",
+                                      speed_ratio=1.2)
+        # 语速不同时固定短语重新合成
+        assert len(fake_api.requests) == 9 + 5
@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from core.text import MAX_TEXT_BYTES, byte_length, split_text
+from core.tts import TTSService
+
+
+def test_split_chinese_at_sentence_boundaries():
+    text = "今天天气很好。我们去公园吧！你觉得怎么样？"
+    chunks = split_text(text, max_bytes=40)
+    assert chunks == ["今天天气很好。", "我们去公园吧！", "你觉得怎么样？"]
+    assert "".join(chunks) == text
+
+
+def test_split_merges_short_sentences():
+    text = "一。二。三。四。"
+    assert split_text(text, max_bytes=MAX_TEXT_BYTES) == [text]
+
+
+def test_split_english_keeps_decimals():
+    text = "Pi is 3.14 roughly. The end is near! Really?"
+    chunks = split_text(text, max_bytes=20)
+    assert chunks == ["Pi is 3.14 roughly.", "The end is near!", "Really?"]
+
+
+def test_split_long_sentence_at_commas_and_hard_limit():
+    text = "，".join(["这是一个很长的分句"] * 20) + "。"
+    chunks = split_text(text, max_bytes=100)
+    assert all(byte_length(chunk) <= 100 for chunk in chunks)
+    assert "".join(chunks) == text
+
+    no_punct = "字" * 100
+    chunks = split_text(no_punct, max_bytes=31)
+    assert all(byte_length(chunk) <= 31 for chunk in chunks)
+    assert "".join(chunks) == no_punct
+
+
+@pytest.mark.asyncio
+async def test_synthesize_rejects_oversized_text(fake_api):
+    async with TTSService(fake_api.config()) as tts:
+        with pytest.raises(ValueError, match="字符超限"):
+            await tts.synthesize("字" * 400, speaker_id="S_test")
+    assert fake_api.requests == []
+
+
+@pytest.mark.asyncio
+async def test_synthesize_long_keeps_order(fake_api):
+    sentences = [f"第{i}句话。" for i in range(10)]
+    async with TTSService(fake_api.config()) as tts:
+        audio = await tts.synthesize_long("".join(sentences), speaker_id="S_test",
+                                          max_bytes=20, concurrency=3)
+    assert audio == b"".join(f"AUDIO[{s}]".encode("utf-8") for s in sentences)
+    assert len(fake_api.requests) == 10
+
+
+@pytest.mark.asyncio
+async def test_iter_synthesize_long_bounds_concurrency(fake_api):
+    async with TTSService(fake_api.config()) as tts:
+        in_flight = 0
+        peak = 0
+        original = tts.synthesize
+
+        async def tracked(**kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            try:
+                await asyncio.sleep(0.01)
+                return await original(**kwargs)
+            finally:
+                in_flight -= 1
+
+        tts.synthesize = tracked
+        parts = [part async for part in tts.iter_synthesize_long(
+            "甲。乙。丙。丁。戊。己。", speaker_id="S_test", max_bytes=6, concurrency=2)]
+    assert peak == 2
+    assert parts[0] == "AUDIO[甲。]".encode("utf-8")
+    assert len(parts) == 6
+
+
+@pytest.mark.asyncio
+async def test_synthesize_to_file_long_text(fake_api, tmp_path):
+    output_path = tmp_path / "long.mp3"
+    async with TTSService(fake_api.config()) as tts:
+        await tts.synthesize_to_file("第一句。" * 200, output_path=str(output_path),
+                                     speaker_id="S_test", long_text=True)
+    assert output_path.read_bytes().count(b"AUDIO[") == len(fake_api.requests) > 1
@@ -0,0 +1,128 @@
+import base64
+import json
+import os
+import wave
+import pytest
+from core import VoiceCloningService
+from core.audio import detect_format
+from core.upload import (
+    AudioSample, UploadBody, batch_samples, encoded_length, iter_base64_file, prepare_samples,
+)
+
+
+def write_wav(path, frames: int = 8000) -> bytes:
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(os.urandom(frames * 2))
+    return path.read_bytes()
+
+
+async def collect(body: UploadBody) -> bytes:
+    return b"".join([chunk async for chunk in body])
+
+
+@pytest.mark.asyncio
+async def test_iter_base64_file_matches_one_shot(tmp_path):
+    data = os.urandom(10_000)
+    path = tmp_path / "sample.wav"
+    path.write_bytes(data)
+    encoded = b"".join([chunk async for chunk in iter_base64_file(str(path), chunk_size=999)])
+    assert encoded == base64.b64encode(data)
+    assert len(encoded) == encoded_length(len(data))
+
+
+@pytest.mark.asyncio
+async def test_upload_body_is_valid_json(tmp_path):
+    paths = []
+    for i, size in enumerate([0, 1, 2, 3, 4000]):
+        path = tmp_path / f"{i}.mp3"
+        path.write_bytes(os.urandom(size))
+        paths.append(str(path))
+    body = UploadBody({"appid": "a", "speaker_id": "S_中文"}, [AudioSample.from_path(p) for p in paths], chunk_size=3)
+
+    raw = await collect(body)
+    assert len(raw) == body.content_length
+    decoded = json.loads(raw)
+    assert decoded["speaker_id"] == "S_中文"
+    for path, audio in zip(paths, decoded["audios"]):
+        assert audio["audio_format"] == "mp3"
+        with open(path, "rb") as f:
+            assert base64.b64decode(audio["audio_bytes"]) == f.read()
+
+
+@pytest.mark.asyncio
+async def test_train_streams_upload(fake_api, tmp_path):
+    path = tmp_path / "voice.wav"
+    data = write_wav(path, frames=150_000)
+
+    async with VoiceCloningService(fake_api.config()) as service:
+        result = await service.train(str(path), speaker_id="S_test")
+        status = await service.get_status("S_test")
+
+    assert result["speaker_id"] == "S_test"
+    assert status["status"] == 1
+    _, body = fake_api.requests[0]
+    assert body["appid"] == "test_appid"
+    assert body["model_type"] == 1
+    assert body["audios"][0]["audio_format"] == "wav"
+    assert base64.b64decode(body["audios"][0]["audio_bytes"]) == data
+
+
+def test_detect_format_by_header():
+    assert detect_format(b"RIFF\x00\x00\x00\x00WAVEfmt ") == "wav"
+    assert detect_format(b"ID3\x04\x00") == "mp3"
+    assert detect_format(b"\xff\xfb\x90\x64") == "mp3"
+    assert detect_format(b"\xff\xf1\x50\x80") == "aac"
+    assert detect_format(b"OggS\x00\x02") == "ogg"
+    assert detect_format(b"\x00\x00\x00\x20ftypM4A ") == "m4a"
+    assert detect_format(b"not audio") is None
+
+
+@pytest.mark.asyncio
+async def test_prepare_samples_validates_content(tmp_path):
+    wav = tmp_path / "misnamed.mp3"
+    write_wav(wav)
+    pcm = tmp_path / "raw.pcm"
+    pcm.write_bytes(os.urandom(100))
+    samples = await prepare_samples([str(wav), str(pcm)])
+    assert [s.audio_format for s in samples] == ["wav", "pcm"]
+
+    fake = tmp_path / "fake.wav"
+    fake.write_bytes(b"not really audio")
+    with pytest.raises(ValueError, match="无法识别音频格式"):
+        await prepare_samples([str(wav), str(fake)])
+
+    empty = tmp_path / "empty.wav"
+    empty.write_bytes(b"")
+    with pytest.raises(ValueError, match="音频文件为空"):
+        await prepare_samples([str(empty)])
+
+
+def test_batch_samples_respects_cap():
+    samples = [AudioSample(path=str(i), audio_format="wav", size=300) for i in range(5)]  # 编码后400字节
+    assert [len(b) for b in batch_samples(samples, max_batch_bytes=800)] == [2, 2, 1]
+    assert [len(b) for b in batch_samples(samples, max_batch_bytes=100)] == [1] * 5
+    assert [len(b) for b in batch_samples(samples)] == [5]
+
+
+@pytest.mark.asyncio
+async def test_train_multiple_samples_in_batches(fake_api, tmp_path):
+    paths = []
+    contents = []
+    for i in range(5):
+        path = tmp_path / f"clip{i}.wav"
+        contents.append(write_wav(path, frames=1000))
+        paths.append(str(path))
+
+    async with VoiceCloningService(fake_api.config()) as service:
+        await service.train(paths, speaker_id="S_multi")
+        single_request = len(fake_api.requests)
+        await service.train(paths, speaker_id="S_multi", max_batch_bytes=2 * encoded_length(len(contents[0])))
+
+    assert single_request == 1
+    uploaded = [base64.b64decode(audio["audio_bytes"])
+                for _, body in fake_api.requests[1:] for audio in body["audios"]]
+    assert [len(body["audios"]) for _, body in fake_api.requests[1:]] == [2, 2, 1]
+    assert uploaded == contents
@@ -2,7 +2,7 @@ import asyncio
 import os
 import logging
 from datetime import datetime
-from core import Config, VoiceCloningService, TTSService
+from core import Config, HttpClient, VoiceCloningService, TTSService
 
 logging.basicConfig(
     level=logging.INFO,
@@ -46,9 +46,11 @@ class VoiceCloneTest:
             token=token
         )
         
-        # 初始化服务
-        self.voice_cloning = VoiceCloningService(self.config)
-        self.tts = TTSService(self.config)
+        # 初始化服务（共享同一个连接池）
+        self.client = HttpClient(self.config)
+        self.voice_cloning = VoiceCloningService(self.config, client=self.client)
+        # 合成前预检训练状态，未训练完成的音色在本地提示，不浪费一次合成请求
+        self.tts = TTSService(self.config, client=self.client, speaker_gate=self.voice_cloning, gate_lookup=True)
         
         print("\n配置完成！")
     
@@ -156,16 +158,26 @@ class VoiceCloneTest:
                 text=text,
                 output_path=output_path,
                 speaker_id=self.speaker_id,
-                speed_ratio=speed_ratio
+                speed_ratio=speed_ratio,
+                long_text=True
             )
             print(f"\n语音已保存到: {output_path}")
             
         except Exception as e:
             print(f"\n合成语音失败: {str(e)}")
 
+    async def close(self):
+        """释放连接池"""
+        await self.client.close()
+
 async def main():
     demo = VoiceCloneTest()
-    
+    try:
+        await run_menu(demo)
+    finally:
+        await demo.close()
+
+async def run_menu(demo: VoiceCloneTest):
     while True:
         print("\n============= 声音复刻测试程序 =============")
         print("1. 查询训练状态")